@@ -2,8 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from pipeline.data_runner import load_processed_df
-from pipeline.orchestrator import answer_question
+from config import QUERY_ENGINE
+from pipeline.dataset_cache import load_sample_df, processed_row_count
+from pipeline.orchestrator import stream_answer
 from datetime import datetime
 
 # Page configuration with dark theme
@@ -293,6 +294,17 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # Execution engine for generated analysis code
+    engine_label = st.radio(
+        "🛠️ Query engine",
+        ["pandas", "SQL (DuckDB)"],
+        index=1 if QUERY_ENGINE == "sql" else 0,
+        help="pandas runs generated Python in-process; SQL runs a generated query over the parquet files with DuckDB.",
+    )
+    query_engine = "sql" if engine_label.startswith("SQL") else "pandas"
+    
+    st.markdown("---")
+    
     # How to use section
     with st.expander("💡 How to Use", expanded=True):
         st.markdown("""
@@ -322,12 +334,12 @@ with st.sidebar:
     if show_data:
         try:
             with st.spinner("Loading sample data..."):
-                df_sample = load_processed_df().head(100)
+                df_sample = load_sample_df(100)
                 st.dataframe(df_sample, use_container_width=True, height=300)
                 
                 # Quick stats
                 st.markdown("**Quick Stats:**")
-                st.write(f"• Total rows: {len(df_sample):,}")
+                st.write(f"• Total rows: {processed_row_count():,}")
                 st.write(f"• Columns: {len(df_sample.columns)}")
                 st.write(f"• Numeric cols: {len(df_sample.select_dtypes(include='number').columns)}")
         except Exception as e:
@@ -402,32 +414,72 @@ with tab1:
     if analyze_btn and question:
         st.session_state.query_count += 1
         
-        with st.spinner("🔮 Analyzing your question..."):
-            try:
-                result = answer_question(question)
-                
-                # Store in history
-                st.session_state.history.append({
-                    'question': question,
-                    'code': result['code'],
-                    'result_df': result['result_df'],
-                    'narrative': result['narrative'],
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                })
-                
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
+        # Stream stage events so code, table and narrative appear as soon as
+        # each is ready; the full tabs below replace this live view
+        live = st.empty()
+        with live.container():
+            status_box = st.empty()
+            code_box = st.empty()
+            table_box = st.empty()
+            narrative_box = st.empty()
+        status_box.info("🔮 Analyzing your question...")
+        code_language = "sql" if query_engine == "sql" else "python"
+        code_text, narrative_text, result = "", "", None
+        
+        for event in stream_answer(question, engine=query_engine):
+            kind = event["type"]
+            if kind == "context":
+                status_box.info(f"📚 Found {len(event['docs'])} relevant knowledge-base passages...")
+            elif kind == "code_token":
+                code_text += event["text"]
+                code_box.code(code_text, language=code_language)
+            elif kind == "code":
+                code_box.code(event["code"], language=event["language"])
+                status_box.info("⚙️ Running the analysis...")
+            elif kind == "result":
+                table_box.dataframe(event["result_df"], use_container_width=True)
+                status_box.info("🧠 Writing insights...")
+            elif kind == "narrative_token":
+                narrative_text += event["text"]
+                narrative_box.markdown(narrative_text)
+            elif kind == "error":
+                live.empty()
+                st.error(f"❌ Error: {str(event['error'])}")
                 st.stop()
+            elif kind == "done":
+                result = event["result"]
+        live.empty()
+        
+        # Store in history
+        st.session_state.history.append({
+            'question': question,
+            'code': result['code'],
+            'code_language': result['code_language'],
+            'result_df': result['result_df'],
+            'narrative': result['narrative'],
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
         
         # Success indicator
         st.success("✅ Analysis complete!")
+        if result.get("timings"):
+            stages = " · ".join(f"{k} {v:.2f}s" for k, v in result["timings"].items())
+            st.caption(f"Request {result['request_id']} via {result['path']} — {stages}")
+        for warning in result.get("warnings", []):
+            st.warning(f"⚠️ {warning}")
         
         # Results section with tabs
         result_tabs = st.tabs(["📝 Code", "📊 Data", "📈 Visualization", "🧠 Insights"])
         
         with result_tabs[0]:
             st.markdown("### Generated Code")
-            st.code(result["code"], language="python", line_numbers=True)
+            if result.get("source") == "cube":
+                st.caption("⚡ Served from the rollup cube; the equivalent pandas code is shown below.")
+            elif result.get("path") == "template":
+                st.caption("⚡ Recognised question shape; template code was used, no LLM call was made.")
+            elif result.get("code_cache"):
+                st.caption(f"⚡ Reused cached code ({result['code_cache']} match); no LLM call was made.")
+            st.code(result["code"], language=result["code_language"], line_numbers=True)
             
             # Copy button simulation
             col1, col2 = st.columns([1, 4])
@@ -579,7 +631,7 @@ with tab2:
                 col1, col2 = st.columns(2)
                 with col1:
                     st.markdown("**📝 Code:**")
-                    st.code(item['code'], language="python")
+                    st.code(item['code'], language=item.get('code_language', "python"))
                 
                 with col2:
                     st.markdown("**📊 Result:**")
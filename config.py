@@ -35,9 +35,75 @@ load_dotenv(BASE_DIR / ".env")
 # Raw Kaggle CSV must be here: data/raw/DataCoSupplyChainDataset.csv
 DATA_RAW_PATH = BASE_DIR / "data" / "raw" / "DataCoSupplyChainDataset.csv"
 
-# Cleaned parquet file will be written here by data_loader.py
+# Cleaned data is written by data_loader.py as a hive-partitioned parquet
+# dataset (one directory level per PARTITION_COLUMNS entry)
+DATA_PROCESSED_DIR = BASE_DIR / "data" / "processed" / "orders"
+PARTITION_COLUMNS = ["market", "order_year"]
+
+# Single-file layout used before partitioning; still readable as a fallback
 DATA_PROCESSED_PATH = BASE_DIR / "data" / "processed" / "orders_clean.parquet"
 
+# PII / blob columns (emails, passwords, product images and descriptions) are
+# dropped from the analysis table; set STORE_PII_COLUMNS=true to keep them
+# in this separate parquet keyed by order_item_id
+DATA_PII_PATH = BASE_DIR / "data" / "processed" / "orders_pii.parquet"
+STORE_PII_COLUMNS = os.getenv("STORE_PII_COLUMNS", "false").lower() == "true"
+
+# Sorted set of order_item_id values already written (cross-chunk dedupe)
+DATA_KEY_INDEX_PATH = BASE_DIR / "data" / "processed" / "order_item_ids.npy"
+
+# PII fragments added by `data_loader.py --append`, and the manifest listing
+# every data file that makes up the processed table
+DATA_FRAGMENTS_DIR = BASE_DIR / "data" / "processed" / "fragments"
+DATA_MANIFEST_PATH = BASE_DIR / "data" / "processed" / "manifest.json"
+
+# Uncompressed Arrow IPC copy of the processed table, one file per manifest
+# fragment, memory-mapped by every app process so they share one set of
+# page-cache pages (written on ingest; an append adds just its delta's file)
+DATA_SNAPSHOT_DIR = BASE_DIR / "data" / "processed" / "snapshot"
+USE_ARROW_SNAPSHOT = os.getenv("USE_ARROW_SNAPSHOT", "true").lower() == "true"
+
+# Pre-aggregated metric x segment stats (pipeline/rollup_cube.py), rebuilt on
+# ingest; set USE_ROLLUP_CUBE=false to always go through generated code
+DATA_ROLLUP_PATH = BASE_DIR / "data" / "processed" / "rollup_cube.parquet"
+USE_ROLLUP_CUBE = os.getenv("USE_ROLLUP_CUBE", "true").lower() == "true"
+
+# Rule-based parser for common "<metric> by <segment>" questions
+# (pipeline/intent_parser.py); parsed questions get template pandas / SQL
+# instead of an LLM call. Set USE_INTENT_PARSER=false to always use the LLM
+USE_INTENT_PARSER = os.getenv("USE_INTENT_PARSER", "true").lower() == "true"
+
+# Per-column statistics (dtype, nulls, min/max, top values, quantiles) used by
+# prompts, code validation and narratives; rebuilt on ingest
+DATA_COLUMN_STATS_PATH = BASE_DIR / "data" / "processed" / "column_stats.json"
+# Mergeable partials the sidecar is finished from; appends fold into them
+DATA_COLUMN_STATS_STATE_PATH = BASE_DIR / "data" / "processed" / "column_stats_state.json"
+
+# Rows per CSV chunk in streaming ingest (python pipeline/data_loader.py --stream)
+INGEST_CHUNKSIZE = int(os.getenv("INGEST_CHUNKSIZE", "100000"))
+
+# Processes that clean raw rows in parallel (1 = serial, 0 = one per core)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+
+# Execution backend for generated analysis code: "pandas" (exec'd pandas over
+# the cached frame) or "sql" (DuckDB SQL straight over the parquet dataset)
+QUERY_ENGINE = os.getenv("QUERY_ENGINE", "pandas").lower()
+
+# DuckDB settings for the "sql" engine; 0 threads = one per core. Operators
+# that exceed the memory limit spill to SQL_TEMP_DIR instead of failing
+SQL_THREADS = int(os.getenv("SQL_THREADS", "0"))
+SQL_MEMORY_LIMIT = os.getenv("SQL_MEMORY_LIMIT", "2GB")
+SQL_TEMP_DIR = BASE_DIR / "data" / "duckdb_tmp"
+
+# Question -> validated generated code cache (pipeline/code_cache.py):
+# exact match on the normalized question, else nearest cached question with
+# embedding cosine >= CODE_CACHE_SIMILARITY (set above 1 for exact-only)
+CODE_CACHE_ENABLED = os.getenv("CODE_CACHE_ENABLED", "true").lower() == "true"
+CODE_CACHE_PATH = BASE_DIR / "data" / "code_cache.sqlite"
+CODE_CACHE_SIMILARITY = float(os.getenv("CODE_CACHE_SIMILARITY", "0.97"))
+CODE_CACHE_TTL_DAYS = float(os.getenv("CODE_CACHE_TTL_DAYS", "30"))
+CODE_CACHE_MAX_ENTRIES = int(os.getenv("CODE_CACHE_MAX_ENTRIES", "5000"))
+
 # ----------------------------------------------------------
 # 3. KNOWLEDGE BASE / RAG PATHS
 # ----------------------------------------------------------
@@ -45,6 +111,43 @@ DATA_PROCESSED_PATH = BASE_DIR / "data" / "processed" / "orders_clean.parquet"
 KB_BASE_PATH = BASE_DIR / "kb"
 CHROMA_DB_DIR = BASE_DIR / "rag" / "chroma_store"
 
+# Vector index used by rag/retriever.py (see rag/vector_index.py):
+# "numpy" = memory-mapped .npy matrix with exact cosine search (default,
+# right for a KB of a few hundred chunks), "chroma" = the Chroma store above.
+# VECTOR_INDEX_FLOAT16 halves the .npy file at a tiny precision cost.
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "numpy").lower()
+VECTOR_INDEX_FLOAT16 = os.getenv("VECTOR_INDEX_FLOAT16", "false").lower() == "true"
+NUMPY_INDEX_DIR = BASE_DIR / "rag" / "numpy_index"
+
+# KB chunking (rag/chunking.py): documents are split at markdown headings,
+# long sections packed into chunks of at most this many characters; the
+# retriever can stitch adjacent chunks of one file back together
+KB_CHUNK_MAX_CHARS = int(os.getenv("KB_CHUNK_MAX_CHARS", "1200"))
+KB_MERGE_ADJACENT_CHUNKS = os.getenv("KB_MERGE_ADJACENT_CHUNKS", "true").lower() == "true"
+
+# KB chunks retrieved once per question and shared by every stage
+# (pipeline/request_context.py); must cover the largest per-stage top_k
+KB_CONTEXT_TOP_K = int(os.getenv("KB_CONTEXT_TOP_K", "4"))
+
+# Hybrid retrieval: a BM25 inverted index (rag/lexical_index.py) is built
+# next to the dense one; RETRIEVAL_MODE "hybrid" fuses both ranked lists
+# (top HYBRID_CANDIDATES of each) with reciprocal rank fusion (constant
+# RRF_K); "dense" / "lexical" use one side only
+LEXICAL_INDEX_DIR = BASE_DIR / "rag" / "lexical_index"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Written by rag/build_kb.py: per-file content hashes and the document set
+# each index backend holds, so rebuilds only re-embed what changed
+KB_MANIFEST_PATH = BASE_DIR / "rag" / "kb_manifest.json"
+
+# Query-embedding cache used by rag/retriever.py: LRU size, and an optional
+# SQLite file that keeps embeddings across restarts and app processes
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = BASE_DIR / "rag" / "embedding_cache.sqlite"
+
 # ----------------------------------------------------------
 # 4. MODEL CONFIGURATION
 # ----------------------------------------------------------
@@ -52,10 +155,45 @@ CHROMA_DB_DIR = BASE_DIR / "rag" / "chroma_store"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gpt-4o")
 
+# LLM provider layer (pipeline/llm_client.py). LLM_BASE_URL points the
+# "openai" provider at any OpenAI-compatible server, e.g. the offline stub
+# (python pipeline/llm_stub_server.py) at http://127.0.0.1:8001/v1
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or os.getenv("OPENAI_BASE_URL") or None
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
+LLM_KEEPALIVE_S = float(os.getenv("LLM_KEEPALIVE_S", "30"))
+
+# Per-stage timeouts (seconds) of orchestrator.answer_question_async(); a
+# stage that runs longer fails the request with TimeoutError
+ASYNC_STAGE_TIMEOUTS = {
+    "retrieve": float(os.getenv("TIMEOUT_RETRIEVE_S", "15")),
+    "generate": float(os.getenv("TIMEOUT_GENERATE_S", "60")),
+    "execute": float(os.getenv("TIMEOUT_EXECUTE_S", "60")),
+    "narrative": float(os.getenv("TIMEOUT_NARRATIVE_S", "60")),
+}
+
 # Embedding model name used by sentence-transformers
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
+# Encoder backend (rag/encoders.py): "torch" (sentence-transformers) or
+# "onnx" (int8 ONNX export run with onnxruntime; no torch import). Export
+# the ONNX model first with python rag/export_onnx.py
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = BASE_DIR / "rag" / "onnx_encoder"
+
 USE_TINYLLAMA_LOCAL = os.getenv("USE_TINYLLAMA_LOCAL", "false").lower() == "true" # toggle
+
+# Narrative generator (pipeline/insight_generator.py): "data_driven"
+# (template insights from the result table), "tinyllama" or "openai"; the
+# model backends fall back to data_driven on errors or unusable output
+NARRATIVE_BACKEND = os.getenv(
+    "NARRATIVE_BACKEND", "tinyllama" if USE_TINYLLAMA_LOCAL else "data_driven"
+).lower()
 TINYLLAMA_BASE = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
 TINYLLAMA_ADAPTER_PATH =  "/Users/sruthigandla/Documents/Northeastern/Prompt engineering/Final Project/finetuning/tinyllama_lora"
 
@@ -66,7 +204,10 @@ TINYLLAMA_ADAPTER_PATH =  "/Users/sruthigandla/Documents/Northeastern/Prompt eng
 if __name__ == "__main__":
     print("BASE_DIR:", BASE_DIR)
     print("DATA_RAW_PATH:", DATA_RAW_PATH)
-    print("DATA_PROCESSED_PATH:", DATA_PROCESSED_PATH)
+    print("DATA_PROCESSED_DIR:", DATA_PROCESSED_DIR)
+    print("DATA_KEY_INDEX_PATH:", DATA_KEY_INDEX_PATH)
+    print("DATA_SNAPSHOT_DIR:", DATA_SNAPSHOT_DIR)
     print("KB_BASE_PATH:", KB_BASE_PATH)
     print("CHROMA_DB_DIR:", CHROMA_DB_DIR)
+    print("VECTOR_INDEX_BACKEND:", VECTOR_INDEX_BACKEND)
     print("OPENAI_API_KEY loaded?", bool(OPENAI_API_KEY))
@@ -0,0 +1,146 @@
+"""
+Latency breakdown: answer_question() vs answer_question_async().
+
+Both run the LLM path (intent parser, rollup cube and code cache are turned
+off) against the local stub server (pipeline/llm_stub_server.py) through the
+regular provider layer, so no API key is needed and the numbers show
+pipeline overlap rather than model speed. The stub answers after --llm-ms.
+With --cold the cached orders frame is dropped before every run, so dataset
+loading is part of the critical path (sync: inside "execute"; async: the
+"load" stage, overlapped with retrieval and generation).
+
+Reported per mode (medians over questions x --repeat):
+- total_ms: end-to-end answer time
+- code_ms: question -> result table (code_seconds)
+- client_ms: generate time beyond the stub's --llm-ms, i.e. what the
+  provider, SDK and HTTP round trip add to the model latency
+- pipeline_ms: total_ms minus generate, i.e. the copilot's own overhead
+- per-stage times from the request timings (stages overlap in async mode,
+  so they can add up to more than total_ms)
+
+--concurrency N additionally answers N questions at once with
+asyncio.gather() and compares against answering them one after another.
+
+Usage:
+    python evaluation/bench_async.py --llm-ms 800 --repeat 3 --cold
+    python evaluation/bench_async.py --concurrency 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+# Force every question through retrieval + LLM + execution
+for _flag in ("USE_INTENT_PARSER", "USE_ROLLUP_CUBE", "CODE_CACHE_ENABLED"):
+    os.environ[_flag] = "false"
+
+import pandas as pd
+
+from pipeline.dataset_cache import clear_cache
+from pipeline.llm_client import OpenAIProvider, set_provider
+from pipeline.llm_stub_server import start_stub_server
+from pipeline.orchestrator import answer_question, answer_question_async
+
+QUESTIONS = [
+    "Which regions have the worst delivery performance and why?",
+    "How do discounts relate to profit across categories?",
+    "What drives late deliveries for each shipping mode?",
+    "Where should we focus to improve customer profitability?",
+]
+
+STAGES = ["load", "embed", "retrieve", "generate", "execute", "narrative"]
+
+
+def install_stub_llm(latency_ms: float):
+    server = start_stub_server(latency_ms=latency_ms)
+    set_provider(OpenAIProvider(base_url=server.base_url))
+    return server
+
+
+def run_sync(question: str, cold: bool) -> dict:
+    if cold:
+        clear_cache()
+    t0 = time.perf_counter()
+    result = answer_question(question, engine="pandas")
+    return {"total": time.perf_counter() - t0, "code": result["code_seconds"], **result["timings"]}
+
+
+# One loop for every async run, as in a server: the provider's async client
+# and its pooled connections live per event loop
+LOOP = asyncio.new_event_loop()
+
+
+def run_async(question: str, cold: bool) -> dict:
+    if cold:
+        clear_cache()
+    t0 = time.perf_counter()
+    result = LOOP.run_until_complete(answer_question_async(question, engine="pandas"))
+    return {"total": time.perf_counter() - t0, "code": result["code_seconds"], **result["timings"]}
+
+
+def summarize(mode: str, runs: list, llm_ms: float) -> dict:
+    row = {"mode": mode}
+    for key in ["total", "code"] + STAGES:
+        values = [r.get(key, 0.0) for r in runs]
+        row[f"{key}_ms"] = statistics.median(values) * 1000
+    row["client_ms"] = row["generate_ms"] - llm_ms
+    row["pipeline_ms"] = row["total_ms"] - row["generate_ms"]
+    return row
+
+
+async def _gather(questions: list) -> float:
+    t0 = time.perf_counter()
+    await asyncio.gather(*(answer_question_async(q, engine="pandas") for q in questions))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async orchestrator latency.")
+    parser.add_argument("--llm-ms", type=float, default=800, help="Stub LLM latency per call")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cold", action="store_true", help="Drop the cached frame before each run")
+    parser.add_argument("--concurrency", type=int, default=0, help="Also answer N questions at once")
+    args = parser.parse_args()
+
+    install_stub_llm(args.llm_ms)
+    run_sync(QUESTIONS[0], cold=False)  # warm imports, encoder, indexes and clients
+    run_async(QUESTIONS[0], cold=False)
+
+    sync_runs, async_runs = [], []
+    for _ in range(args.repeat):
+        for question in QUESTIONS:
+            sync_runs.append(run_sync(question, args.cold))
+            async_runs.append(run_async(question, args.cold))
+
+    df = pd.DataFrame([
+        summarize("sync", sync_runs, args.llm_ms),
+        summarize("async", async_runs, args.llm_ms),
+    ])
+    print(f"Stub LLM latency: {args.llm_ms:.0f} ms; cold frame: {args.cold}")
+    print(df.to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+    saved = df["total_ms"].iloc[0] - df["total_ms"].iloc[1]
+    print(f"\nasync saves {saved:,.1f} ms per question ({100 * saved / df['total_ms'].iloc[0]:.1f}%)")
+
+    if args.concurrency:
+        questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.concurrency)]
+        t0 = time.perf_counter()
+        for q in questions:
+            answer_question(q, engine="pandas")
+        sequential = time.perf_counter() - t0
+        concurrent = LOOP.run_until_complete(_gather(questions))
+        print(
+            f"\n{args.concurrency} questions: sequential sync {sequential:,.2f}s, "
+            f"concurrent async {concurrent:,.2f}s ({sequential / concurrent:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Compare the torch and int8 ONNX encoders (rag/encoders.py).
+
+Accuracy (ONNX vs torch as reference), on the KB chunks plus the questions
+of synthetic/qa_supplychain.json:
+- cosine_mean / cosine_min: cosine between the two embeddings of each text
+- topk_overlap: per question, share of the top --top-k KB chunks (by cosine)
+  that both encoders retrieve; top1_agree: same best chunk
+
+Speed and memory, per backend:
+- cold_start_s / rss_mb: a fresh interpreter imports the encoder, loads it
+  and encodes one query; RSS is read from /proc/self/status afterwards
+- query_ms: warm median latency of one query; batch_ms_per_text: per-text
+  time of a --batch-size batch
+
+Usage:
+    python rag/export_onnx.py
+    python evaluation/bench_encoders.py --limit 200
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import numpy as np
+import pandas as pd
+
+from rag.build_kb import load_kb_texts
+from rag.chunking import chunk_embedding_text
+from rag.encoders import ENCODER_BACKENDS, get_encoder
+
+QA_PATH = BASE_DIR / "synthetic" / "qa_supplychain.json"
+
+COLD_START_SCRIPT = """
+import sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+from rag.encoders import get_encoder
+get_encoder({backend!r}).encode(["Which region has the most late deliveries?"])
+elapsed = time.perf_counter() - t0
+rss_kb = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmRSS:"))
+print(elapsed, rss_kb / 1024)
+"""
+
+
+def load_questions(limit: int) -> list:
+    with QA_PATH.open("r", encoding="utf-8") as f:
+        questions = [ex["question"] for ex in json.load(f)]
+    return questions[:limit]
+
+
+def cold_start(backend: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT.format(root=str(BASE_DIR), backend=backend)],
+        capture_output=True, text=True, check=True,
+    )
+    seconds, rss_mb = map(float, out.stdout.strip().splitlines()[-1].split())
+    return {"cold_start_s": seconds, "rss_mb": rss_mb}
+
+
+def latency(encoder, questions: list, batch_size: int, repeat: int) -> dict:
+    single = []
+    for q in questions[:repeat]:
+        t0 = time.perf_counter()
+        encoder.encode([q])
+        single.append((time.perf_counter() - t0) * 1000)
+    batch = questions[:batch_size]
+    t0 = time.perf_counter()
+    encoder.encode(batch, batch_size=batch_size)
+    batch_ms = (time.perf_counter() - t0) * 1000
+    return {"query_ms": statistics.median(single), "batch_ms_per_text": batch_ms / len(batch)}
+
+
+def agreement(ref_kb, ref_q, cand_kb, cand_q, top_k: int) -> dict:
+    cos_kb = (ref_kb * cand_kb).sum(axis=1)
+    cos_q = (ref_q * cand_q).sum(axis=1)
+    cosines = np.concatenate([cos_kb, cos_q])
+    ref_top = np.argsort(-(ref_q @ ref_kb.T), axis=1)[:, :top_k]
+    cand_top = np.argsort(-(cand_q @ cand_kb.T), axis=1)[:, :top_k]
+    overlap = [len(set(a) & set(b)) / top_k for a, b in zip(ref_top, cand_top)]
+    return {
+        "cosine_mean": float(cosines.mean()),
+        "cosine_min": float(cosines.min()),
+        f"top{top_k}_overlap": float(np.mean(overlap)),
+        "top1_agree": float(np.mean(ref_top[:, 0] == cand_top[:, 0])),
+    }
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Torch vs int8 ONNX encoder.")
+    parser.add_argument("--limit", type=int, default=200, help="Number of questions")
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    questions = load_questions(args.limit)
+    texts, metadatas, _ = load_kb_texts()
+    kb_texts = [chunk_embedding_text(t, m["heading_path"]) for t, m in zip(texts, metadatas)]
+
+    rows, embeddings = [], {}
+    for backend in ENCODER_BACKENDS:
+        row = {"backend": backend, **cold_start(backend)}
+        encoder = get_encoder(backend)
+        embeddings[backend] = (
+            _normalize(encoder.encode(kb_texts)),
+            _normalize(encoder.encode(questions)),
+        )
+        row.update(latency(encoder, questions, args.batch_size, args.repeat))
+        rows.append(row)
+
+    fmt = lambda v: f"{v:,.3f}"
+    print(pd.DataFrame(rows).to_string(index=False, float_format=fmt))
+
+    accuracy = agreement(*embeddings["torch"], *embeddings["onnx"], args.top_k)
+    print(f"\nONNX int8 vs torch on {len(kb_texts)} KB chunks and {len(questions)} questions:")
+    print(pd.DataFrame([accuracy]).to_string(index=False, float_format=fmt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark the pandas and DuckDB SQL execution engines.
+
+Runs each question of tests/test_questions.md on both engines and reports
+median wall time plus whether the two result tables agree. By default it
+uses the hand-written reference pandas/SQL below, so it needs no API key;
+--generate asks the LLM for code and SQL instead (like the app does).
+
+pandas is timed twice: on the warm process-wide frame (dataset_cache) and
+including the parquet load; SQL always scans the parquet files.
+
+Usage:
+    python evaluation/bench_engines.py --repeat 5
+    python evaluation/bench_engines.py --generate
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import numpy as np
+import pandas as pd
+
+from pipeline.data_runner import load_processed_df, run_pandas_code
+from pipeline.dataset_cache import get_orders_df
+from pipeline.sql_engine import run_sql
+
+QUESTIONS_PATH = BASE_DIR / "tests" / "test_questions.md"
+
+# Reference (pandas, SQL) per question number in test_questions.md
+REFERENCE = {
+    1: (
+        "result_df = df.groupby('order_region').agg(total_sales=('sales', 'sum'), "
+        "avg_benefit=('benefit_per_order', 'mean')).sort_values('total_sales', ascending=False).reset_index()",
+        "SELECT order_region, SUM(sales) AS total_sales, AVG(benefit_per_order) AS avg_benefit "
+        "FROM orders GROUP BY order_region ORDER BY total_sales DESC",
+    ),
+    2: (
+        "result_df = df.groupby('order_region')['on_time_delivery'].mean().mul(100)"
+        ".rename('on_time_rate').sort_values(ascending=False).reset_index()",
+        "SELECT order_region, AVG(CAST(on_time_delivery AS DOUBLE)) * 100 AS on_time_rate "
+        "FROM orders GROUP BY order_region ORDER BY on_time_rate DESC",
+    ),
+    3: (
+        "result_df = df.groupby('customer_segment').agg(avg_profit=('order_profit_per_order', 'mean'), "
+        "total_sales=('sales', 'sum')).sort_values('avg_profit', ascending=False).reset_index()",
+        "SELECT customer_segment, AVG(order_profit_per_order) AS avg_profit, SUM(sales) AS total_sales "
+        "FROM orders GROUP BY customer_segment ORDER BY avg_profit DESC",
+    ),
+    4: (
+        "result_df = df.groupby('order_region').agg(late_risk=('late_delivery_risk', 'mean'), "
+        "avg_profit=('order_profit_per_order', 'mean')).sort_values('late_risk', ascending=False).reset_index()",
+        "SELECT order_region, AVG(late_delivery_risk) AS late_risk, AVG(order_profit_per_order) AS avg_profit "
+        "FROM orders GROUP BY order_region ORDER BY late_risk DESC",
+    ),
+    5: (
+        "result_df = df.groupby('category_name').agg(total_sales=('sales', 'sum'), "
+        "avg_profit=('order_profit_per_order', 'mean')).sort_values('total_sales', ascending=False)"
+        ".head(10).reset_index()",
+        "SELECT category_name, SUM(sales) AS total_sales, AVG(order_profit_per_order) AS avg_profit "
+        "FROM orders GROUP BY category_name ORDER BY total_sales DESC LIMIT 10",
+    ),
+}
+
+
+def load_questions() -> list:
+    """Questions listed under **Question:** headings in test_questions.md."""
+    text = QUESTIONS_PATH.read_text(encoding="utf-8")
+    return [q.strip() for q in re.findall(r"\*\*Question:\*\*\s*\n(.+)", text)]
+
+
+def _median_ms(fn, repeat: int):
+    times, out = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, out
+
+
+def results_agree(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    """Same shape and numerically equal values, ignoring column names/dtypes."""
+    if a.shape != b.shape:
+        return False
+    for col_a, col_b in zip(a.columns, b.columns):
+        x, y = a[col_a], b[col_b]
+        if pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y):
+            if not np.allclose(x.to_numpy(float), y.to_numpy(float), rtol=1e-4, equal_nan=True):
+                return False
+        elif list(x.astype(str)) != list(y.astype(str)):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--generate", action="store_true", help="Use LLM-generated code/SQL.")
+    args = parser.parse_args()
+
+    if args.generate:
+        from pipeline.code_generator import generate_pandas_code, generate_sql
+
+    get_orders_df()  # warm the process-wide frame
+    rows = []
+    for i, question in enumerate(load_questions(), start=1):
+        if args.generate:
+            code, sql = generate_pandas_code(question), generate_sql(question)
+        else:
+            code, sql = REFERENCE[i]
+
+        warm_ms, (pandas_df, _) = _median_ms(
+            lambda: run_pandas_code(get_orders_df(), code), args.repeat
+        )
+        cold_ms, _ = _median_ms(lambda: run_pandas_code(load_processed_df(), code), args.repeat)
+        sql_ms, (sql_df, _) = _median_ms(lambda: run_sql(sql), args.repeat)
+
+        rows.append(
+            {
+                "q": i,
+                "pandas_warm_ms": warm_ms,
+                "pandas_with_load_ms": cold_ms,
+                "sql_ms": sql_ms,
+                "rows": len(sql_df),
+                "agree": results_agree(pandas_df, sql_df),
+            }
+        )
+
+    for i, question in enumerate(load_questions(), start=1):
+        print(f"Q{i}: {question}")
+    print()
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Coverage and latency of the rule-based intent parser (pipeline/intent_parser.py).
+
+Questions: synthetic/qa_supplychain.json plus tests/test_questions.md.
+
+- coverage: share of questions parsed, per question shape
+- parse_us: median time to parse one question
+- template_ms: median time from question to result table on the template
+  path (parse, render pandas code, run it on the cached frame)
+- llm_ms (--llm only): median time of generate_pandas_code() for the same
+  questions, i.e. what the template path saves per question; needs
+  OPENAI_API_KEY (or LLM_BASE_URL) and makes one API call per question
+
+--show lists every question with its intent, or "-> LLM" if it did not parse.
+
+Usage:
+    python evaluation/bench_intent_parser.py
+    python evaluation/bench_intent_parser.py --llm --limit 20 --show
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import pandas as pd
+
+from pipeline.data_runner import run_pandas_code
+from pipeline.dataset_cache import get_orders_df
+from pipeline.intent_parser import parse_question
+
+QA_PATH = BASE_DIR / "synthetic" / "qa_supplychain.json"
+QUESTIONS_PATH = BASE_DIR / "tests" / "test_questions.md"
+
+
+def load_questions(limit: int) -> list:
+    with QA_PATH.open("r", encoding="utf-8") as f:
+        questions = [ex["question"] for ex in json.load(f)][:limit]
+    text = QUESTIONS_PATH.read_text(encoding="utf-8")
+    return questions + [q.strip() for q in re.findall(r"\*\*Question:\*\*\s*\n(.+)", text)]
+
+
+def _ms(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent parser coverage and latency.")
+    parser.add_argument("--limit", type=int, default=80, help="Synthetic questions to use")
+    parser.add_argument("--llm", action="store_true", help="Also time LLM code generation")
+    parser.add_argument("--show", action="store_true", help="List every question")
+    args = parser.parse_args()
+
+    questions = load_questions(args.limit)
+    df = get_orders_df()
+
+    rows = []
+    for question in questions:
+        parse_question(question)  # warm the alias table
+        parse_us = statistics.median(_ms(lambda: parse_question(question)) for _ in range(5)) * 1000
+        intent = parse_question(question)
+        row = {"question": question[:60], "shape": intent.shape if intent else "-", "parse_us": parse_us}
+        if intent is not None:
+            row["template_ms"] = _ms(
+                lambda: run_pandas_code(df, parse_question(question).to_pandas_code())
+            )
+        if args.llm:
+            # Imported here: timing the LLM path is opt-in
+            from pipeline.code_generator import generate_pandas_code
+
+            row["llm_ms"] = _ms(lambda: generate_pandas_code(question))
+        if args.show:
+            described = (
+                f"{intent.agg}({intent.metric}) by {intent.by + (['month'] if intent.by_month else [])}"
+                if intent else "-> LLM"
+            )
+            print(f"{question[:70]:<70} {described}")
+        rows.append(row)
+
+    results = pd.DataFrame(rows)
+    fmt = lambda v: f"{v:,.2f}"
+    shapes = results.groupby("shape").size().rename("questions").reset_index()
+    print()
+    print(shapes.to_string(index=False))
+
+    parsed = results[results["shape"] != "-"]
+    summary = {
+        "questions": len(results),
+        "coverage": len(parsed) / len(results),
+        "parse_us": results["parse_us"].median(),
+        "template_ms": parsed["template_ms"].median() if len(parsed) else float("nan"),
+    }
+    if args.llm:
+        summary["llm_ms"] = results["llm_ms"].median()
+    print()
+    print(pd.DataFrame([summary]).to_string(index=False, float_format=fmt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark full vs pruned loads of the processed orders dataset.
+
+For each scenario it reports rows/columns returned, wall time and bytes
+read from disk (the `rchar` counter in /proc/self/io, Linux only).
+
+Usage:
+    python evaluation/bench_parquet_pruning.py --market Europe --year 2017
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from pipeline.data_runner import load_processed_df
+
+PROJECTED_COLUMNS = ["order_region", "sales", "order_date"]
+
+
+def _bytes_read():
+    """Cumulative bytes this process has read via read()/pread(), or None."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def measure(name: str, repeat: int, **load_kwargs) -> dict:
+    times = []
+    read = []
+    for _ in range(repeat):
+        before = _bytes_read()
+        start = time.perf_counter()
+        df = load_processed_df(**load_kwargs)
+        times.append(time.perf_counter() - start)
+        after = _bytes_read()
+        if before is not None and after is not None:
+            read.append(after - before)
+
+    return {
+        "scenario": name,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "median_ms": statistics.median(times) * 1000,
+        "mb_read": statistics.median(read) / 1e6 if read else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--market", default="Europe")
+    parser.add_argument("--year", type=int, default=2017)
+    parser.add_argument("--month", type=int, default=6, help="Month for the row-group scenario")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    partition_filter = [("market", "==", args.market), ("order_year", "==", args.year)]
+    month_start = pd.Timestamp(args.year, args.month, 1)
+    month_end = month_start + pd.offsets.MonthBegin(1)
+    month_filter = (
+        (ds.field("market") == args.market)
+        & (ds.field("order_date") >= month_start)
+        & (ds.field("order_date") < month_end)
+    )
+
+    results = [
+        measure("full table", args.repeat),
+        measure("column projection", args.repeat, columns=PROJECTED_COLUMNS),
+        measure(
+            f"partition {args.market}/{args.year}",
+            args.repeat,
+            columns=PROJECTED_COLUMNS,
+            filters=partition_filter,
+        ),
+        measure(
+            f"row groups {args.market} {month_start:%Y-%m}",
+            args.repeat,
+            columns=PROJECTED_COLUMNS,
+            filters=month_filter,
+        ),
+    ]
+
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+
+if __name__ == "__main__":
+    main()
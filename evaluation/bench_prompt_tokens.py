@@ -0,0 +1,117 @@
+"""
+Prompt tokens per question: whole-file KB documents vs heading chunks.
+
+For each question of tests/test_questions.md the code-generation prompt
+(code_generator.build_prompt) is built twice:
+
+- files:  the KB embedded one document per markdown file, top --file-k
+          files pasted in full (the behaviour before rag/chunking.py)
+- chunks: the KB split into heading-scoped chunks, top --chunk-k chunks,
+          adjacent chunks merged (what the retriever does now)
+
+Both indexes are built in memory, so no prior build_kb run is needed. Tokens
+are counted with tiktoken when it is installed (cl100k_base), else
+estimated as characters / 4. No LLM call is made.
+
+Usage:
+    python evaluation/bench_prompt_tokens.py --chunk-k 4
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import pandas as pd
+
+from config import KB_BASE_PATH
+from pipeline.code_generator import build_prompt
+from rag.build_kb import load_kb_texts
+from rag.chunking import chunk_embedding_text
+from rag.retriever import _get_embedding_model, embed_queries, merge_adjacent_chunks
+from rag.vector_index import NumpyIndex, _normalize_rows
+
+QUESTIONS_PATH = BASE_DIR / "tests" / "test_questions.md"
+
+
+def load_questions() -> list:
+    """Questions listed under **Question:** headings in test_questions.md."""
+    text = QUESTIONS_PATH.read_text(encoding="utf-8")
+    return [q.strip() for q in re.findall(r"\*\*Question:\*\*\s*\n(.+)", text)]
+
+
+def token_counter():
+    try:
+        import tiktoken
+    except ImportError:
+        return (lambda text: len(text) // 4), "chars/4"
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return (lambda text: len(encoding.encode(text))), "tiktoken"
+
+
+def _memory_index(embed_texts, texts, metadatas, ids) -> NumpyIndex:
+    embeddings = _get_embedding_model().encode(embed_texts)
+    return NumpyIndex(_normalize_rows(embeddings), texts, metadatas, ids)
+
+
+def file_index() -> NumpyIndex:
+    paths = sorted(KB_BASE_PATH.rglob("*.md"))
+    texts = [p.read_text(encoding="utf-8") for p in paths]
+    metadatas = [
+        {"relative_path": p.relative_to(KB_BASE_PATH).as_posix(), "category": p.parts[-2]}
+        for p in paths
+    ]
+    return _memory_index(texts, texts, metadatas, [m["relative_path"] for m in metadatas])
+
+
+def chunk_index() -> NumpyIndex:
+    texts, metadatas, ids = load_kb_texts()
+    embed_texts = [chunk_embedding_text(t, m["heading_path"]) for t, m in zip(texts, metadatas)]
+    return _memory_index(embed_texts, texts, metadatas, ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt tokens: whole files vs chunks.")
+    parser.add_argument("--file-k", type=int, default=4)
+    parser.add_argument("--chunk-k", type=int, default=4)
+    args = parser.parse_args()
+
+    count, method = token_counter()
+    questions = load_questions()
+    query_embs = embed_queries(questions, use_cache=False)
+    by_file = file_index().query(query_embs, top_k=args.file_k)
+    by_chunk = chunk_index().query(query_embs, top_k=args.chunk_k)
+
+    results = []
+    for question, files, chunks in zip(questions, by_file, by_chunk):
+        chunks = merge_adjacent_chunks(chunks)
+        before = count(build_prompt(question, files))
+        after = count(build_prompt(question, chunks))
+        results.append(
+            {
+                "question": question[:50],
+                "files_tokens": before,
+                "chunks_tokens": after,
+                "saved_pct": 100 * (before - after) / before,
+                "chunk_sources": ", ".join(
+                    sorted({c["metadata"]["relative_path"].split("/")[-1] for c in chunks})
+                ),
+            }
+        )
+
+    df = pd.DataFrame(results)
+    print(f"Token counting: {method}")
+    print(df.to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+    print(
+        f"\nMean prompt tokens: {df['files_tokens'].mean():,.0f} -> "
+        f"{df['chunks_tokens'].mean():,.0f} "
+        f"({100 * (1 - df['chunks_tokens'].sum() / df['files_tokens'].sum()):.0f}% fewer)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark batched vs one-at-a-time KB retrieval throughput on CPU.
+
+Questions come from synthetic/qa_supplychain.json. For each batch size the
+same question list is retrieved with retrieve_context_many() in batches of
+that size; batch size 1 is the old per-query path (one encode, one store
+lookup per question). The embedding cache is bypassed so every query pays
+for its encoder pass.
+
+Usage:
+    python evaluation/bench_retrieval_batch.py --batch-sizes 1 4 16 64
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import pandas as pd
+
+from rag.retriever import _get_embedding_model, _get_index, retrieve_context_many
+
+QA_PATH = BASE_DIR / "synthetic" / "qa_supplychain.json"
+
+
+def load_questions(limit: int) -> list:
+    with QA_PATH.open("r", encoding="utf-8") as f:
+        questions = [ex["question"] for ex in json.load(f)]
+    return questions[:limit]
+
+
+def measure(questions: list, batch_size: int, top_k: int) -> dict:
+    start = time.perf_counter()
+    for i in range(0, len(questions), batch_size):
+        retrieve_context_many(questions[i : i + batch_size], top_k=top_k, use_cache=False)
+    elapsed = time.perf_counter() - start
+    return {
+        "batch_size": batch_size,
+        "queries": len(questions),
+        "seconds": elapsed,
+        "queries_per_sec": len(questions) / elapsed,
+        "ms_per_query": elapsed / len(questions) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--limit", type=int, default=64, help="Number of questions")
+    parser.add_argument("--top-k", type=int, default=4)
+    args = parser.parse_args()
+
+    questions = load_questions(args.limit)
+
+    # Load the model and store up front so they are not charged to batch size 1
+    _get_embedding_model()
+    _get_index()
+    retrieve_context_many(questions[:2], top_k=args.top_k, use_cache=False)
+
+    results = [measure(questions, b, args.top_k) for b in args.batch_sizes]
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+
+if __name__ == "__main__":
+    main()
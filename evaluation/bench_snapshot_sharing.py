@@ -0,0 +1,112 @@
+"""
+Benchmark per-worker memory when N processes hold the orders table.
+
+Each worker is a fresh (spawned) interpreter that loads the full frame
+either from the parquet dataset or from the memory-mapped Arrow snapshot,
+touches every numeric column, then reports the growth of its
+/proc/self/smaps_rollup counters (Linux only):
+
+- rss:     resident pages mapped by the worker
+- shared:  resident pages also mapped by another process (page cache)
+- private: resident pages only this worker maps (heap copies)
+- pss:     proportional share; sum over workers = real node memory
+
+Usage:
+    python evaluation/bench_snapshot_sharing.py --workers 1 4 16
+"""
+
+import argparse
+import multiprocessing as mp
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import pandas as pd
+
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+    "Private_Clean": "private",
+    "Private_Dirty": "private",
+}
+
+
+def _smaps_mb() -> dict:
+    """Memory counters of this process in MB (kB values from smaps_rollup)."""
+    totals = dict.fromkeys(set(SMAPS_FIELDS.values()), 0.0)
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            key = line.split(":", 1)[0]
+            if key in SMAPS_FIELDS:
+                totals[SMAPS_FIELDS[key]] += int(line.split()[1]) / 1024
+    return totals
+
+
+def _worker(use_snapshot: bool, barrier, results):
+    # Import inside the worker so the baseline includes pandas/pyarrow
+    from pipeline.data_runner import load_processed_df
+
+    before = _smaps_mb()
+    df = load_processed_df(use_snapshot=use_snapshot)
+    for col in df.select_dtypes("number").columns:
+        df[col].sum()
+
+    # Measure only once every worker has mapped the data
+    barrier.wait()
+    after = _smaps_mb()
+    barrier.wait()
+    results.put({k: after[k] - before[k] for k in after})
+
+
+def measure(source: str, workers: int) -> dict:
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(source == "snapshot", barrier, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    per_worker = pd.DataFrame(rows).mean()
+    return {
+        "source": source,
+        "workers": workers,
+        "rss_mb": per_worker["rss"],
+        "shared_mb": per_worker["shared"],
+        "private_mb": per_worker["private"],
+        "pss_mb": per_worker["pss"],
+        "total_pss_mb": per_worker["pss"] * workers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    from pipeline.arrow_snapshot import snapshot_is_fresh
+
+    if not snapshot_is_fresh():
+        sys.exit("Arrow snapshot missing or stale; re-run pipeline/data_loader.py first.")
+
+    results = [
+        measure(source, n)
+        for source in ("parquet", "snapshot")
+        for n in args.workers
+    ]
+    print("Memory growth per worker after loading the table (MB):")
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+
+
+if __name__ == "__main__":
+    main()
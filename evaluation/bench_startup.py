@@ -0,0 +1,118 @@
+"""
+Import-time profile and startup guard for the app's import graph.
+
+For each target module, a fresh interpreter runs `python -X importtime -c
+"import <target>"` and the report shows:
+
+- wall_ms: total import time of the target
+- per-package self time (sum over all its submodules), most expensive
+  first: the per-module cost of startup
+- heavy: which heavy backends (torch, transformers, openai, chromadb, ...)
+  ended up in sys.modules; these must load on first use, not at import
+
+--check exits with status 1 if any target imports a heavy backend, so a
+regression (a module-level `import torch` creeping back) fails CI.
+
+Usage:
+    python evaluation/bench_startup.py
+    python evaluation/bench_startup.py --targets pipeline.orchestrator --top 15 --check
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import pandas as pd
+
+DEFAULT_TARGETS = ["pipeline.orchestrator", "rag.retriever", "pipeline.dataset_cache"]
+
+# Backends that must only be imported when first used
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "peft",
+    "sentence_transformers",
+    "chromadb",
+    "onnxruntime",
+    "openai",
+    "duckdb",
+]
+
+PROBE_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import {target}
+wall_ms = (time.perf_counter() - t0) * 1000
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"wall_ms": wall_ms, "heavy": heavy}}))
+"""
+
+
+def profile(target: str) -> dict:
+    script = PROBE_SCRIPT.format(root=str(BASE_DIR), target=target, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True, text=True, cwd=str(BASE_DIR),
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{out.stderr[-2000:]}")
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    # "import time: self [us] | cumulative | imported package"
+    self_us = defaultdict(int)
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_part, _, name = line[len("import time:"):].split("|", 2)
+        self_us[name.strip().split(".")[0]] += int(self_part)
+    result["packages"] = self_us
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile app import time.")
+    parser.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target (median wall time)")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed per target")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a heavy backend is imported")
+    args = parser.parse_args()
+
+    summary, failed = [], False
+    for target in args.targets:
+        runs = [profile(target) for _ in range(args.repeat)]
+        last = runs[-1]
+        summary.append(
+            {
+                "target": target,
+                "wall_ms": statistics.median(r["wall_ms"] for r in runs),
+                "heavy": ", ".join(last["heavy"]) or "-",
+            }
+        )
+        failed |= bool(last["heavy"])
+
+        packages = sorted(last["packages"].items(), key=lambda kv: -kv[1])[: args.top]
+        print(f"\n{target}: import cost by package (self time, last run)")
+        print(
+            pd.DataFrame(
+                [{"package": name, "self_ms": us / 1000} for name, us in packages]
+            ).to_string(index=False, float_format=lambda v: f"{v:,.1f}")
+        )
+
+    print()
+    print(pd.DataFrame(summary).to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+    if args.check and failed:
+        print("\nFAIL: heavy backends imported at startup")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Time to first useful output with streaming (orchestrator.stream_answer).
+
+For each question, the time from submitting it to the first event of each
+type is recorded:
+
+- first_ms: first event of any kind (what the UI can show first)
+- code_token_ms / code_ms: first streamed code token / final code
+- result_ms: result table ready
+- narrative_ms: narrative complete
+- done_ms: whole pipeline (what the user waited for before streaming)
+
+LLM questions need OPENAI_API_KEY, or LLM_BASE_URL pointing at
+pipeline/llm_stub_server.py to run offline; questions the intent parser or cube
+answer never reach the LLM and have no code tokens.
+
+Usage:
+    python evaluation/bench_streaming.py
+    python evaluation/bench_streaming.py --engine sql --questions "Sales by region" "Why are deliveries late?"
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import pandas as pd
+
+from pipeline.orchestrator import stream_answer
+
+DEFAULT_QUESTIONS = [
+    "What is the on_time_delivery rate by order_region?",
+    "Top 5 countries by total profit",
+    "What is the total sales and average benefit per order by order_region?",
+    "Which product category has the highest total sales and which has the highest average profit per order?",
+]
+
+EVENT_COLUMNS = {
+    "code_token": "code_token_ms",
+    "code": "code_ms",
+    "result": "result_ms",
+    "narrative": "narrative_ms",
+    "done": "done_ms",
+}
+
+
+def profile(question: str, engine: str) -> dict:
+    row = {"question": question[:50]}
+    t0 = time.perf_counter()
+    for event in stream_answer(question, engine=engine):
+        elapsed = (time.perf_counter() - t0) * 1000
+        row.setdefault("first_ms", elapsed)
+        column = EVENT_COLUMNS.get(event["type"])
+        if column:
+            row.setdefault(column, elapsed)
+        if event["type"] == "error":
+            raise event["error"]
+        if event["type"] == "done":
+            row["path"] = event["result"]["path"]
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming time to first output.")
+    parser.add_argument("--engine", default=None, choices=["pandas", "sql"])
+    parser.add_argument("--questions", nargs="+", default=DEFAULT_QUESTIONS)
+    args = parser.parse_args()
+
+    rows = [profile(q, args.engine) for q in args.questions]
+    columns = ["question", "path", "first_ms"] + list(EVENT_COLUMNS.values())
+    print(
+        pd.DataFrame(rows)
+        .reindex(columns=columns)
+        .to_string(index=False, float_format=lambda v: f"{v:,.1f}", na_rep="-")
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark the KB vector index backends (rag/vector_index.py).
+
+For each backend:
+- cold_start_ms: a fresh interpreter imports the backend, opens the index
+  and answers one query (median over --cold-runs subprocesses); this is
+  what the first question after an app (re)start pays
+- query_ms / batch_ms: warm in-process latency of one query and of one
+  --batch-size multi-query lookup (median over --repeats)
+
+Query vectors are random unit vectors, so the encoder is not involved. By
+default the indexes built by rag/build_kb.py are used; --synthetic N builds
+throwaway indexes of N random documents instead.
+
+Usage:
+    python rag/build_kb.py --backend all
+    python evaluation/bench_vector_index.py
+    python evaluation/bench_vector_index.py --synthetic 5000 --backends numpy
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import numpy as np
+import pandas as pd
+
+from config import CHROMA_DB_DIR, NUMPY_INDEX_DIR
+from rag.vector_index import BACKENDS
+
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+
+COLD_START_SCRIPT = """
+import sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+import numpy as np
+from rag.vector_index import BACKENDS
+index = BACKENDS[{backend!r}].load({path!r})
+dim = {dim}
+index.query(np.ones((1, dim), dtype=np.float32), top_k={top_k})
+print((time.perf_counter() - t0) * 1000)
+"""
+
+
+def build_synthetic(n_docs: int, workdir: Path, backends, float16: bool) -> dict:
+    """Random-document indexes in `workdir`; returns backend -> path."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((n_docs, EMBEDDING_DIM)).astype(np.float32)
+    texts = [f"synthetic document {i}" for i in range(n_docs)]
+    metadatas = [{"relative_path": f"doc_{i}.md", "category": "synthetic"} for i in range(n_docs)]
+    ids = [str(i) for i in range(n_docs)]
+
+    paths = {}
+    if "numpy" in backends:
+        paths["numpy"] = workdir / "numpy_index"
+        BACKENDS["numpy"].build(
+            embeddings, texts, metadatas, ids,
+            index_dir=paths["numpy"], dtype="float16" if float16 else "float32",
+        )
+    if "chroma" in backends:
+        paths["chroma"] = workdir / "chroma_store"
+        BACKENDS["chroma"].build(embeddings, texts, metadatas, ids, db_dir=paths["chroma"])
+    return paths
+
+
+def cold_start_ms(backend: str, path: Path, dim: int, top_k: int, runs: int) -> float:
+    script = COLD_START_SCRIPT.format(
+        root=str(BASE_DIR), backend=backend, path=str(path), dim=dim, top_k=top_k
+    )
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def warm_ms(index, queries: np.ndarray, top_k: int, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        index.query(queries, top_k=top_k)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def _index_dim(backend: str, index) -> int:
+    if backend == "numpy":
+        return index.embeddings.shape[1]
+    sample = index.collection.get(limit=1, include=["embeddings"])
+    return len(sample["embeddings"][0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark N random documents")
+    parser.add_argument("--float16", action="store_true", help="float16 synthetic NumPy index")
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--cold-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            paths = build_synthetic(args.synthetic, Path(tmp), args.backends, args.float16)
+        else:
+            paths = {"numpy": NUMPY_INDEX_DIR, "chroma": CHROMA_DB_DIR}
+
+        rng = np.random.default_rng(1)
+        results = []
+        for backend in args.backends:
+            index = BACKENDS[backend].load(paths[backend])
+            dim = _index_dim(backend, index)
+            queries = rng.standard_normal((args.batch_size, dim)).astype(np.float32)
+            index.query(queries[:1], top_k=args.top_k)  # warm up
+
+            results.append(
+                {
+                    "backend": backend,
+                    "docs": len(index),
+                    "cold_start_ms": cold_start_ms(
+                        backend, paths[backend], dim, args.top_k, args.cold_runs
+                    ),
+                    "query_ms": warm_ms(index, queries[:1], args.top_k, args.repeats),
+                    f"batch{args.batch_size}_ms": warm_ms(
+                        index, queries, args.top_k, args.repeats
+                    ),
+                }
+            )
+
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Retrieval quality and latency per retrieval mode (dense / lexical / hybrid).
+
+Each question of tests/test_questions.md has a hand-labelled set of KB files
+that should be retrieved (GOLD below). For every mode it reports, over the
+top --top-k chunks:
+
+- recall: share of the gold files that appear among the retrieved chunks
+- hit:    share of questions with at least one gold file retrieved
+- mrr:    mean reciprocal rank of the first chunk from a gold file
+- ms:     median per-question retrieval latency (warm indexes; query
+          embeddings cached after the first pass unless --no-cache)
+
+Needs the indexes from `python rag/build_kb.py`.
+
+Usage:
+    python evaluation/eval_retrieval.py --top-k 4
+    python evaluation/eval_retrieval.py --modes dense hybrid --details
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import pandas as pd
+
+from rag.retriever import RETRIEVAL_MODES, retrieve_context_many
+
+QUESTIONS_PATH = BASE_DIR / "tests" / "test_questions.md"
+
+# Relevant KB files per question number in test_questions.md
+GOLD = {
+    1: {"metric_definitions/revenue_profit.md", "schema_docs/supply_chain_schema.md"},
+    2: {"metric_definitions/on_time_delivery_rate.md"},
+    3: {"metric_definitions/revenue_profit.md", "business_playbook/customer_segments.md"},
+    4: {"metric_definitions/revenue_profit.md", "business_playbook/fulfillment_risks.md"},
+    5: {"metric_definitions/revenue_profit.md", "schema_docs/supply_chain_schema.md"},
+}
+
+
+def load_questions() -> list:
+    """Questions listed under **Question:** headings in test_questions.md."""
+    text = QUESTIONS_PATH.read_text(encoding="utf-8")
+    return [q.strip() for q in re.findall(r"\*\*Question:\*\*\s*\n(.+)", text)]
+
+
+def score(docs: list, gold: set) -> dict:
+    files = [d["metadata"]["relative_path"] for d in docs]
+    first = next((rank for rank, f in enumerate(files, start=1) if f in gold), None)
+    return {
+        "recall": len(gold & set(files)) / len(gold),
+        "hit": float(first is not None),
+        "mrr": 1.0 / first if first else 0.0,
+    }
+
+
+def evaluate(mode: str, questions: list, top_k: int, use_cache: bool, repeat: int):
+    rows, details = [], []
+    for n, question in enumerate(questions, start=1):
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            docs = retrieve_context_many([question], top_k=top_k, use_cache=use_cache, merge=False, mode=mode)[0]
+            timings.append((time.perf_counter() - t0) * 1000)
+        metrics = score(docs, GOLD.get(n, set()))
+        metrics["ms"] = statistics.median(timings)
+        rows.append(metrics)
+        details.append(
+            {
+                "mode": mode,
+                "q": n,
+                **metrics,
+                "retrieved": ", ".join(
+                    f"{d['metadata']['relative_path'].split('/')[-1]}#{d['metadata'].get('chunk_index', '')}"
+                    for d in docs
+                ),
+            }
+        )
+    summary = {"mode": mode, **pd.DataFrame(rows).mean().to_dict()}
+    summary["ms"] = statistics.median(r["ms"] for r in rows)
+    return summary, details
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate KB retrieval modes.")
+    parser.add_argument("--modes", nargs="+", choices=RETRIEVAL_MODES, default=list(RETRIEVAL_MODES))
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-cache", action="store_true", help="Re-encode the question on every call")
+    parser.add_argument("--details", action="store_true", help="Per-question results")
+    args = parser.parse_args()
+
+    questions = load_questions()
+    # Load the model and indexes up front so the first mode is not charged
+    retrieve_context_many(questions[:1], top_k=args.top_k, merge=False, mode="hybrid")
+
+    summaries, details = [], []
+    for mode in args.modes:
+        summary, rows = evaluate(mode, questions, args.top_k, not args.no_cache, args.repeat)
+        summaries.append(summary)
+        details += rows
+
+    fmt = lambda v: f"{v:,.3f}"
+    print(pd.DataFrame(summaries).to_string(index=False, float_format=fmt))
+    if args.details:
+        print()
+        print(pd.DataFrame(details).to_string(index=False, float_format=fmt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Memory-mapped Arrow snapshot of the processed orders table.
+
+- One uncompressed Arrow IPC (Feather v2) file per manifest fragment in
+  data/processed/snapshot/, streamed batch by batch from that fragment's
+  parquet files; an append only writes the file of its delta, a full
+  ingest a new base file, and files of fragments no longer in the manifest
+  are pruned
+- Files are named after their fragment's manifest record (snapshot_path),
+  so a file never describes other rows than its name says
+- Opened with pa.memory_map(): column buffers point straight into the OS page
+  cache, so every process on the host that maps the files shares the same
+  physical pages instead of holding a private decoded copy
+- A snapshot missing the file of any fragment (e.g. an append wrote new
+  fragments but the snapshot step was interrupted) is ignored and the
+  parquet files are read instead
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from config import DATA_SNAPSHOT_DIR, USE_ARROW_SNAPSHOT
+from pipeline.manifest import load_manifest
+
+# Rows per IPC record batch (keeps per-batch buffers page aligned and small)
+SNAPSHOT_BATCH_ROWS = 1 << 17
+
+# columns (None: all) -> record batches of the table, in row order
+BatchSource = Callable[[Optional[List[str]]], Iterable[pa.RecordBatch]]
+
+
+def coalesce_batches(
+    batches: Iterable[pa.RecordBatch], rows: int = SNAPSHOT_BATCH_ROWS
+) -> Iterator[pa.RecordBatch]:
+    """
+    Regroup record batches (e.g. one per small parquet file) into batches of
+    about `rows` rows; per-batch work then pays its fixed costs less often.
+    """
+    pending, pending_rows = [], 0
+    for batch in batches:
+        if not batch.num_rows:
+            continue
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= rows:
+            yield _combine(pending)
+            pending, pending_rows = [], 0
+    if pending:
+        yield _combine(pending)
+
+
+def _combine(batches: List[pa.RecordBatch]) -> pa.RecordBatch:
+    if len(batches) == 1:
+        return batches[0]
+    table = pa.Table.from_batches(batches).unify_dictionaries().combine_chunks()
+    return table.to_batches()[0]
+
+
+def _unified_dictionaries(
+    schema: pa.Schema, batch_source: BatchSource
+) -> Dict[str, pa.Array]:
+    """One dictionary per dictionary column, holding every value of every batch."""
+    names = [f.name for f in schema if pa.types.is_dictionary(f.type)]
+    dictionaries = {
+        name: pa.array([], type=schema.field(name).type.value_type) for name in names
+    }
+    if not names:
+        return dictionaries
+    for batch in batch_source(names):
+        for name in names:
+            seen = dictionaries[name]
+            values = batch.column(name).dictionary
+            new = values.filter(pc.invert(pc.is_in(values, value_set=seen)))
+            if len(new):
+                dictionaries[name] = pa.concat_arrays([seen, new])
+    return dictionaries
+
+
+def _conform_batch(
+    batch: pa.RecordBatch, schema: pa.Schema, dictionaries: Dict[str, pa.Array]
+) -> pa.RecordBatch:
+    """Re-encode the dictionary columns of `batch` against `dictionaries`."""
+    columns = []
+    for field, column in zip(schema, batch.columns):
+        if field.name in dictionaries:
+            unified = dictionaries[field.name]
+            indices = pc.index_in(column.dictionary, value_set=unified).take(column.indices)
+            column = pa.DictionaryArray.from_arrays(
+                indices.cast(field.type.index_type), unified
+            )
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def snapshot_path(fragment: dict) -> Path:
+    """IPC file holding the rows of one manifest fragment."""
+    record = {k: fragment.get(k) for k in ("files", "rows", "kind", "created_at")}
+    digest = hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+    return DATA_SNAPSHOT_DIR / f"{digest[:16]}.arrow"
+
+
+def write_snapshot(path: Path, schema: pa.Schema, batch_source: BatchSource):
+    """
+    Stream record batches into an uncompressed IPC file, atomically.
+
+    `batch_source(columns)` yields batches of `schema` (only `columns` when
+    not None) and is called twice: once for just the dictionary columns, to
+    collect their values, and once to write. Only one batch is held at a
+    time, so memory does not grow with the fragment.
+    """
+    # The IPC file format allows one dictionary per column for the whole file
+    dictionaries = _unified_dictionaries(schema, batch_source)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with ipc.new_file(sink, schema) as writer:
+            for batch in coalesce_batches(batch_source(None)):
+                writer.write_batch(_conform_batch(batch, schema, dictionaries))
+    tmp_path.replace(path)
+
+
+def prune_snapshots(manifest: dict) -> int:
+    """Delete snapshot files of fragments no longer in `manifest`; returns how many."""
+    if not DATA_SNAPSHOT_DIR.exists():
+        return 0
+    keep = {snapshot_path(fragment) for fragment in manifest.get("fragments", [])}
+    stale = [p for p in DATA_SNAPSHOT_DIR.glob("*.arrow") if p not in keep]
+    # Processes that still map a deleted file keep reading it until they drop it
+    for path in stale:
+        path.unlink(missing_ok=True)
+    return len(stale)
+
+
+def snapshot_is_fresh(manifest: Optional[dict] = None) -> bool:
+    """True if every fragment of the manifest has its snapshot file."""
+    if manifest is None:
+        manifest = load_manifest()
+    if not manifest or not manifest.get("fragments"):
+        return False
+    return all(snapshot_path(fragment).exists() for fragment in manifest["fragments"])
+
+
+def open_snapshot(columns: Optional[List[str]] = None) -> Optional[pa.Table]:
+    """
+    Zero-copy view of the snapshot, or None if it is disabled, missing or stale.
+
+    The fragments' files are concatenated in manifest order without copying;
+    the returned table's buffers live in the memory maps, and projecting
+    `columns` is free because unused columns are simply never touched.
+    """
+    manifest = load_manifest()
+    if not USE_ARROW_SNAPSHOT or not snapshot_is_fresh(manifest):
+        return None
+    tables = []
+    try:
+        for fragment in manifest["fragments"]:
+            source = pa.memory_map(str(snapshot_path(fragment)), "r")
+            table = ipc.open_file(source).read_all()
+            tables.append(table.select(columns) if columns is not None else table)
+    except FileNotFoundError:
+        # Pruned by a concurrent full ingest; the parquet files are current
+        return None
+    return tables[0] if len(tables) == 1 else pa.concat_tables(tables)
@@ -0,0 +1,301 @@
+"""
+Persistent cache from question to validated generated code.
+
+- SQLite on local disk (CODE_CACHE_PATH), shared by every app process
+- Entries are scoped by LLM model, prompt version, dataset schema
+  fingerprint and code language (python / sql); changing any of them
+  starts a fresh scope, so stale code is never served
+- lookup(): exact match on the normalized question first (no embedding
+  needed), then the nearest cached question of the scope by embedding
+  cosine, accepted at or above CODE_CACHE_SIMILARITY and only if both
+  questions carry the same literals (numbers, quoted text, capitalised
+  words, sort-direction and aggregation words): "top 5" is never served
+  the code of "top 10", 2017 that of 2018, nor "lowest" that of "highest"
+- Only code that ran and produced a non-empty result is stored (the
+  orchestrator validates it); a hit whose code fails is invalidated
+- TTL: entries older than CODE_CACHE_TTL_DAYS are ignored and pruned;
+  LRU: the table is trimmed to the CODE_CACHE_MAX_ENTRIES most recently
+  used rows
+- Hit/miss counters via stats()
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from config import (
+    CODE_CACHE_MAX_ENTRIES,
+    CODE_CACHE_PATH,
+    CODE_CACHE_SIMILARITY,
+    CODE_CACHE_TTL_DAYS,
+)
+from rag.embedding_cache import normalize_query
+
+
+_NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+    "seven": "7", "eight": "8", "nine": "9", "ten": "10", "twenty": "20",
+}
+_QUOTED_RE = re.compile(r"\"([^\"]+)\"|(?<!\w)'([^']+)'(?!\w)|`([^`]+)`")
+_WORD_RE = re.compile(r"\d+(?:[.,]\d+)*|[A-Za-z][\w-]*")
+
+# Sort direction and aggregation words, by meaning; "highest" and "lowest"
+# (or "total" and "average") embed almost alike but need different code
+_KEYWORD_CLASSES = [
+    ("dir:high", r"highest|most|largest|biggest|greatest|top|descending"),
+    ("dir:low", r"lowest|least|smallest|fewest|bottom|ascending"),
+    ("dir:best", r"best"),
+    ("dir:worst", r"worst"),
+    ("agg:sum", r"sum|total"),
+    ("agg:mean", r"average|avg|mean"),
+    ("agg:count", r"count|how\s+many|number\s+of"),
+    ("agg:median", r"median"),
+    ("agg:min", r"min|minimum"),
+    ("agg:max", r"max|maximum"),
+    ("agg:std", r"std|standard\s+deviation|variance|variability"),
+]
+_KEYWORD_RES = [(name, re.compile(rf"\b(?:{words})\b")) for name, words in _KEYWORD_CLASSES]
+
+
+def question_literals(question: str) -> frozenset:
+    """
+    Numbers (digits or number words), quoted text, capitalised words other
+    than the first of a sentence, and the classes of sort-direction and
+    aggregation words ("dir:high", "agg:mean", ...): the parts of a question
+    that change the code although they barely move its embedding.
+    """
+    literals = {"".join(m.groups(default="")).lower() for m in _QUOTED_RE.finditer(question)}
+    unquoted = _QUOTED_RE.sub(" ", question).lower()
+    literals.update(name for name, pattern in _KEYWORD_RES if pattern.search(unquoted))
+    for sentence in re.split(r"(?<=[.?!])\s+", _QUOTED_RE.sub(" ", question).strip()):
+        for i, match in enumerate(_WORD_RE.finditer(sentence)):
+            word = match.group()
+            if word[0].isdigit():
+                literals.add(word.replace(",", ""))
+            elif word.lower() in _NUMBER_WORDS:
+                literals.add(_NUMBER_WORDS[word.lower()])
+            elif i and word[0].isupper() and word != "I":
+                literals.add(word.lower())
+    return frozenset(literals)
+
+
+@dataclass
+class CachedCode:
+    entry_id: int
+    code: str
+    question: str  # the cached question the code was generated for
+    match: str  # "exact" or "semantic"
+    similarity: float
+
+
+class CodeCache:
+    """Question -> generated code, exact then semantic lookup."""
+
+    # Prune expired / least recently used rows once every this many writes
+    PRUNE_EVERY = 50
+
+    def __init__(
+        self,
+        db_path: Path = CODE_CACHE_PATH,
+        similarity: float = CODE_CACHE_SIMILARITY,
+        ttl_days: float = CODE_CACHE_TTL_DAYS,
+        max_entries: int = CODE_CACHE_MAX_ENTRIES,
+    ):
+        self.db_path = Path(db_path)
+        self.similarity = similarity
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self._db = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        # (scope, encoder) -> (version, ids, unit-norm embedding matrix)
+        self._vectors = {}
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    # ---- storage ----
+
+    def _get_db(self):
+        if self._db is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generated_code ("
+                " id INTEGER PRIMARY KEY,"
+                " scope TEXT NOT NULL,"
+                " question_norm TEXT NOT NULL,"
+                " question TEXT NOT NULL,"
+                " code TEXT NOT NULL,"
+                " encoder TEXT,"
+                " dim INTEGER,"
+                " embedding BLOB,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " UNIQUE (scope, question_norm))"
+            )
+        return self._db
+
+    def _version(self, db) -> tuple:
+        """Changes when this or any other connection commits."""
+        return (db.execute("PRAGMA data_version").fetchone()[0], self._writes)
+
+    def _scope_vectors(self, db, scope: str, encoder: str):
+        key = (scope, encoder)
+        version = self._version(db)
+        cached = self._vectors.get(key)
+        if cached is None or cached[0] != version:
+            rows = db.execute(
+                "SELECT id, dim, embedding FROM generated_code"
+                " WHERE scope = ? AND encoder = ? AND embedding IS NOT NULL",
+                (scope, encoder),
+            ).fetchall()
+            ids = np.array([r[0] for r in rows], dtype=np.int64)
+            matrix = (
+                np.vstack([np.frombuffer(r[2], dtype=np.float32, count=r[1]) for r in rows])
+                if rows
+                else np.zeros((0, 0), dtype=np.float32)
+            )
+            cached = (version, ids, matrix)
+            self._vectors[key] = cached
+        return cached[1], cached[2]
+
+    def _touch(self, db, entry_id: int):
+        db.execute(
+            "UPDATE generated_code SET last_used = ?, hits = hits + 1 WHERE id = ?",
+            (time.time(), entry_id),
+        )
+        db.commit()
+
+    # ---- public API ----
+
+    def lookup(
+        self,
+        scope: str,
+        question: str,
+        embed: Optional[Callable[[], np.ndarray]] = None,
+        encoder: str = "",
+    ) -> Optional[CachedCode]:
+        """
+        Cached code for `question` in `scope`, or None. `embed` is called
+        (at most once) only if there is no exact match; without it the
+        lookup is exact-only.
+        """
+        norm = normalize_query(question)
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            db = self._get_db()
+            row = db.execute(
+                "SELECT id, code, question FROM generated_code"
+                " WHERE scope = ? AND question_norm = ? AND created_at >= ?",
+                (scope, norm, cutoff),
+            ).fetchone()
+            if row is not None:
+                self._touch(db, row[0])
+                self.exact_hits += 1
+                return CachedCode(row[0], row[1], row[2], "exact", 1.0)
+            if embed is None or self.similarity > 1:
+                self.misses += 1
+                return None
+
+        vector = np.asarray(embed(), dtype=np.float32).ravel()
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            db = self._get_db()
+            ids, matrix = self._scope_vectors(db, scope, encoder)
+            if len(ids) and matrix.shape[1] == len(vector):
+                sims = matrix @ vector
+                literals = question_literals(question)
+                # Nearest first; a candidate with other literals is skipped
+                for i in np.argsort(-sims):
+                    if sims[i] < self.similarity:
+                        break
+                    row = db.execute(
+                        "SELECT id, code, question FROM generated_code"
+                        " WHERE id = ? AND created_at >= ?",
+                        (int(ids[i]), cutoff),
+                    ).fetchone()
+                    if row is not None and question_literals(row[2]) == literals:
+                        self._touch(db, row[0])
+                        self.semantic_hits += 1
+                        return CachedCode(row[0], row[1], row[2], "semantic", float(sims[i]))
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        scope: str,
+        question: str,
+        code: str,
+        embedding: Optional[np.ndarray] = None,
+        encoder: str = "",
+    ):
+        """Insert or replace the code for `question` in `scope`."""
+        blob, dim = None, None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32).ravel()
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+            blob, dim = vector.tobytes(), len(vector)
+        now = time.time()
+        with self._lock:
+            db = self._get_db()
+            db.execute(
+                "INSERT OR REPLACE INTO generated_code"
+                " (scope, question_norm, question, code, encoder, dim, embedding,"
+                "  created_at, last_used, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (scope, normalize_query(question), question, code, encoder, dim, blob, now, now),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(db)
+            db.commit()
+
+    def invalidate(self, entry_id: int):
+        """Drop an entry whose code no longer runs."""
+        with self._lock:
+            db = self._get_db()
+            db.execute("DELETE FROM generated_code WHERE id = ?", (entry_id,))
+            self._writes += 1
+            db.commit()
+
+    def _prune(self, db):
+        db.execute(
+            "DELETE FROM generated_code WHERE created_at < ?",
+            (time.time() - self.ttl_seconds,),
+        )
+        db.execute(
+            "DELETE FROM generated_code WHERE id IN ("
+            " SELECT id FROM generated_code ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        with self._lock:
+            entries = self._get_db().execute("SELECT COUNT(*) FROM generated_code").fetchone()[0]
+        return {
+            "entries": entries,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+
+_code_cache: Optional[CodeCache] = None
+
+
+def get_code_cache() -> CodeCache:
+    global _code_cache
+    if _code_cache is None:
+        _code_cache = CodeCache()
+    return _code_cache
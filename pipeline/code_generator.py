@@ -1,14 +1,12 @@
-from typing import List
+import hashlib
+from typing import Callable, List, Optional, Tuple
 from textwrap import dedent
 
-from openai import OpenAI
-
-from config import LLM_MODEL_NAME
+from pipeline.column_stats import describe_columns
+from pipeline.llm_client import get_provider
+from pipeline.request_context import RequestContext
 from rag.retriever import retrieve_context
 
-# Single global client instance (new OpenAI SDK)
-client = OpenAI()
-
 SYSTEM_PROMPT = """
 You are a supply chain data analytics assistant.
 
@@ -40,6 +38,68 @@ Examples:
 """
 
 
+SQL_SYSTEM_PROMPT = """
+You are a supply chain data analytics assistant.
+
+You write a single DuckDB SQL query that answers questions about a table
+called orders. It contains supply chain order line data with columns such as:
+
+- order_id, order_date, shipping_date, order_year
+- order_region, order_country, order_city, order_state
+- customer_segment, market, category_name, department_name, product_name
+- days_for_shipment_scheduled, days_for_shipping_real, shipping_delay_days, on_time_delivery (BOOLEAN)
+- sales, benefit_per_order, order_profit_per_order
+- order_item_quantity, order_item_total, order_item_discount, order_item_discount_rate
+
+CRITICAL RULES:
+1. ALWAYS aggregate data - NEVER return raw rows
+2. Use GROUP BY for comparison questions
+3. Return 1-20 rows (aggregated summary), never more than 100 (use LIMIT)
+4. ORDER BY the metric (descending) to show top performers first
+5. Give every aggregate a readable alias, e.g. AVG(sales) AS avg_sales
+6. Use AVG(CAST(on_time_delivery AS DOUBLE)) for rates of boolean columns
+7. Output ONE SELECT (or WITH ... SELECT) statement only
+8. Do NOT include backticks, markdown or comments
+
+Examples:
+- "Which category has most orders?" → SELECT category_name, COUNT(order_id) AS orders FROM orders GROUP BY category_name ORDER BY orders DESC LIMIT 10
+- "Average sales by region" → SELECT order_region, AVG(sales) AS avg_sales FROM orders GROUP BY order_region ORDER BY avg_sales DESC
+"""
+
+
+# Columns whose value ranges / valid values are spelled out in the prompt
+PROMPT_COLUMNS = [
+    "order_date",
+    "order_region",
+    "market",
+    "customer_segment",
+    "category_name",
+    "department_name",
+    "payment_type",
+    "shipping_mode",
+    "delivery_status",
+    "order_status",
+    "days_for_shipment_scheduled",
+    "days_for_shipping_real",
+    "shipping_delay_days",
+    "on_time_delivery",
+    "late_delivery_risk",
+    "sales",
+    "benefit_per_order",
+    "order_profit_per_order",
+    "order_item_quantity",
+    "order_item_discount_rate",
+]
+
+
+def column_facts() -> str:
+    """Valid values and ranges from the column stats sidecar ("" if missing)."""
+    facts = describe_columns(PROMPT_COLUMNS)
+    if not facts:
+        return ""
+    return "Column facts (use these exact values when filtering):\n" + facts
+
+
 def build_prompt(user_question: str, kb_context_docs: List[dict]) -> str:
     context_texts = "\n\n".join([d["text"] for d in kb_context_docs])
     
@@ -76,6 +136,8 @@ IMPORTANT: This is a rate/percentage calculation.
 Context (schema and metrics):
 {context_texts}
 
+{column_facts()}
+
 User question:
 {user_question}
 
@@ -96,24 +158,143 @@ Write ONLY the Python code. No explanation. No markdown. No backticks.
     return dedent(prompt)
 
 
-def generate_pandas_code(user_question: str) -> str:
+def build_sql_prompt(user_question: str, kb_context_docs: List[dict]) -> str:
+    """Same context and question as build_prompt(), with SQL instructions."""
+    context_texts = "\n\n".join([d["text"] for d in kb_context_docs])
+
+    prompt = f"""
+Context (schema and metrics):
+{context_texts}
+
+{column_facts()}
+
+User question:
+{user_question}
+
+Instructions:
+- Write one DuckDB SQL query against the orders table
+- MUST use GROUP BY + aggregation (COUNT, SUM, AVG, etc.)
+- MUST ORDER BY the main metric to show top performers first
+- MUST LIMIT to 10-20 rows maximum
+- Return 2-3 columns with readable aliases
+
+Write ONLY the SQL query. No explanation. No markdown. No backticks.
+"""
+    return dedent(prompt)
+
+
+# Bump when build_prompt() / build_sql_prompt() change in a way that affects
+# the generated code; the system prompts are hashed in by prompt_version()
+PROMPT_TEMPLATE_VERSION = 1
+
+
+def prompt_version(language: str = "python") -> str:
+    """Identifies the prompt that produced cached code for `language`."""
+    system_prompt = SQL_SYSTEM_PROMPT if language == "sql" else SYSTEM_PROMPT
+    digest = hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:12]
+    return f"v{PROMPT_TEMPLATE_VERSION}-{digest}"
+
+
+def _chat_messages(system_prompt: str, prompt: str) -> List[dict]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+
+
+# Sampling parameters of every code-generation request
+CODE_PARAMS = dict(temperature=0.1, max_tokens=500)
+
+
+def _complete(
+    system_prompt: str,
+    prompt: str,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Chat completion text; streamed token by token to `on_token` if given."""
+    messages = _chat_messages(system_prompt, prompt)
+    if on_token is None:
+        return get_provider().complete(messages, **CODE_PARAMS).strip()
+
+    parts = []
+    for text in get_provider().stream(messages, **CODE_PARAMS):
+        parts.append(text)
+        on_token(text)
+    return "".join(parts).strip()
+
+
+async def _acomplete(
+    system_prompt: str,
+    prompt: str,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
+    """_complete() on the event loop; cancelling it aborts the request."""
+    messages = _chat_messages(system_prompt, prompt)
+    if on_token is None:
+        return (await get_provider().acomplete(messages, **CODE_PARAMS)).strip()
+
+    parts = []
+    async for text in get_provider().astream(messages, **CODE_PARAMS):
+        parts.append(text)
+        on_token(text)
+    return "".join(parts).strip()
+
+
+def _code_prompts(user_question: str, kb_docs: List[dict], language: str) -> Tuple[str, str]:
+    """(system prompt, user prompt) for pandas ("python") or SQL code."""
+    if language == "sql":
+        return SQL_SYSTEM_PROMPT, build_sql_prompt(user_question, kb_docs)
+    return SYSTEM_PROMPT, build_prompt(user_question, kb_docs)
+
+
+def _strip_fences(code: str, language: str) -> str:
+    return code.replace(f"```{language}", "").replace("```", "").strip()
+
+
+# KB chunks pasted into the code-generation prompt
+KB_CODE_TOP_K = 4
+
+
+def _kb_docs(user_question: str, ctx: Optional[RequestContext], top_k: int = KB_CODE_TOP_K) -> List[dict]:
+    """KB context from the request's shared retrieval, or a fresh lookup."""
+    if ctx is not None:
+        return ctx.kb_context(top_k)
+    return retrieve_context(user_question, top_k=top_k)
+
+
+def generate_pandas_code(user_question: str, ctx: Optional[RequestContext] = None) -> str:
     """Generate pandas code with better guidance for aggregation queries."""
-    kb_docs = retrieve_context(user_question, top_k=4)
-    prompt = build_prompt(user_question, kb_docs)
-
-    resp = client.chat.completions.create(
-        model=LLM_MODEL_NAME,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.1,
-        max_tokens=500,
-    )
-
-    code = resp.choices[0].message.content.strip()
+    kb_docs = _kb_docs(user_question, ctx)
+    system_prompt, prompt = _code_prompts(user_question, kb_docs, "python")
+
+    on_token = ctx.token_callback("code_token") if ctx is not None else None
+    code = _complete(system_prompt, prompt, on_token=on_token)
     
     # Clean up code if it has markdown
-    code = code.replace('```python', '').replace('```', '').strip()
-    
-    return code
\ No newline at end of file
+    return _strip_fences(code, "python")
+
+
+def generate_sql(user_question: str, ctx: Optional[RequestContext] = None) -> str:
+    """Generate a DuckDB SQL query over the `orders` view."""
+    kb_docs = _kb_docs(user_question, ctx)
+    system_prompt, prompt = _code_prompts(user_question, kb_docs, "sql")
+
+    on_token = ctx.token_callback("code_token") if ctx is not None else None
+    sql = _complete(system_prompt, prompt, on_token=on_token)
+    return _strip_fences(sql, "sql")
+
+
+async def agenerate_code(
+    user_question: str,
+    kb_docs: List[dict],
+    language: str = "python",
+    ctx: Optional[RequestContext] = None,
+) -> str:
+    """
+    Async generate_pandas_code() / generate_sql() for a question whose KB
+    context was already retrieved (by the caller, concurrently with other work).
+    """
+    system_prompt, prompt = _code_prompts(user_question, kb_docs, language)
+    on_token = ctx.token_callback("code_token") if ctx is not None else None
+    code = await _acomplete(system_prompt, prompt, on_token=on_token)
+    return _strip_fences(code, language)
@@ -0,0 +1,275 @@
+"""
+Static column analysis for LLM-generated pandas code.
+
+- referenced_columns() parses the cleaned code and returns the set of dataset
+  columns it touches: subscripts, attribute access, groupby keys, agg dicts
+  and identifiers inside query()/eval() strings
+- literal_comparisons() lists (column, string literal) pairs the code
+  compares against, e.g. df['market'] == 'Europe' or .isin([...]), so they
+  can be checked against the known values of the column
+- referenced_columns() returns None ("unsure") whenever a full-width frame could flow into the
+  result or into a whole-frame operation (df.describe(), groupby(...).mean()
+  without a column selection, result_df = df[...], ...), in which case the
+  caller should pass the full frame
+"""
+
+import ast
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+# Calls that keep every column of the frame they are applied to, and whose
+# rows do not depend on the columns that are not referenced
+ROW_PRESERVING_METHODS = {
+    "assign",
+    "copy",
+    "head",
+    "nlargest",
+    "nsmallest",
+    "query",
+    "reset_index",
+    "sort_index",
+    "sort_values",
+    "tail",
+}
+
+# Calls whose rows depend on every column unless subset= names them; on a
+# projected frame df.dropna() / df.drop_duplicates() would silently ignore
+# the columns that were not loaded
+SUBSET_METHODS = {"dropna", "drop_duplicates"}
+
+# Calls on a groupby object that never touch the non-key columns
+NARROW_GROUPBY_METHODS = {"size", "ngroups", "groups"}
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# col == 'value' / col != "value" inside query() strings
+_QUERY_LITERAL_RE = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\s*[!=]=\s*(['\"])(.*?)\2")
+
+
+def _is_column_selector(node: ast.AST) -> bool:
+    """df['col'] or df[['a', 'b']]."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return True
+    if isinstance(node, (ast.List, ast.Tuple)) and node.elts:
+        return all(
+            isinstance(e, ast.Constant) and isinstance(e.value, str) for e in node.elts
+        )
+    return False
+
+
+def _has_literal_subset(call: ast.Call) -> bool:
+    """dropna(subset=[...]) / drop_duplicates([...]) naming only literal columns."""
+    if call.args and not (call.func.attr == "drop_duplicates" and len(call.args) == 1):
+        return False
+    subset = call.args[0] if call.args else None
+    for kw in call.keywords:
+        if kw.arg == "subset":
+            subset = kw.value
+        elif kw.arg == "axis" or kw.arg is None:
+            return False
+    return subset is not None and _is_column_selector(subset)
+
+
+class _FrameUseChecker:
+    """Decides whether every use of the input frame is narrowed to named columns."""
+
+    def __init__(self, tree: ast.AST, known_columns: Set[str]):
+        self.known = known_columns
+        self.parents = {}
+        for parent in ast.walk(tree):
+            for child in ast.iter_child_nodes(parent):
+                self.parents[child] = parent
+        self.frame_names = {"df"}
+        self.tree = tree
+
+    def _climb_full_width(self, node: ast.AST) -> Optional[ast.AST]:
+        """
+        Walk up through operations that keep all columns of `node`.
+
+        Returns the outermost full-width expression, or None if a .loc[]
+        column selection already narrowed it.
+        """
+        while True:
+            parent = self.parents.get(node)
+            if isinstance(parent, ast.Subscript) and parent.value is node:
+                if _is_column_selector(parent.slice):
+                    return node
+                node = parent  # boolean mask / row slice
+                continue
+            if (
+                isinstance(parent, ast.Attribute)
+                and parent.value is node
+                and parent.attr in ROW_PRESERVING_METHODS | SUBSET_METHODS
+            ):
+                call = self.parents.get(parent)
+                if isinstance(call, ast.Call) and call.func is parent:
+                    if parent.attr in SUBSET_METHODS and not _has_literal_subset(call):
+                        return node
+                    node = call
+                    continue
+            if isinstance(parent, ast.Attribute) and parent.value is node and parent.attr == "loc":
+                sub = self.parents.get(parent)
+                if isinstance(sub, ast.Subscript) and sub.value is parent:
+                    if isinstance(sub.slice, ast.Tuple) and len(sub.slice.elts) == 2:
+                        if _is_column_selector(sub.slice.elts[1]):
+                            return None
+                    node = sub
+                    continue
+            return node
+
+    def _groupby_is_narrow(self, call: ast.Call) -> bool:
+        parent = self.parents.get(call)
+        if isinstance(parent, ast.Subscript) and parent.value is call:
+            return _is_column_selector(parent.slice)
+        if not (isinstance(parent, ast.Attribute) and parent.value is call):
+            return False
+        if parent.attr in NARROW_GROUPBY_METHODS:
+            return True
+        if parent.attr in ("agg", "aggregate"):
+            # .agg({'sales': 'sum'}) or .agg(total=('sales', 'sum')); a bare
+            # .agg('mean') aggregates every column
+            agg_call = self.parents.get(parent)
+            if not isinstance(agg_call, ast.Call):
+                return False
+            if agg_call.args:
+                return isinstance(agg_call.args[0], ast.Dict)
+            return bool(agg_call.keywords) and all(
+                isinstance(kw.value, ast.Tuple) for kw in agg_call.keywords
+            )
+        return False
+
+    def _use_is_narrow(self, node: ast.AST) -> bool:
+        """`node` is a full-width frame expression; is its consumer narrowing?"""
+        parent = self.parents.get(node)
+
+        if isinstance(parent, ast.Subscript) and parent.value is node:
+            return _is_column_selector(parent.slice)
+
+        if isinstance(parent, ast.Attribute) and parent.value is node:
+            if parent.attr in self.known:
+                return True
+            call = self.parents.get(parent)
+            if parent.attr == "groupby" and isinstance(call, ast.Call):
+                return self._groupby_is_narrow(call)
+            if parent.attr == "pivot_table" and isinstance(call, ast.Call):
+                return any(kw.arg == "values" for kw in call.keywords)
+            return False
+
+        if isinstance(parent, ast.Call) and node in parent.args:
+            # len(df) only needs the row count
+            return isinstance(parent.func, ast.Name) and parent.func.id == "len"
+
+        if isinstance(parent, ast.Assign) and parent.value is node:
+            # frame alias: its own uses are checked separately
+            targets = parent.targets
+            if all(isinstance(t, ast.Name) for t in targets):
+                if any(t.id == "result_df" for t in targets):
+                    return False
+                self.frame_names.update(t.id for t in targets)
+                return True
+            return False
+
+        return False
+
+    def all_uses_narrow(self) -> bool:
+        checked = set()
+        while True:
+            pending = [
+                n
+                for n in ast.walk(self.tree)
+                if isinstance(n, ast.Name)
+                and n.id in self.frame_names
+                and isinstance(n.ctx, ast.Load)
+                and n not in checked
+            ]
+            if not pending:
+                return True
+            for name in pending:
+                checked.add(name)
+                full_width = self._climb_full_width(name)
+                if full_width is not None and not self._use_is_narrow(full_width):
+                    return False
+
+
+def referenced_columns(code: str, known_columns: Iterable[str]) -> Optional[Set[str]]:
+    """
+    Columns of `df` that `code` needs, or None if the analysis is unsure.
+    """
+    known = set(known_columns)
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    found = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if node.value in known:
+                found.add(node.value)
+            else:
+                # query()/eval() expressions, e.g. "market == 'Europe' and sales > 100"
+                found.update(t for t in _IDENT_RE.findall(node.value) if t in known)
+        elif isinstance(node, ast.Attribute) and node.attr in known:
+            found.add(node.attr)
+
+    if not found:
+        return None
+    if not _FrameUseChecker(tree, known).all_uses_narrow():
+        return None
+    return found
+
+
+def _subscript_column(node: ast.AST) -> Optional[str]:
+    """'col' for df['col'] (or any frame expression subscripted by a string)."""
+    if isinstance(node, ast.Subscript):
+        key = node.slice
+        if isinstance(key, ast.Constant) and isinstance(key.value, str):
+            return key.value
+    return None
+
+
+def _string_literals(node: ast.AST) -> List[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return [
+            e.value for e in node.elts if isinstance(e, ast.Constant) and isinstance(e.value, str)
+        ]
+    return []
+
+
+def literal_comparisons(code: str) -> List[Tuple[str, str]]:
+    """(column, string literal) pairs compared with ==, !=, in or isin()."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    pairs = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Compare):
+            column = _subscript_column(node.left)
+            if column is not None:
+                for comparator in node.comparators:
+                    pairs.extend((column, v) for v in _string_literals(comparator))
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "isin"
+            and node.args
+        ):
+            column = _subscript_column(node.func.value)
+            if column is not None:
+                pairs.extend((column, v) for v in _string_literals(node.args[0]))
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "query"
+            and node.args
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+        ):
+            pairs.extend(
+                (m.group(1), m.group(3)) for m in _QUERY_LITERAL_RE.finditer(node.args[0].value)
+            )
+    return pairs
@@ -0,0 +1,386 @@
+"""
+Precomputed column statistics for the processed orders table.
+
+- Built by data_loader.py after every ingest from mergeable per-column
+  partials (ColumnStatsBuilder), one record batch at a time straight from
+  Arrow buffers (pyarrow.compute), and saved as a JSON sidecar
+  (data/processed/column_stats.json) stamped with the manifest version
+- Per column: dtype, null rate, min/max, distinct count, top-k values with
+  counts, and for numeric columns mean/std plus approximate quantiles
+- get_column_stats() / column_stats(col) are cheap in-process lookups, so
+  prompt building, code validation and narratives can use facts such as the
+  valid order_region values or the overall mean of sales without scanning
+  the frame
+"""
+
+import json
+import math
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from config import DATA_COLUMN_STATS_PATH, DATA_COLUMN_STATS_STATE_PATH
+from pipeline.manifest import load_manifest
+
+# Most frequent values kept per column; columns with at most this many
+# distinct values therefore have their complete value list in the sidecar
+TOP_K = 25
+
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+# Top values are only useful for columns people filter or group by
+MAX_CARDINALITY_FOR_TOP_K = 5000
+
+# Points of the weighted sample quantiles are read from
+SKETCH_SIZE = 2048
+
+# Smallest hashes kept to estimate the distinct count of larger columns
+KMV_SIZE = 4096
+
+
+def _scalar(value, float32: bool = False):
+    """JSON-friendly Python value of an Arrow scalar."""
+    value = value.as_py() if isinstance(value, pa.Scalar) else value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if float32:
+            # 0.1f widens to 0.10000000149...; keep the digits float32 holds
+            return float(f"{value:.7g}")
+    return value
+
+
+def _kind(typ: pa.DataType) -> str:
+    if pa.types.is_integer(typ) or pa.types.is_floating(typ):
+        return "numeric"
+    if pa.types.is_timestamp(typ) or pa.types.is_date(typ):
+        return "temporal"
+    if pa.types.is_boolean(typ):
+        return "boolean"
+    return "other"
+
+
+def _physical_type(typ: pa.DataType) -> pa.DataType:
+    """Value type the partials are kept in: temporal values as integer ticks."""
+    if pa.types.is_dictionary(typ):
+        typ = typ.value_type
+    if _kind(typ) == "temporal":
+        return pa.int32() if typ.bit_width == 32 else pa.int64()
+    return typ
+
+
+def _hashes(values: pa.Array) -> np.ndarray:
+    """Sorted distinct 64-bit hashes of the non-null `values`."""
+    values = pc.unique(values).drop_null()
+    return np.unique(pd.util.hash_array(values.to_numpy(zero_copy_only=False)))
+
+
+def _sketch(values: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted sample of at most SKETCH_SIZE points with the quantiles of
+    (values, weights): equally weighted points at evenly spaced ranks.
+    """
+    order = np.argsort(values, kind="stable")
+    values, weights = values[order], weights[order]
+    if len(values) <= SKETCH_SIZE:
+        return values, weights
+    ranks = (np.arange(SKETCH_SIZE) + 0.5) / SKETCH_SIZE
+    total = weights.sum()
+    return _quantiles(values, weights, ranks), np.full(SKETCH_SIZE, total / SKETCH_SIZE)
+
+
+def _quantiles(values: np.ndarray, weights: np.ndarray, qs) -> np.ndarray:
+    """Quantiles of a sorted weighted sample, interpolating between midpoints."""
+    midpoints = np.cumsum(weights) - weights / 2
+    return np.interp(np.asarray(qs) * weights.sum(), midpoints, values)
+
+
+def _new_partial(typ: pa.DataType) -> dict:
+    return {
+        "dtype": str(typ),
+        "rows": 0,
+        "nulls": 0,
+        "min": None,
+        "max": None,
+        "count": 0,
+        "sum": 0.0,
+        "sumsq": 0.0,
+        "sketch": [[], []],
+        "counts": {},
+        "hashes": None,
+    }
+
+
+def _add_column(partial: dict, column: pa.Array, typ: pa.DataType):
+    """Fold one batch of a column into its partial."""
+    kind = _kind(typ.value_type if pa.types.is_dictionary(typ) else typ)
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    values = column.cast(_physical_type(typ))
+    partial["rows"] += len(values)
+    partial["nulls"] += values.null_count
+
+    if kind != "other":
+        min_max = pc.min_max(values)
+        for stat, pick in (("min", min), ("max", max)):
+            value = min_max[stat].as_py()
+            if value is not None:
+                old = partial[stat]
+                partial[stat] = value if old is None else pick(old, value)
+
+    if kind in ("numeric", "boolean"):
+        floats = values.cast(pa.float64())
+        partial["count"] += len(floats) - floats.null_count
+        partial["sum"] += pc.sum(floats).as_py() or 0.0
+        partial["sumsq"] += pc.sum(pc.multiply(floats, floats)).as_py() or 0.0
+        if kind == "numeric":
+            new = floats.drop_null().to_numpy()
+            points, weights = partial["sketch"]
+            points, weights = _sketch(
+                np.concatenate([np.asarray(points, dtype="float64"), new]),
+                np.concatenate([np.asarray(weights, dtype="float64"), np.ones(len(new))]),
+            )
+            partial["sketch"] = [points.tolist(), weights.tolist()]
+
+    counts = partial["counts"]
+    if counts is not None:
+        value_counts = pc.value_counts(values)
+        for value, count in zip(
+            value_counts.field("values").to_pylist(), value_counts.field("counts").to_pylist()
+        ):
+            if value is not None:
+                counts[value] = counts.get(value, 0) + count
+        if len(counts) > MAX_CARDINALITY_FOR_TOP_K:
+            # Too many values to keep: switch to the distinct-count sketch
+            seen = pa.array(list(counts), type=_physical_type(typ))
+            partial["counts"] = None
+            partial["hashes"] = _hashes(seen)[:KMV_SIZE].tolist()
+    else:
+        merged = np.union1d(np.asarray(partial["hashes"], dtype="uint64"), _hashes(values))
+        partial["hashes"] = merged[:KMV_SIZE].tolist()
+
+
+def _distinct(partial: dict) -> int:
+    if partial["counts"] is not None:
+        return len(partial["counts"])
+    hashes = partial["hashes"]
+    if len(hashes) < KMV_SIZE:
+        return len(hashes)
+    # k-minimum-values estimate from the k-th smallest of uniform 64-bit hashes
+    return int(round((KMV_SIZE - 1) * 2.0 ** 64 / (hashes[-1] + 1)))
+
+
+def _finish(partial: dict, typ: pa.DataType) -> dict:
+    """Statistics of a column from its partial."""
+    value_type = typ.value_type if pa.types.is_dictionary(typ) else typ
+    kind = _kind(value_type)
+    f32 = pa.types.is_float32(value_type)
+    rows = partial["rows"]
+    stats = {
+        "dtype": partial["dtype"],
+        "rows": rows,
+        "null_rate": partial["nulls"] / rows if rows else 0.0,
+        "distinct": _distinct(partial),
+    }
+
+    if kind != "other":
+        for stat in ("min", "max"):
+            value = partial[stat]
+            if value is not None and kind == "temporal":
+                value = pa.array([value], type=_physical_type(typ)).cast(value_type)[0]
+            stats[stat] = _scalar(value, f32)
+
+    if kind in ("numeric", "boolean"):
+        n, total = partial["count"], partial["sum"]
+        stats["mean"] = total / n if n else None
+        stats["std"] = (
+            math.sqrt(max(partial["sumsq"] - total * total / n, 0.0) / (n - 1)) if n > 1 else None
+        )
+        if kind == "numeric" and n:
+            points, weights = (np.asarray(a, dtype="float64") for a in partial["sketch"])
+            quantiles = _quantiles(points, weights, QUANTILES)
+            stats["quantiles"] = {str(q): _scalar(float(v)) for q, v in zip(QUANTILES, quantiles)}
+
+    if partial["counts"] is not None and kind != "temporal":
+        # Stable sort: ties keep the order the values first appeared in
+        top = sorted(partial["counts"].items(), key=lambda vc: -vc[1])[:TOP_K]
+        stats["top_values"] = [[_scalar(v, f32), c] for v, c in top]
+
+    return stats
+
+
+class ColumnStatsBuilder:
+    """
+    Mergeable per-column partials, fed one record batch at a time.
+
+    Partials (row/null counts, count/sum/sumsq, min/max, value counts or a
+    distinct-count sketch, a quantile sample) are saved next to the
+    sidecar, so an append folds in just its new rows (load + add_batch).
+    Distinct counts are exact up to MAX_CARDINALITY_FOR_TOP_K values and a
+    k-minimum-values estimate (about 1.5% error) above; quantiles come from
+    a SKETCH_SIZE-point weighted sample.
+    """
+
+    def __init__(self, schema: pa.Schema, partials: Optional[Dict[str, dict]] = None):
+        self.schema = schema
+        self.partials = partials or {f.name: _new_partial(f.type) for f in schema}
+
+    def add_batch(self, batch: pa.RecordBatch):
+        for field in self.schema:
+            _add_column(self.partials[field.name], batch.column(field.name), field.type)
+
+    def stats(self) -> Dict[str, dict]:
+        return {f.name: _finish(self.partials[f.name], f.type) for f in self.schema}
+
+    def save(self, manifest_version: int):
+        """Write the sidecar and the partials it was finished from."""
+        save_column_stats(self.stats(), manifest_version)
+        partials = {
+            name: {**p, "counts": None if p["counts"] is None else list(p["counts"].items())}
+            for name, p in self.partials.items()
+        }
+        _write_json(
+            DATA_COLUMN_STATS_STATE_PATH,
+            {"manifest_version": manifest_version, "columns": partials},
+        )
+
+    @classmethod
+    def load(cls, schema: pa.Schema, manifest_version: int) -> Optional["ColumnStatsBuilder"]:
+        """Saved partials, or None if missing, for another version or other columns."""
+        if not DATA_COLUMN_STATS_STATE_PATH.exists():
+            return None
+        with DATA_COLUMN_STATS_STATE_PATH.open("r", encoding="utf-8") as f:
+            payload = json.load(f)
+        partials = payload.get("columns", {})
+        if payload.get("manifest_version") != manifest_version or any(
+            partials.get(f.name, {}).get("dtype") != str(f.type) for f in schema
+        ):
+            return None
+        for p in partials.values():
+            if p["counts"] is not None:
+                p["counts"] = {v: c for v, c in p["counts"]}
+        return cls(schema, partials)
+
+
+def compute_column_stats(table: pa.Table) -> Dict[str, dict]:
+    """Statistics for every column of `table`."""
+    builder = ColumnStatsBuilder(table.schema)
+    for batch in table.to_batches():
+        builder.add_batch(batch)
+    return builder.stats()
+
+
+def _write_json(path, payload: dict, indent: Optional[int] = None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=indent)
+    tmp_path.replace(path)
+
+
+def save_column_stats(stats: Dict[str, dict], manifest_version: int):
+    """Write the sidecar atomically."""
+    payload = {
+        "manifest_version": manifest_version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "columns": stats,
+    }
+    _write_json(DATA_COLUMN_STATS_PATH, payload, indent=1)
+
+
+# ----------------------------------------------------------
+# IN-PROCESS LOOKUPS
+# ----------------------------------------------------------
+
+_lock = threading.Lock()
+_stats: Optional[Dict[str, dict]] = None
+_stats_version = None
+
+
+def get_column_stats() -> Dict[str, dict]:
+    """
+    Column -> stats for the current dataset, or {} if the sidecar is missing
+    or was built for an older manifest.
+    """
+    global _stats, _stats_version
+    manifest = load_manifest()
+    version = manifest.get("version") if manifest else None
+    with _lock:
+        if _stats is None or _stats_version != version:
+            _stats, _stats_version = {}, version
+            if version is not None and DATA_COLUMN_STATS_PATH.exists():
+                with DATA_COLUMN_STATS_PATH.open("r", encoding="utf-8") as f:
+                    payload = json.load(f)
+                if payload.get("manifest_version") == version:
+                    _stats = payload["columns"]
+        return _stats
+
+
+def column_stats(column: str) -> Optional[dict]:
+    """Stats of one column, or None if unknown."""
+    return get_column_stats().get(column)
+
+
+def valid_values(column: str) -> Optional[List]:
+    """
+    Every value of a low-cardinality column (most frequent first), or None
+    if the column is unknown or has more than TOP_K distinct values.
+    """
+    stats = column_stats(column)
+    if not stats or "top_values" not in stats or stats["distinct"] > TOP_K:
+        return None
+    return [v for v, _ in stats["top_values"]]
+
+
+def check_literal_values(pairs: Iterable[Tuple[str, object]]) -> List[str]:
+    """
+    Warnings for (column, literal) comparisons whose literal never occurs,
+    e.g. df['market'] == 'EU' when the markets are Europe, LATAM, ...
+    """
+    warnings = []
+    for column, value in pairs:
+        values = valid_values(column)
+        if values is None or not isinstance(value, str) or value in values:
+            continue
+        preview = ", ".join(repr(v) for v in values[:8])
+        more = ", ..." if len(values) > 8 else ""
+        warnings.append(f"{column} has no value {value!r} (valid: {preview}{more})")
+    return warnings
+
+
+def describe_columns(columns: Optional[Iterable[str]] = None, max_values: int = 8) -> str:
+    """
+    Compact, prompt-ready description of the columns, e.g.
+    "- order_region (string, 23 values: 'Central America', ...)".
+    Returns "" when no stats are available.
+    """
+    stats = get_column_stats()
+    if not stats:
+        return ""
+    lines = []
+    for name in columns or stats:
+        s = stats.get(name)
+        if s is None:
+            continue
+        dtype = s["dtype"].replace("dictionary<values=", "").split(",")[0]
+        if "mean" in s and s["distinct"] > TOP_K:
+            desc = f"{dtype}, min {s['min']:.4g}, mean {s['mean']:.4g}, max {s['max']:.4g}"
+        elif "top_values" in s and s["distinct"] <= TOP_K:
+            values = ", ".join(repr(v) for v, _ in s["top_values"][:max_values])
+            more = ", ..." if s["distinct"] > max_values else ""
+            desc = f"{dtype}, {s['distinct']} values: {values}{more}"
+        elif "min" in s:
+            desc = f"{dtype}, {s['min']} to {s['max']}"
+        else:
+            desc = f"{dtype}, {s['distinct']:,} distinct"
+        if s["null_rate"]:
+            desc += f", {s['null_rate']:.1%} null"
+        lines.append(f"- {name} ({desc})")
+    return "\n".join(lines)
@@ -3,12 +3,34 @@ Data loading and cleaning for DataCo Supply Chain dataset.
 
 - Reads raw CSV from data/raw/DataCoSupplyChainDataset.csv
 - Cleans and standardizes columns
-- Writes cleaned parquet to data/processed/orders_clean.parquet
+- Applies the compact dtype layout from pipeline/schema.py
+- Writes cleaned data to data/processed/orders/ as a hive-partitioned
+  parquet dataset (market=<m>/order_year=<y>/...)
+- Optional streaming mode (--stream) reads the CSV in chunks and writes each
+  chunk as parquet row groups, so peak memory stays flat as the input grows
+- Append mode (--append DELTA_CSV) cleans only a delta file, drops rows whose
+  order_item_id is already known, and adds the rest as a new fragment
+- --workers N cleans chunks (or slices of the full frame) in a process pool;
+  dates are parsed with the known DataCo format, once per distinct string
+- Every ingest ends by refreshing the memory-mapped Arrow snapshot
+  (data/processed/snapshot/, one file per fragment) that app workers share,
+  the rollup cube (data/processed/rollup_cube.parquet) for metric x segment
+  questions and the column statistics sidecar
+  (data/processed/column_stats.json), all streamed batch by batch; an
+  append only snapshots its delta and folds its rows into the cube and the
+  column statistics
 """
 
+import argparse
 import os
+import shutil
 import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 # ----------------------------------------------------------
 # 0. PATCH PYTHON PATH TO PROJECT ROOT
@@ -22,8 +44,76 @@ PROJECT_ROOT = CURRENT_DIR.parent                      # .../Final Project
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+import numpy as np
 import pandas as pd
-from config import DATA_RAW_PATH, DATA_PROCESSED_PATH
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from config import (
+    DATA_RAW_PATH,
+    DATA_PROCESSED_DIR,
+    DATA_COLUMN_STATS_PATH,
+    DATA_KEY_INDEX_PATH,
+    DATA_PII_PATH,
+    DATA_ROLLUP_PATH,
+    DATA_FRAGMENTS_DIR,
+    DATA_SNAPSHOT_DIR,
+    INGEST_CHUNKSIZE,
+    INGEST_WORKERS,
+    PARTITION_COLUMNS,
+    STORE_PII_COLUMNS,
+)
+from pipeline.arrow_snapshot import (
+    coalesce_batches,
+    prune_snapshots,
+    snapshot_path,
+    write_snapshot,
+)
+from pipeline.column_stats import ColumnStatsBuilder
+from pipeline.data_runner import open_processed_dataset
+from pipeline.key_index import OrderItemKeySet
+from pipeline.manifest import (
+    add_fragment,
+    add_pii_fragment,
+    fragment_paths,
+    load_manifest,
+    pii_fragment_paths,
+    save_manifest,
+)
+from pipeline.partitioned_writer import PartitionedParquetWriter, conform_table
+from pipeline.rollup_cube import (
+    build_cube_from_batches,
+    cube_source_columns,
+    read_cube,
+    save_cube,
+)
+from pipeline.schema import compact_frame, frame_nbytes, print_memory_report
+
+# Rows missing any of these are dropped after cleaning
+KEY_COLUMNS = ["order_id", "order_date", "sales"]
+
+# Timestamp format of the DataCo CSV, e.g. "1/31/2018 22:56"
+RAW_DATE_FORMAT = "%m/%d/%Y %H:%M"
+
+NUMERIC_COLUMNS = [
+    "days_for_shipping_real",
+    "days_for_shipment_scheduled",
+    "benefit_per_order",
+    "sales_per_customer",
+    "late_delivery_risk",
+    "order_item_discount",
+    "order_item_discount_rate",
+    "order_item_product_price",
+    "order_item_profit_ratio",
+    "order_item_quantity",
+    "sales",
+    "order_item_total",
+    "order_profit_per_order",
+    "latitude",
+    "longitude",
+    "product_price",
+]
 
 
 def load_raw_data() -> pd.DataFrame:
@@ -34,12 +124,22 @@ def load_raw_data() -> pd.DataFrame:
     return df
 
 
+def iter_csv_chunks(path: Path, chunksize: int = INGEST_CHUNKSIZE):
+    """Yield a DataCo-format CSV as DataFrames of at most `chunksize` rows."""
+    if not Path(path).exists():
+        raise FileNotFoundError(f"Raw data not found at {path}")
+    with pd.read_csv(path, encoding="latin-1", chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
+
+
 def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
     Map original column names to clean snake_case names
     based on the schema you pasted.
+
+    `rename` already returns a new frame, so no defensive copy is made.
     """
-    df = df.copy()
     rename_map = {
         "Type": "payment_type",
         "Days for shipping (real)": "days_for_shipping_real",
@@ -100,37 +200,72 @@ def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Standardize columns, types, and derived features."""
+def parse_dates(s: pd.Series) -> pd.Series:
+    """
+    Parse a raw date column, converting each distinct string only once.
+
+    Order lines share timestamps heavily (every line of an order, many
+    orders per minute), so the uniques are parsed with the known
+    RAW_DATE_FORMAT (Arrow's vectorized strptime, which also accepts the
+    non-zero-padded "1/2/2017 3:04") and scattered back by their codes.
+    Strings that do not match the format fall back to inference, so the
+    result equals pd.to_datetime(s, errors="coerce").
+    """
+    if not (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)):
+        return pd.to_datetime(s, errors="coerce")
+
+    codes, uniques = pd.factorize(s)
+    uniques = pd.Series(np.asarray(uniques, dtype=object))
+    parsed = pc.strptime(
+        pa.array(uniques, type=pa.string()),
+        format=RAW_DATE_FORMAT,
+        unit="us",
+        error_is_null=True,
+    )
+    parsed = pd.Series(parsed.to_numpy(zero_copy_only=False), dtype="datetime64[us]")
+
+    unmatched = parsed.isna() & uniques.notna()
+    if unmatched.any():
+        parsed[unmatched] = pd.to_datetime(uniques[unmatched], errors="coerce")
+
+    values = parsed.to_numpy()
+    if len(values):
+        values = values.take(codes)
+        values[codes < 0] = np.datetime64("NaT")
+    else:
+        values = np.full(len(s), np.datetime64("NaT"), dtype=parsed.dtype)
+    return pd.Series(values, index=s.index, name=s.name)
+
+
+def _add_time(timings: dict, stage: str, start: float) -> float:
+    """Accumulate the time since `start` under `stage`; returns a new start."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] += now - start
+    return now
+
+
+def clean_columns(df: pd.DataFrame, timings: dict = None) -> pd.DataFrame:
+    """
+    Row-local cleaning: rename, type coercion and derived columns.
+
+    Safe to run on any slice of the raw CSV (e.g. one streaming chunk).
+    Per-stage seconds are added to `timings` (a defaultdict(float)) if given.
+    """
+    start = time.perf_counter()
     df = rename_columns(df)
 
     # Convert dates
     for col in ["order_date", "shipping_date"]:
         if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors="coerce")
+            df[col] = parse_dates(df[col])
+    start = _add_time(timings, "clean.dates", start)
 
     # Convert numeric columns
-    numeric_cols = [
-        "days_for_shipping_real",
-        "days_for_shipment_scheduled",
-        "benefit_per_order",
-        "sales_per_customer",
-        "late_delivery_risk",
-        "order_item_discount",
-        "order_item_discount_rate",
-        "order_item_product_price",
-        "order_item_profit_ratio",
-        "order_item_quantity",
-        "sales",
-        "order_item_total",
-        "order_profit_per_order",
-        "latitude",
-        "longitude",
-        "product_price",
-    ]
-    for col in numeric_cols:
+    for col in NUMERIC_COLUMNS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
+    start = _add_time(timings, "clean.numeric", start)
 
     # Derived columns: shipping_delay_days and on_time_delivery
     if "days_for_shipping_real" in df.columns and "days_for_shipment_scheduled" in df.columns:
@@ -140,34 +275,588 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
 
     if "shipping_delay_days" in df.columns:
         df["on_time_delivery"] = df["shipping_delay_days"] <= 0
+    _add_time(timings, "clean.derived", start)
 
-    # Drop duplicates based on order_item_id (line-level)
-    if "order_item_id" in df.columns:
-        df = df.drop_duplicates(subset=["order_item_id"])
+    return df
+
+
+def _clean_worker(chunk: pd.DataFrame):
+    """Process-pool entry point: clean one slice, return it with its timings."""
+    timings = defaultdict(float)
+    return clean_columns(chunk, timings), dict(timings)
+
+
+def resolve_workers(workers: int) -> int:
+    """0 means one worker per CPU core."""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def iter_clean_chunks(chunks, workers: int = INGEST_WORKERS, timings: dict = None):
+    """
+    Yield (cleaned_df, raw_rows) for each raw chunk, in input order.
+
+    With workers > 1 the chunks are cleaned in a process pool; at most
+    2 * workers chunks are in flight, so memory stays bounded by the window
+    rather than the file. Results are yielded in submission order, so the
+    output is identical to the serial path.
+    """
+    workers = resolve_workers(workers)
+    if workers <= 1:
+        for chunk in chunks:
+            yield clean_columns(chunk, timings), len(chunk)
+        return
+
+    window = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks:
+            window.append((pool.submit(_clean_worker, chunk), len(chunk)))
+            del chunk
+            if len(window) >= 2 * workers:
+                yield _collect(window.popleft(), timings)
+        while window:
+            yield _collect(window.popleft(), timings)
+
+
+def _collect(entry, timings: dict):
+    future, rows = entry
+    df, worker_timings = future.result()
+    if timings is not None:
+        for stage, seconds in worker_timings.items():
+            timings[stage] += seconds
+    return df, rows
 
-    # Drop rows missing key fields
-    key_cols = [c for c in ["order_id", "order_date", "sales"] if c in df.columns]
+
+def clean_columns_parallel(
+    df: pd.DataFrame, workers: int = INGEST_WORKERS, timings: dict = None
+) -> pd.DataFrame:
+    """clean_columns() over contiguous row slices of `df`, reassembled in order."""
+    workers = resolve_workers(workers)
+    if workers <= 1 or len(df) < 2 * workers:
+        return clean_columns(df, timings)
+    bounds = np.linspace(0, len(df), workers + 1, dtype=int)
+    slices = (df.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:]))
+    cleaned = [part for part, _ in iter_clean_chunks(slices, workers, timings)]
+    return pd.concat(cleaned)
+
+
+def drop_incomplete_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop rows missing key fields."""
+    key_cols = [c for c in KEY_COLUMNS if c in df.columns]
     if key_cols:
         df = df.dropna(subset=key_cols)
+    return df
+
+
+def clean_data(
+    df: pd.DataFrame, workers: int = INGEST_WORKERS, timings: dict = None
+) -> pd.DataFrame:
+    """Standardize columns, types, and derived features."""
+    df = clean_columns_parallel(df, workers, timings)
+
+    # Drop duplicates based on order_item_id (line-level); done after the
+    # slices are reassembled so "first occurrence" means first in the file
+    start = time.perf_counter()
+    if "order_item_id" in df.columns:
+        df = df.drop_duplicates(subset=["order_item_id"])
 
+    df = drop_incomplete_rows(df)
+    _add_time(timings, "dedupe", start)
     return df
 
 
-def save_processed_data(df: pd.DataFrame):
-    """Write cleaned data to parquet file."""
-    DATA_PROCESSED_PATH.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(DATA_PROCESSED_PATH, index=False)
-    print(f"Saved cleaned data to {DATA_PROCESSED_PATH}")
+def add_partition_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Derive order_year, used with market as the hive partition key."""
+    if "order_date" in df.columns:
+        df = df.assign(order_year=df["order_date"].dt.year.astype("int16"))
+    return df
+
+
+def _staging_dir() -> Path:
+    return DATA_PROCESSED_DIR.with_name(DATA_PROCESSED_DIR.name + ".tmp")
+
+
+def _swap_in_dataset(staging_dir: Path, files: list) -> list:
+    """
+    Replace the live dataset directory with a freshly written one.
+
+    Returns the file paths rewritten to their final location.
+    """
+    old_dir = DATA_PROCESSED_DIR.with_name(DATA_PROCESSED_DIR.name + ".old")
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    if DATA_PROCESSED_DIR.exists():
+        DATA_PROCESSED_DIR.rename(old_dir)
+    staging_dir.rename(DATA_PROCESSED_DIR)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    return [DATA_PROCESSED_DIR / f.relative_to(staging_dir) for f in files]
+
+
+def _new_staging_writer() -> PartitionedParquetWriter:
+    staging_dir = _staging_dir()
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    return PartitionedParquetWriter(staging_dir, PARTITION_COLUMNS, basename="base")
+
+
+def save_processed_data(df: pd.DataFrame) -> list:
+    """Write cleaned data as a hive-partitioned parquet dataset."""
+    df = add_partition_columns(df)
+    writer = _new_staging_writer()
+    try:
+        writer.write(df)
+    except Exception:
+        writer.abort()
+        raise
+    files = _swap_in_dataset(writer.base_dir, writer.close())
+    print(f"Saved cleaned data to {DATA_PROCESSED_DIR} ({len(files)} partition files)")
+    return files
+
+
+def save_pii_data(pii_df: pd.DataFrame):
+    """Write the PII/blob columns split off by compact_frame()."""
+    DATA_PII_PATH.parent.mkdir(parents=True, exist_ok=True)
+    pii_df.to_parquet(DATA_PII_PATH, index=False)
+    print(f"Saved PII/blob columns to {DATA_PII_PATH}")
+
+
+def save_key_index(df: pd.DataFrame) -> OrderItemKeySet:
+    """Persist the order_item_id values of a fully cleaned frame."""
+    key_set = OrderItemKeySet()
+    if "order_item_id" in df.columns:
+        key_set.add(df["order_item_id"].dropna().to_numpy(dtype=np.int64))
+    key_set.save(DATA_KEY_INDEX_PATH)
+    return key_set
+
+
+# ----------------------------------------------------------
+# STREAMING INGEST
+# ----------------------------------------------------------
+
+def dedupe_against(df: pd.DataFrame, key_set: OrderItemKeySet) -> pd.DataFrame:
+    """
+    Keep the first occurrence of each order_item_id not already in `key_set`,
+    and record the kept ids in the set.
+
+    Rows without an order_item_id cannot be keyed and pass through unchanged.
+    """
+    if "order_item_id" not in df.columns:
+        return df
+
+    ids = df["order_item_id"]
+    keyed = ids.notna().to_numpy()
+    keep = ~keyed
+    keyed_ids = ids[keyed].to_numpy(dtype=np.int64)
+    keep[keyed] = key_set.new_mask(keyed_ids)
+
+    key_set.add(ids[keep & keyed].to_numpy(dtype=np.int64))
+    return df[keep]
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _timed(iterable, timings: dict, stage: str):
+    """Re-yield `iterable`, charging the time spent producing items to `stage`."""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        _add_time(timings, stage, start)
+        yield item
+
+
+def _write_chunks(
+    chunks,
+    writer: PartitionedParquetWriter,
+    key_set: OrderItemKeySet,
+    pii_out_path: Path = None,
+    workers: int = INGEST_WORKERS,
+) -> dict:
+    """
+    Clean raw CSV chunks and write them through a partitioned writer.
+
+    Only one chunk (or, with workers > 1, a bounded window of chunks) plus
+    the order_item_id key set is held in memory at a time. Cleaning runs in
+    the pool; dedupe, compaction and writing stay in this process, in chunk
+    order. The writer's files are returned under stats["files"]; on error
+    they are deleted so no half-written fragment is left behind.
+    """
+    pii_tmp_path = None
+    if pii_out_path is not None:
+        pii_out_path.parent.mkdir(parents=True, exist_ok=True)
+        pii_tmp_path = pii_out_path.with_name(pii_out_path.name + ".tmp")
+
+    pii_writer = None
+    stats = {
+        "rows_in": 0,
+        "rows_out": 0,
+        "chunks": 0,
+        "bytes_before": 0,
+        "bytes_after": 0,
+        "files": [],
+        "timings": defaultdict(float),
+    }
+    timings = stats["timings"]
+
+    try:
+        cleaned = iter_clean_chunks(_timed(chunks, timings, "read"), workers, timings)
+        for df, rows_in in _timed(cleaned, timings, "read+clean"):
+            stats["rows_in"] += rows_in
+            stats["chunks"] += 1
+
+            start = time.perf_counter()
+            df = dedupe_against(df, key_set)
+            df = drop_incomplete_rows(df)
+            start = _add_time(timings, "dedupe", start)
+            if df.empty:
+                continue
+
+            stats["bytes_before"] += frame_nbytes(df)
+            df, pii_df = compact_frame(df, keep_pii=pii_out_path is not None)
+            stats["bytes_after"] += frame_nbytes(df)
+            start = _add_time(timings, "compact", start)
+
+            df = add_partition_columns(df)
+            writer.write(df)
+            stats["rows_out"] += len(df)
+            del df
+            _add_time(timings, "write", start)
+
+            if pii_df is not None:
+                pii_table = pa.Table.from_pandas(pii_df, preserve_index=False)
+                if pii_writer is None:
+                    pii_writer = pq.ParquetWriter(pii_tmp_path, pii_table.schema)
+                pii_writer.write_table(conform_table(pii_table, pii_writer.schema))
+    except Exception:
+        writer.abort()
+        if pii_writer is not None:
+            pii_writer.close()
+            pii_tmp_path.unlink(missing_ok=True)
+        raise
+
+    stats["files"] = writer.close()
+    if pii_writer is not None:
+        pii_writer.close()
+        pii_tmp_path.replace(pii_out_path)
+        print(f"Saved PII/blob columns to {pii_out_path}")
+
+    return stats
+
+
+def reset_manifest(
+    files: list, rows: int, key_set: OrderItemKeySet, pii_path: Optional[Path] = None
+):
+    """
+    Start a new manifest after a full rebuild and drop old PII fragments.
+    `pii_path` is the base PII file written by this rebuild, if any.
+    """
+    manifest = load_manifest() or {}
+    stale = set(pii_fragment_paths(manifest)) - {pii_path}
+    if DATA_FRAGMENTS_DIR.exists():
+        # Also catches PII deltas of older ingests that were never recorded
+        stale.update(DATA_FRAGMENTS_DIR.glob("pii_delta_*.parquet"))
+    for old in stale:
+        old.unlink(missing_ok=True)
+
+    manifest["fragments"] = []
+    manifest["pii_fragments"] = []
+    add_fragment(manifest, files, rows, kind="base", source=str(DATA_RAW_PATH))
+    if pii_path is not None:
+        add_pii_fragment(manifest, pii_path, rows, kind="base", source=str(DATA_RAW_PATH))
+    manifest["key_count"] = len(key_set)
+    save_manifest(manifest)
+    refresh_derived_stores(manifest)
+
+
+def refresh_derived_stores(manifest: dict, delta_files: Optional[list] = None):
+    """
+    Bring the Arrow snapshot, rollup cube and column stats up to `manifest`.
+
+    Everything streams record batches from the fragments, so memory does not
+    grow with the table. Only fragments without a snapshot file are
+    snapshotted. With `delta_files` (an append), the stored cube and column
+    stats partials of the previous manifest version are reused and only the
+    delta's rows are folded in; either is rebuilt from every fragment if it
+    is missing or out of step.
+    """
+    version = manifest["version"]
+    dataset = open_processed_dataset()
+
+    start = time.perf_counter()
+    written = []
+    for fragment in manifest["fragments"]:
+        path = snapshot_path(fragment)
+        if path.exists():
+            continue
+        part = open_processed_dataset([DATA_PROCESSED_DIR / rel for rel in fragment["files"]])
+        write_snapshot(path, part.schema, lambda columns: part.to_batches(columns=columns))
+        written.append(path)
+    pruned = prune_snapshots(manifest)
+    print(
+        f"Saved Arrow snapshot to {DATA_SNAPSHOT_DIR} "
+        f"({len(written)} new of {len(manifest['fragments'])} fragment files, "
+        f"{sum(p.stat().st_size for p in written) / 1e6:,.1f} MB written, {pruned} pruned, "
+        f"{time.perf_counter() - start:.2f}s)"
+    )
+
+    delta = open_processed_dataset(delta_files) if delta_files is not None else None
+
+    start = time.perf_counter()
+    stored = read_cube() if delta is not None else None
+    folded = stored is not None and stored[1] == version - 1
+    cube = build_cube_from_batches(
+        coalesce_batches(
+            (delta if folded else dataset).to_batches(columns=cube_source_columns())
+        ),
+        base=stored[0] if folded else None,
+    )
+    save_cube(cube, version)
+    print(
+        f"Saved rollup cube to {DATA_ROLLUP_PATH} "
+        f"({len(cube):,} groups, {'delta folded' if folded else 'full build'}, "
+        f"{time.perf_counter() - start:.2f}s)"
+    )
+
+    start = time.perf_counter()
+    builder = ColumnStatsBuilder.load(dataset.schema, version - 1) if delta is not None else None
+    folded = builder is not None
+    if not folded:
+        builder = ColumnStatsBuilder(dataset.schema)
+    for batch in coalesce_batches((delta if folded else dataset).to_batches()):
+        builder.add_batch(batch)
+    builder.save(version)
+    print(
+        f"Saved column statistics to {DATA_COLUMN_STATS_PATH} "
+        f"({len(dataset.schema)} columns, {'delta folded' if folded else 'full build'}, "
+        f"{time.perf_counter() - start:.2f}s)"
+    )
+
+
+def stream_ingest(chunksize: int = INGEST_CHUNKSIZE, workers: int = INGEST_WORKERS) -> dict:
+    """Rebuild the processed dataset from the raw CSV, one chunk at a time."""
+    key_set = OrderItemKeySet()
+    writer = _new_staging_writer()
+    stats = _write_chunks(
+        iter_csv_chunks(DATA_RAW_PATH, chunksize),
+        writer,
+        key_set,
+        pii_out_path=DATA_PII_PATH if STORE_PII_COLUMNS else None,
+        workers=workers,
+    )
+    if not stats["rows_out"]:
+        raise ValueError(f"No rows left after cleaning {DATA_RAW_PATH}")
+
+    files = _swap_in_dataset(writer.base_dir, stats["files"])
+    key_set.save(DATA_KEY_INDEX_PATH)
+    reset_manifest(
+        files, stats["rows_out"], key_set, pii_path=DATA_PII_PATH if STORE_PII_COLUMNS else None
+    )
+    print(
+        f"Saved cleaned data to {DATA_PROCESSED_DIR} "
+        f"({stats['chunks']} chunks, {len(files)} partition files)"
+    )
+    print_memory_report(stats["bytes_before"], stats["bytes_after"])
+    return stats
+
+
+# ----------------------------------------------------------
+# INCREMENTAL APPEND
+# ----------------------------------------------------------
+
+def _rebuild_key_set(manifest: dict) -> OrderItemKeySet:
+    """Re-derive the key set from the order_item_id column of every fragment."""
+    key_set = OrderItemKeySet()
+    for path in fragment_paths(manifest):
+        ids = pq.read_table(path, columns=["order_item_id"]).column(0)
+        key_set.add(ids.drop_null().to_numpy())
+    return key_set
+
+
+def load_key_set(manifest: dict) -> OrderItemKeySet:
+    """
+    Load the persisted key set, rebuilding it if it is out of step with the
+    manifest (e.g. an earlier append was interrupted between the two writes).
+    """
+    key_set = OrderItemKeySet.load(DATA_KEY_INDEX_PATH)
+    if len(key_set) != manifest.get("key_count"):
+        print("Key index does not match manifest; rebuilding from fragments...")
+        key_set = _rebuild_key_set(manifest)
+    return key_set
+
+
+def append_delta(
+    delta_path: Path, chunksize: int = INGEST_CHUNKSIZE, workers: int = INGEST_WORKERS
+) -> dict:
+    """
+    Add the rows of a delta CSV that are not yet in the processed dataset.
+
+    Only the delta is parsed and cleaned; history is touched solely through
+    the sorted order_item_id index. New rows land in one extra fragment
+    (one file per partition they touch) that is registered in the manifest.
+    """
+    manifest = load_manifest()
+    if manifest is None:
+        raise FileNotFoundError(
+            f"No processed dataset at {DATA_PROCESSED_DIR}; run a full ingest first."
+        )
+
+    key_set = load_key_set(manifest)
+    schema = pq.read_schema(fragment_paths(manifest)[0])
+
+    batch_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    writer = PartitionedParquetWriter(
+        DATA_PROCESSED_DIR, PARTITION_COLUMNS, basename=f"delta_{batch_id}", schema=schema
+    )
+    pii_out_path = None
+    if STORE_PII_COLUMNS:
+        pii_out_path = DATA_FRAGMENTS_DIR / f"pii_delta_{batch_id}.parquet"
+
+    stats = _write_chunks(
+        iter_csv_chunks(delta_path, chunksize),
+        writer,
+        key_set,
+        pii_out_path=pii_out_path,
+        workers=workers,
+    )
+    if not stats["rows_out"]:
+        print(f"No new rows in {delta_path}; nothing appended.")
+        return stats
+
+    # Manifest first, then keys: a crash in between is caught by load_key_set()
+    add_fragment(
+        manifest, stats["files"], stats["rows_out"], kind="append", source=str(delta_path)
+    )
+    if pii_out_path is not None:
+        add_pii_fragment(
+            manifest, pii_out_path, stats["rows_out"], kind="append", source=str(delta_path)
+        )
+    manifest["key_count"] = len(key_set)
+    save_manifest(manifest)
+    key_set.save(DATA_KEY_INDEX_PATH)
+    refresh_derived_stores(manifest, delta_files=stats["files"])
+
+    print(
+        f"Appended {stats['rows_out']:,} new rows as fragment delta_{batch_id} "
+        f"({len(stats['files'])} partition files)"
+    )
+    return stats
+
+
+def print_ingest_report(rows_in: int, rows_out: int, elapsed: float):
+    """Print throughput and peak memory for an ingest run."""
+    rows_per_sec = rows_in / elapsed if elapsed > 0 else float("inf")
+    peak = _peak_rss_mb()
+    print(f"Rows read: {rows_in:,}  |  rows written: {rows_out:,}")
+    print(f"Elapsed: {elapsed:.2f}s  |  {rows_per_sec:,.0f} rows/sec")
+    if peak is not None:
+        print(f"Peak RSS: {peak:,.1f} MB")
+
+
+def print_stage_timings(timings: dict, workers: int):
+    """
+    Print where ingest time went.
+
+    Wall-clock stages add up to the run time; the indented clean.* stages are
+    seconds spent inside clean_columns() summed over all workers, so with N
+    workers they can exceed the clean wall time by up to N times.
+    """
+    timings = dict(timings)
+    if "read+clean" in timings:
+        # The clean loop pulls chunks from the reader, so split the two
+        timings["clean"] = timings.pop("read+clean") - timings.get("read", 0.0)
+
+    print(f"Stage timings ({resolve_workers(workers)} worker(s)):")
+    for stage in ["read", "clean", "dedupe", "compact", "write"]:
+        if stage in timings:
+            print(f"  {stage:<16}{timings[stage]:8.2f}s")
+    for stage in sorted(k for k in timings if k.startswith("clean.")):
+        print(f"    {stage:<14}{timings[stage]:8.2f}s  (summed over workers)")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the DataCo CSV into parquet.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read the CSV in chunks with bounded memory.",
+    )
+    mode.add_argument(
+        "--append",
+        metavar="DELTA_CSV",
+        type=Path,
+        help="Clean only the rows of DELTA_CSV and add the new ones as a fragment.",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=INGEST_CHUNKSIZE,
+        help=f"Rows per chunk in --stream/--append mode (default {INGEST_CHUNKSIZE}).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=INGEST_WORKERS,
+        help=f"Processes used to clean the data; 0 = one per core (default {INGEST_WORKERS}).",
+    )
+    args = parser.parse_args()
+
     print("Project root detected as:", PROJECT_ROOT)
-    print("Using raw data path:", DATA_RAW_PATH)
+    start = time.perf_counter()
+
+    if args.append:
+        print("Appending delta:", args.append)
+        stats = append_delta(args.append, args.chunksize, args.workers)
+        rows_in, rows_out = stats["rows_in"], stats["rows_out"]
+        timings = stats["timings"]
+    elif args.stream:
+        print("Using raw data path:", DATA_RAW_PATH)
+        stats = stream_ingest(args.chunksize, args.workers)
+        rows_in, rows_out = stats["rows_in"], stats["rows_out"]
+        timings = stats["timings"]
+    else:
+        print("Using raw data path:", DATA_RAW_PATH)
+        timings = defaultdict(float)
+        stage_start = time.perf_counter()
+        df_raw = load_raw_data()
+        stage_start = _add_time(timings, "read", stage_start)
+        print("Raw columns:", list(df_raw.columns))
+        rows_in = len(df_raw)
 
-    df_raw = load_raw_data()
-    print("Raw columns:", list(df_raw.columns))
+        stage_start = time.perf_counter()
+        df_clean = clean_data(df_raw, args.workers, timings)
+        # clean_data() records its dedupe time itself
+        timings["clean"] += time.perf_counter() - stage_start - timings["dedupe"]
+        del df_raw
+        print("Cleaned columns:", list(df_clean.columns))
+        rows_out = len(df_clean)
+        key_set = save_key_index(df_clean)
 
-    df_clean = clean_data(df_raw)
-    print("Cleaned columns:", list(df_clean.columns))
+        stage_start = time.perf_counter()
+        bytes_before = frame_nbytes(df_clean)
+        df_clean, pii_df = compact_frame(df_clean, keep_pii=STORE_PII_COLUMNS)
+        print_memory_report(bytes_before, frame_nbytes(df_clean))
+        stage_start = _add_time(timings, "compact", stage_start)
+
+        files = save_processed_data(df_clean)
+        if pii_df is not None:
+            save_pii_data(pii_df)
+        _add_time(timings, "write", stage_start)
+        reset_manifest(
+            files, rows_out, key_set, pii_path=DATA_PII_PATH if pii_df is not None else None
+        )
 
-    save_processed_data(df_clean)
+    print_ingest_report(rows_in, rows_out, time.perf_counter() - start)
+    print_stage_timings(timings, args.workers)
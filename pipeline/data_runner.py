@@ -1,18 +1,82 @@
 """
 Data runner utilities:
-- load_processed_df: load cleaned parquet file
+- load_processed_df: load cleaned parquet fragments listed in the manifest,
+  with optional column projection and partition/row-group filters; unfiltered
+  loads come from the memory-mapped Arrow snapshot when it is current
 - run_pandas_code: safely execute LLM-generated pandas code
 """
 
 import re
+from pathlib import Path
+from typing import List, Optional
+
 import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config import DATA_PROCESSED_DIR, PARTITION_COLUMNS
+from pipeline.arrow_snapshot import open_snapshot
+from pipeline.manifest import fragment_paths, is_partitioned
+from pipeline.schema import partition_schema, widen_for_analysis
+
+
+def open_processed_dataset(paths: Optional[List[Path]] = None) -> ds.Dataset:
+    """
+    Arrow dataset over every file listed in the manifest (or just `paths`).
+
+    Partition values (market, order_year) are parsed from the hive paths, so
+    filters on them prune whole files before any of them is opened.
+    """
+    if paths is None:
+        paths = fragment_paths()
+    if not is_partitioned(paths):
+        return ds.dataset([str(p) for p in paths], format="parquet")
+    return ds.dataset(
+        [str(p) for p in paths],
+        format="parquet",
+        partitioning=ds.HivePartitioning.discover(
+            schema=partition_schema(PARTITION_COLUMNS)
+        ),
+        partition_base_dir=str(DATA_PROCESSED_DIR),
+    )
+
+
+def to_filter_expression(filters) -> Optional[ds.Expression]:
+    """
+    Accept a pyarrow Expression or pandas-style DNF filters, e.g.
+    [("market", "==", "Europe"), ("order_year", "==", 2017)].
+    """
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
 
-from config import DATA_PROCESSED_PATH
 
+def load_processed_df(
+    columns: Optional[List[str]] = None,
+    filters=None,
+    use_snapshot: bool = True,
+) -> pd.DataFrame:
+    """
+    Load the cleaned orders dataframe (base dataset plus appended fragments).
+
+    - `columns` limits which columns are read from disk
+    - `filters` is pushed down: partition filters skip files, other
+      predicates skip row groups whose min/max statistics cannot match
+    - Without filters, a fresh Arrow snapshot is memory-mapped instead;
+      numeric and datetime columns then stay read-only views of the shared
+      page cache (split_blocks keeps pandas from consolidating them into
+      private 2-D blocks)
+    - int8 storage columns are widened (schema.widen_for_analysis) so that
+      arithmetic in generated code cannot overflow
+    """
+    if use_snapshot and filters is None:
+        table = open_snapshot(columns)
+        if table is not None:
+            return widen_for_analysis(table).to_pandas(split_blocks=True)
 
-def load_processed_df() -> pd.DataFrame:
-    """Load the cleaned orders dataframe from parquet."""
-    return pd.read_parquet(DATA_PROCESSED_PATH)
+    dataset = open_processed_dataset()
+    table = dataset.to_table(columns=columns, filter=to_filter_expression(filters))
+    return widen_for_analysis(table).to_pandas()
 
 
 def clean_code(raw_code: str) -> str:
@@ -62,10 +126,13 @@ def run_pandas_code(df: pd.DataFrame, raw_code: str):
         # Try to coerce Series/list/dict into a DataFrame
         result_df = pd.DataFrame(result_df)
 
-    summary_stats = {
+    return result_df, summarize_result(result_df)
+
+
+def summarize_result(result_df: pd.DataFrame) -> dict:
+    """Shape and dtypes of a result table, as passed to generate_insights()."""
+    return {
         "rows": len(result_df),
         "columns": list(result_df.columns),
         "dtypes": {col: str(result_df[col].dtype) for col in result_df.columns},
     }
-
-    return result_df, summary_stats
@@ -0,0 +1,196 @@
+"""
+Process-wide cache of the processed orders frame.
+
+- One loaded frame per process, shared by every question and Streamlit session
+- Keyed by a dataset fingerprint: a content hash of the manifest (or the
+  mtime/size of a legacy single parquet file); the hash is only recomputed
+  when the manifest's mtime or size changes
+- Reloads only when the fingerprint changes, e.g. after an --append ingest
+- Column-aware: get_orders_df(columns=[...]) loads only the columns that are
+  not cached yet, so the cached frame grows to the working set of columns
+  the generated code actually uses instead of the full table
+- Hit/miss/load-time counters via cache_stats()
+- Callers share the cached arrays through shallow copies, which relies on
+  copy-on-write (the default from pandas 3; enabled here on pandas 2) so
+  that generated code assigning into df cannot mutate the cache
+"""
+
+import hashlib
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from config import DATA_MANIFEST_PATH, DATA_PROCESSED_PATH
+from pipeline.data_runner import load_processed_df, open_processed_dataset
+from pipeline.schema import widen_for_analysis
+
+# Shallow copies handed to exec'd code are only isolated under copy-on-write
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+_lock = threading.Lock()
+_cached_df: Optional[pd.DataFrame] = None
+_cached_fingerprint: Optional[str] = None
+_cached_complete = False  # True once every dataset column is loaded
+_dataset_columns: Optional[List[str]] = None
+_schema_fingerprint: Optional[str] = None
+
+# (path, mtime_ns, size) -> fingerprint of the last file we hashed
+_stat_key = None
+_stat_fingerprint = None
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "loads": 0,
+    "last_load_seconds": 0.0,
+    "total_load_seconds": 0.0,
+}
+
+
+def dataset_fingerprint() -> str:
+    """Identify the current version of the processed dataset."""
+    global _stat_key, _stat_fingerprint
+
+    path = DATA_MANIFEST_PATH if DATA_MANIFEST_PATH.exists() else DATA_PROCESSED_PATH
+    st = path.stat()
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    if key == _stat_key:
+        return _stat_fingerprint
+
+    if path == DATA_MANIFEST_PATH:
+        fingerprint = "manifest:" + hashlib.sha1(path.read_bytes()).hexdigest()
+    else:
+        fingerprint = f"file:{st.st_mtime_ns}:{st.st_size}"
+
+    _stat_key, _stat_fingerprint = key, fingerprint
+    return fingerprint
+
+
+def dataset_columns() -> List[str]:
+    """Column names of the processed dataset, read from the schema only."""
+    global _dataset_columns
+    with _lock:
+        _refresh_locked()
+        if _dataset_columns is None:
+            _dataset_columns = open_processed_dataset().schema.names
+        return list(_dataset_columns)
+
+
+def schema_fingerprint() -> str:
+    """
+    Hash of the dataset's column names and types. Unlike dataset_fingerprint()
+    it survives appends, so it keys things that depend only on the schema
+    (e.g. cached generated code).
+    """
+    global _schema_fingerprint
+    with _lock:
+        _refresh_locked()
+        if _schema_fingerprint is None:
+            schema = open_processed_dataset().schema
+            spec = "|".join(f"{f.name}:{f.type}" for f in schema)
+            _schema_fingerprint = hashlib.sha1(spec.encode("utf-8")).hexdigest()[:16]
+        return _schema_fingerprint
+
+
+def _refresh_locked():
+    """Drop everything cached for an older dataset version (caller holds _lock)."""
+    global _cached_df, _cached_fingerprint, _cached_complete, _dataset_columns, _schema_fingerprint
+    fingerprint = dataset_fingerprint()
+    if fingerprint != _cached_fingerprint:
+        _cached_df = None
+        _cached_complete = False
+        _dataset_columns = None
+        _schema_fingerprint = None
+        _cached_fingerprint = fingerprint
+
+
+def _load_locked(columns: Optional[List[str]]):
+    """Load `columns` (None = all missing ones) and merge them into the cache."""
+    global _cached_df, _cached_complete
+
+    start = time.perf_counter()
+    all_columns = open_processed_dataset().schema.names
+    if _cached_df is None:
+        _cached_df = load_processed_df(columns=columns)
+    else:
+        if columns is None:
+            columns = [c for c in all_columns if c not in _cached_df.columns]
+        # Fragments are read in manifest order, so rows line up with the cache
+        new = load_processed_df(columns=columns)
+        _cached_df = pd.concat([_cached_df, new], axis=1)
+    elapsed = time.perf_counter() - start
+
+    _cached_complete = len(_cached_df.columns) >= len(all_columns)
+    _stats["loads"] += 1
+    _stats["last_load_seconds"] = elapsed
+    _stats["total_load_seconds"] += elapsed
+
+
+def get_orders_df(columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Return the processed orders frame, loading it only on first use or after
+    the dataset changed on disk.
+
+    With `columns`, only those columns are returned (and only the missing
+    ones are read from disk); without, the full frame is returned.
+
+    Callers get a shallow copy or projection; with copy-on-write, adding,
+    dropping or assigning into columns does not touch the cached frame.
+    """
+    with _lock:
+        _refresh_locked()
+
+        if columns is None:
+            needed = None if not _cached_complete else []
+        else:
+            columns = list(dict.fromkeys(columns))
+            cached = set(_cached_df.columns) if _cached_df is not None else set()
+            needed = [c for c in columns if c not in cached]
+
+        if needed == []:
+            _stats["hits"] += 1
+        else:
+            _stats["misses"] += 1
+            _load_locked(needed)
+
+        if columns is None:
+            return _cached_df.copy(deep=False)
+        return _cached_df[columns]
+
+
+def cache_stats() -> dict:
+    """Counters plus the fingerprint and shape of the cached frame."""
+    with _lock:
+        stats = dict(_stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["fingerprint"] = _cached_fingerprint
+        stats["rows"] = len(_cached_df) if _cached_df is not None else 0
+        stats["columns_loaded"] = len(_cached_df.columns) if _cached_df is not None else 0
+        return stats
+
+
+def clear_cache():
+    """Drop the cached frame and everything derived from it (counters are kept)."""
+    global _cached_df, _cached_fingerprint, _cached_complete, _dataset_columns, _schema_fingerprint
+    global _stat_key, _stat_fingerprint
+    with _lock:
+        _cached_df = None
+        _cached_fingerprint = None
+        _cached_complete = False
+        _dataset_columns = None
+        _schema_fingerprint = None
+        _stat_key = _stat_fingerprint = None
+
+
+def load_sample_df(n: int = 100) -> pd.DataFrame:
+    """First `n` rows of the dataset, read from the first row group(s) only."""
+    return widen_for_analysis(open_processed_dataset().head(n)).to_pandas()
+
+
+def processed_row_count() -> int:
+    """Total row count from parquet footers, without reading any data pages."""
+    return open_processed_dataset().count_rows()
@@ -1,12 +1,19 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from textwrap import dedent
 import pandas as pd
-from openai import OpenAI
-from config import LLM_MODEL_NAME, USE_TINYLLAMA_LOCAL
+from config import NARRATIVE_BACKEND
 from rag.retriever import retrieve_context
-from finetuning.tinyllama_narrative import generate_narrative_tinyllama
+from pipeline.column_stats import column_stats
+from pipeline.llm_client import get_provider
+from pipeline.request_context import RequestContext
 
-client = OpenAI()
+
+def _dataset_stats(metric_col: str):
+    """Precomputed whole-dataset stats of a result column, if it is a raw column."""
+    stats = column_stats(metric_col)
+    if stats is None or stats.get("mean") is None:
+        return None
+    return stats
 
 def generate_data_driven_insight(question: str, result_df: pd.DataFrame) -> str:
     """
@@ -106,6 +113,9 @@ def generate_data_driven_insight(question: str, result_df: pd.DataFrame) -> str:
                     
                     insight += f"**📊 Statistical Context**\n\n"
                     insight += f"• **Organization Average:** {mean_val:.1%}\n"
+                    overall = _dataset_stats(cols[1])
+                    if overall is not None and 0 <= overall["mean"] <= 1:
+                        insight += f"• **All Order Lines:** {overall['mean']:.1%} across {overall['rows']:,} lines\n"
                     insight += f"• **Standard Deviation:** {std_val:.2%} ({'high variance - inconsistent performance' if std_val > 0.05 else 'low variance - consistent performance'})\n"
                     insight += f"• **Range:** {worst_val:.1%} to {best_val:.1%}\n\n"
                     
@@ -180,6 +190,14 @@ def generate_data_driven_insight(question: str, result_df: pd.DataFrame) -> str:
                 
                 insight = f"**Financial Analysis:** {category} generates {formatted}, representing {pct:.1f}% of total {cols[1].replace('_', ' ')} ({total_fmt}).\n\n"
                 
+                overall = _dataset_stats(cols[1])
+                if overall is not None and overall.get("quantiles"):
+                    insight += (
+                        f"**Dataset Context:** Across all {overall['rows']:,} order lines, "
+                        f"{cols[1].replace('_', ' ')} averages {overall['mean']:,.2f} "
+                        f"(median {overall['quantiles']['0.5']:,.2f}).\n\n"
+                    )
+                
                 if len(result_df) >= 5:
                     top_5_total = result_df.head(5)[cols[1]].sum()
                     top_5_pct = (top_5_total / total * 100)
@@ -214,58 +232,53 @@ def generate_data_driven_insight(question: str, result_df: pd.DataFrame) -> str:
     return "Analysis complete. Review the data table for detailed patterns."
 
 
-def generate_insights(
-    user_question: str,
-    result_df: pd.DataFrame,
-    summary_stats: Dict,
-) -> str:
-    """
-    Main insight generation function.
-    
-    Uses data-driven approach for reliability since TinyLlama 1.1B
-    produces inconsistent results for complex analytical tasks.
-    """
-    
-    # OPTION 1: Force data-driven (most reliable) - CURRENTLY ACTIVE
-    return generate_data_driven_insight(user_question, result_df)
-    
-    # OPTION 2: Try TinyLlama with fallback (if you want to test)
-    # Uncomment below to try TinyLlama again:
-    """
-    if USE_TINYLLAMA_LOCAL:
-        try:
-            kb_docs = retrieve_context(user_question, top_k=3)
-            context_texts = "\n\n".join([d["text"] for d in kb_docs])
-            results_preview = result_df.head(5).to_markdown()
-            
-            tinyllama_output = generate_narrative_tinyllama(
-                question=user_question,
-                results_preview_md=results_preview,
-                summary_stats=summary_stats,
-                kb_context_text=context_texts,
-            )
-            
-            # Check if output is good (not empty and doesn't contain system prompt)
-            if tinyllama_output and len(tinyllama_output) > 50:
-                if not any(bad in tinyllama_output.lower() for bad in 
-                          ['you are a', 'business analyst', 'analyze supply']):
-                    return tinyllama_output
-            
-            # If TinyLlama output is bad, use data-driven fallback
-            print("⚠️ TinyLlama output not good, using data-driven insight")
-        except Exception as e:
-            print(f"⚠️ TinyLlama error: {e}")
-        
-        return generate_data_driven_insight(user_question, result_df)
-    
-    # OpenAI path
+def _kb_context_text(user_question: str, ctx: Optional[RequestContext], top_k: int = 3) -> str:
+    """KB context for the narrative, reusing the request's retrieval."""
+    if ctx is not None:
+        kb_docs = ctx.kb_context(top_k)
+    else:
+        kb_docs = retrieve_context(user_question, top_k=top_k)
+    return "\n\n".join([d["text"] for d in kb_docs])
+
+
+def _tinyllama_insight(user_question, result_df, summary_stats, ctx) -> Optional[str]:
+    """TinyLlama narrative, or None if its output is unusable."""
     try:
-        kb_docs = retrieve_context(user_question, top_k=3)
+        # torch / transformers / peft load only when this backend is used
+        from finetuning.tinyllama_narrative import generate_narrative_tinyllama
+
+        tinyllama_output = generate_narrative_tinyllama(
+            question=user_question,
+            results_preview_md=result_df.head(5).to_markdown(),
+            summary_stats=summary_stats,
+            kb_context_text=_kb_context_text(user_question, ctx),
+        )
+
+        # Check if output is good (not empty and doesn't contain system prompt)
+        if tinyllama_output and len(tinyllama_output) > 50:
+            if not any(bad in tinyllama_output.lower() for bad in
+                      ['you are a', 'business analyst', 'analyze supply']):
+                return tinyllama_output
+
+        # If TinyLlama output is bad, use data-driven fallback
+        print("⚠️ TinyLlama output not good, using data-driven insight")
+    except Exception as e:
+        print(f"⚠️ TinyLlama error: {e}")
+    return None
+
+
+def _openai_insight(user_question, result_df, ctx) -> Optional[str]:
+    """OpenAI narrative grounded in the KB context, or None on failure."""
+    try:
+        context_texts = _kb_context_text(user_question, ctx)
         results_preview = result_df.head(5).to_markdown()
-        
-        prompt = f'''
+
+        prompt = f"""
 Question: {user_question}
 
+Business context:
+{context_texts}
+
 Data:
 {results_preview}
 
@@ -275,18 +288,50 @@ Provide a detailed business insight with:
 3. 3-4 specific recommendations
 
 Be comprehensive and use actual data values.
-'''
-        
-        resp = client.chat.completions.create(
-            model=LLM_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "You are a senior business analyst providing detailed insights."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-        )
-        
-        return resp.choices[0].message.content.strip()
-    except:
-        return generate_data_driven_insight(user_question, result_df)
-    """
\ No newline at end of file
+"""
+
+        messages = [
+            {"role": "system", "content": "You are a senior business analyst providing detailed insights."},
+            {"role": "user", "content": prompt}
+        ]
+
+        on_token = ctx.token_callback("narrative_token") if ctx is not None else None
+        if on_token is None:
+            return get_provider().complete(messages, temperature=0.3).strip()
+
+        # Stream the narrative so the UI can show it as it is written
+        parts = []
+        for text in get_provider().stream(messages, temperature=0.3):
+            parts.append(text)
+            on_token(text)
+        return "".join(parts).strip()
+    except Exception as e:
+        print(f"⚠️ OpenAI insight error: {e}")
+        return None
+
+
+def generate_insights(
+    user_question: str,
+    result_df: pd.DataFrame,
+    summary_stats: Dict,
+    ctx: Optional[RequestContext] = None,
+) -> str:
+    """
+    Main insight generation function.
+
+    NARRATIVE_BACKEND picks the generator: "data_driven" (default; TinyLlama
+    1.1B produces inconsistent results for complex analytical tasks),
+    "tinyllama" or "openai". The model backends fall back to the
+    data-driven insight on bad output or errors, and take their KB context
+    from the request's shared retrieval when `ctx` is given.
+    """
+    if NARRATIVE_BACKEND == "tinyllama" and result_df is not None and not result_df.empty:
+        narrative = _tinyllama_insight(user_question, result_df, summary_stats, ctx)
+        if narrative:
+            return narrative
+    elif NARRATIVE_BACKEND == "openai" and result_df is not None and not result_df.empty:
+        narrative = _openai_insight(user_question, result_df, ctx)
+        if narrative:
+            return narrative
+
+    return generate_data_driven_insight(user_question, result_df)
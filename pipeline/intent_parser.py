@@ -0,0 +1,425 @@
+"""
+Rule-based parser for the common "<metric> by <segment>" question shapes.
+
+- Recognises the templates of synthetic/generate_qa.py and close variants:
+  "What is the X by Y?", "Which Y has the highest X?", "Compare X across
+  Y", "How does X vary across Y groups?", "Top N Y by X"
+- Metric and segment phrases come from the alias tables below plus column
+  synonyms read from the KB (column bullets such as "- `order_region`: ..."
+  and metric definition titles such as "On-Time Delivery Rate")
+- parse_question() returns an Intent (metric, aggregation, group keys,
+  sort order) or None; an Intent renders canonical pandas code or DuckDB
+  SQL locally, so a parsed question never needs the LLM
+- Deliberately conservative: each shape must match the whole sentence, with
+  only the lead-in, aggregation and filler words listed below around one
+  metric and one or two segments; other sentences may only state the goal.
+  Filter values, years, comparisons or any other words the shapes do not
+  cover send the question to the code generator
+- The rollup cube answers Intents directly when it has them materialized
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from config import KB_BASE_PATH
+
+MONTH_COLUMN = "order_month"
+
+# Phrases that name a metric or a segment column. Matching is longest phrase
+# first across all columns, so "order profit per order" is not read as
+# "profit per order"
+METRIC_ALIASES = [
+    ("on_time_delivery", ["on_time_delivery", "on-time delivery", "on time delivery", "on-time", "on time"]),
+    ("late_delivery_risk", ["late_delivery_risk", "late delivery risk", "late delivery", "delivery risk"]),
+    ("shipping_delay_days", ["shipping_delay_days", "shipping delay", "delay days", "delay"]),
+    ("days_for_shipping_real", ["days_for_shipping_real", "actual shipping days", "real shipping days"]),
+    ("days_for_shipment_scheduled", ["days_for_shipment_scheduled", "scheduled shipping days"]),
+    ("benefit_per_order", ["benefit_per_order", "benefit per order", "benefit", "profit per order"]),
+    ("order_profit_per_order", ["order_profit_per_order", "order profit", "profit"]),
+    ("order_item_profit_ratio", ["order_item_profit_ratio", "profit ratio", "margin"]),
+    ("order_item_quantity", ["order_item_quantity", "item quantity", "quantity", "units"]),
+    ("order_item_discount_rate", ["order_item_discount_rate", "discount rate"]),
+    ("order_item_discount", ["order_item_discount", "discount"]),
+    ("order_item_total", ["order_item_total", "order item total", "line total"]),
+    ("sales", ["sales", "revenue"]),
+]
+
+SEGMENT_ALIASES = [
+    ("customer_segment", ["customer_segment", "customer segment", "segment"]),
+    ("order_region", ["order_region", "region"]),
+    ("order_country", ["order_country", "country", "countries"]),
+    ("order_state", ["order_state", "state"]),
+    ("order_city", ["order_city", "city", "cities"]),
+    ("market", ["market"]),
+    ("category_name", ["category_name", "product category", "category", "categories"]),
+    ("department_name", ["department_name", "department"]),
+    ("product_name", ["product_name", "product"]),
+    ("payment_type", ["payment_type", "payment type", "payment method", "payment"]),
+    ("shipping_mode", ["shipping_mode", "shipping mode", "ship mode"]),
+    ("delivery_status", ["delivery_status", "delivery status"]),
+    (MONTH_COLUMN, ["order_month", "month"]),
+]
+
+# Group keys separating the metric from the segments, e.g. "<m> by <s>"
+_CONNECTOR = r"(?:by|per|for each|for every|for|across|among|between|broken down by|split by|grouped by)"
+# Words that may follow a metric name: "on_time_delivery rate by region"
+_METRIC = r"<m>(?:\s+(?:rate|ratio|percentage|pct|share|level|values?|amount|figures?|trend))?"
+_SEGMENTS = (
+    r"(?:(?:the|each|every|all|different|various)\s+)*<s>(?:\s*(?:,|and|by|per|x)\s*<s>)?"
+    r"(?:\s+(?:groups?|segments?|types?|values?))?"
+)
+# Aggregation words allowed in front of the metric: "the total", "average of"
+_AGG_WORDS = (
+    r"(?:(?:the\s+)?(?:total|sum(?:\s+of)?|overall|average|avg|mean|minimum|min|maximum|max|"
+    r"number\s+of|count\s+of|std|standard\s+deviation\s+of|variability\s+of|monthly)\s+){0,2}"
+)
+# Lead-ins of a question or request; nothing else may precede the shape
+_LEAD = (
+    r"(?:(?:what\s+(?:is|are|was|were)|what's|show(?:\s+me)?|give\s+me|list|display|plot|"
+    r"calculate|compute|get|find|tell\s+me|compare|break\s+down|summari[sz]e)\s+)?(?:the\s+)?"
+)
+_SUPERLATIVE = (
+    r"(?:highest|lowest|most|least|best|worst|largest|smallest|biggest|greatest|top|bottom)"
+)
+# Words allowed after the shape
+_TAIL = r"(?:\s+(?:overall|please|in\s+total))?"
+
+# Each shape must match the whole sentence (minus final punctuation), so an
+# unrecognised qualifier such as "for late orders" rejects the question
+# instead of being dropped
+SHAPES = [
+    ("breakdown", re.compile(rf"{_LEAD}{_AGG_WORDS}{_METRIC}\s+{_CONNECTOR}\s+{_SEGMENTS}{_TAIL}")),
+    ("vary", re.compile(
+        rf"(?:how\s+(?:does|do|did)\s+)?(?:the\s+)?{_AGG_WORDS}{_METRIC}\s+"
+        rf"(?:vary|varies|differ|differs|change|changes)\s+{_CONNECTOR}\s+{_SEGMENTS}{_TAIL}"
+    )),
+    ("ranking", re.compile(
+        rf"(?:which|what)\s+<s>\s+(?:has|have|had|shows?|gets?|is|are)\s+(?:the\s+)?"
+        rf"{_SUPERLATIVE}\s+{_AGG_WORDS}{_METRIC}{_TAIL}"
+    )),
+    ("top", re.compile(
+        rf"{_LEAD}(?:top|bottom)\s+(\d+)\s+{_SEGMENTS}\s+by\s+{_AGG_WORDS}{_METRIC}{_TAIL}"
+    )),
+]
+
+# Sentences next to the question that only state the goal ("I want to
+# optimize shipping strategy.") are context; anything else may restrict the
+# rows and sends the question to the LLM
+_CONTEXT_SENTENCE_RE = re.compile(
+    r"(?:i|we)(?:'d|'m|\s+would|\s+am|\s+are)?\s+(?:want|need|like|trying|hope|plan)\b"
+)
+_FILTER_WORDS_RE = re.compile(
+    r"\b(only|just|includ\w*|exclud\w*|except|filter\w*|limit\w*|restrict\w*|ignor\w*|"
+    r"remove|drop|shipped|via|in|from|during|since|before|after|with|without|whose)\b"
+)
+
+# Words the shapes do not cover; a question containing one needs the LLM
+_UNSUPPORTED_RE = re.compile(
+    r"\b(where|only|excluding|except|without|when|if|than|versus|vs|ratio of|median|"
+    r"percentile|correlat\w*|relat\w*|impact|why|predict\w*|forecast\w*|growth|"
+    r"yoy|year|years|quarter|week|day|today|last|previous|next)\b"
+)
+
+_AGG_PATTERNS = [
+    ("sum", re.compile(r"\b(total|sum)\b")),
+    ("count", re.compile(r"\b(how many|count|number of)\b")),
+    ("std", re.compile(r"\b(std|standard deviation|volatility|variability)\b")),
+    ("min", re.compile(r"\b(minimum|min)\b")),
+    ("max", re.compile(r"\b(maximum|max)\b")),
+    ("mean", re.compile(r"\b(average|avg|mean|rate|percentage|share|risk)\b")),
+]
+# Magnitude words sort by value; judgement words (best / worst) by how good
+# the value is, which depends on the metric's polarity
+_ASCENDING_RE = re.compile(r"\b(lowest|least|smallest|fewest)\b")
+_JUDGEMENT_RE = re.compile(r"\b(best|top|worst|bottom)\b")
+_MONTH_RE = re.compile(r"\b(monthly|over time|trend)\b")
+
+# Rows kept for "which <segment> has the highest <metric>"
+RANKING_LIMIT = 20
+
+# Metrics where a lower value is better, so "best" sorts ascending and
+# "worst" descending
+_LOWER_IS_BETTER = {"late_delivery_risk", "shipping_delay_days", "days_for_shipping_real"}
+
+_SQL_AGGREGATES = {
+    "count": "COUNT",
+    "sum": "SUM",
+    "mean": "AVG",
+    "min": "MIN",
+    "max": "MAX",
+    "var": "VAR_SAMP",
+    "std": "STDDEV_SAMP",
+}
+
+
+@dataclass
+class Intent:
+    """One aggregation of a metric over segment columns."""
+
+    metric: str
+    agg: str = "mean"
+    by: List[str] = field(default_factory=list)
+    by_month: bool = False
+    filters: Dict[str, str] = field(default_factory=dict)
+    ascending: bool = False
+    limit: Optional[int] = None
+    shape: str = ""
+
+    def value_column(self) -> str:
+        return self.metric if self.agg in ("mean", "sum") else f"{self.metric}_{self.agg}"
+
+    def to_pandas_code(self) -> str:
+        """Canonical pandas code computing the intent from `df`."""
+        lines = []
+        for col, value in self.filters.items():
+            lines.append(f"df = df[df[{col!r}] == {value!r}]")
+        keys = list(self.by)
+        if self.by_month:
+            lines.append(f"df = df.assign({MONTH_COLUMN}=df['order_date'].dt.to_period('M').dt.to_timestamp())")
+            keys.append(MONTH_COLUMN)
+        lines.append(
+            f"result_df = df.groupby({keys!r})[{self.metric!r}].{self.agg}()"
+            f".rename({self.value_column()!r}).reset_index()"
+        )
+        if not self.by_month:
+            lines.append(
+                f"result_df = result_df.sort_values({self.value_column()!r}, "
+                f"ascending={self.ascending})"
+            )
+        if self.limit:
+            lines.append(f"result_df = result_df.head({self.limit})")
+        return "\n".join(lines)
+
+    def to_sql(self) -> str:
+        """The same aggregation as one DuckDB query over the orders view."""
+        keys = list(self.by)
+        select = list(keys)
+        if self.by_month:
+            select.append(f"date_trunc('month', order_date) AS {MONTH_COLUMN}")
+            keys.append(MONTH_COLUMN)
+        value = self.metric if self.agg == "count" else f"CAST({self.metric} AS DOUBLE)"
+        select.append(f"{_SQL_AGGREGATES[self.agg]}({value}) AS {self.value_column()}")
+
+        # pandas groupby drops null keys; so does the WHERE clause
+        where = [f"{col} IS NOT NULL" for col in self.by]
+        for col, value in self.filters.items():
+            escaped = value.replace("'", "''")
+            where.append(f"{col} = '{escaped}'")
+        sql = f"SELECT {', '.join(select)} FROM orders"
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+        sql += f" GROUP BY {', '.join(keys)}"
+        if self.by_month:
+            sql += f" ORDER BY {', '.join(keys)}"
+        else:
+            order = "ASC" if self.ascending else "DESC"
+            sql += f" ORDER BY {self.value_column()} {order} NULLS LAST"
+        if self.limit:
+            sql += f" LIMIT {self.limit}"
+        return sql
+
+
+# ----------------------------------------------------------
+# KB SYNONYMS
+# ----------------------------------------------------------
+
+_KB_COLUMN_BULLET_RE = re.compile(r"^\s*-\s+((?:`\w+`\s*,?\s*)+)[:=]", re.MULTILINE)
+_KB_BOLD_ALIAS_RE = re.compile(r"\*\*([A-Za-z][A-Za-z \-]+?)\s*\(([A-Za-z_]+)\)\*\*")
+_KB_TITLE_RE = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+
+_alias_pattern: Optional[re.Pattern] = None
+_alias_columns: Dict[str, Tuple[str, str]] = {}
+_lock = threading.Lock()
+
+
+def kb_synonyms() -> Dict[str, List[str]]:
+    """
+    Extra phrases per column found in the KB markdown:
+
+    - column bullets ("- `order_item_total`: ...") give the spaced column
+      name ("order item total")
+    - bold "**Revenue (Sales)**" labels give "revenue" for sales
+    - metric definition titles ("# Average Shipping Delay") name the column
+      of the document sharing most words with the title, without a leading
+      "average"
+    """
+    known = {col for col, _ in METRIC_ALIASES + SEGMENT_ALIASES}
+    synonyms: Dict[str, List[str]] = {}
+
+    def add(column: str, phrase: str):
+        phrase = " ".join(phrase.lower().split())
+        if column in known and phrase and phrase not in synonyms.setdefault(column, []):
+            synonyms[column].append(phrase)
+
+    for path in sorted(KB_BASE_PATH.rglob("*.md")):
+        text = path.read_text(encoding="utf-8")
+        for match in _KB_COLUMN_BULLET_RE.finditer(text):
+            for column in re.findall(r"`(\w+)`", match.group(1)):
+                add(column, column.replace("_", " "))
+        for label, column in _KB_BOLD_ALIAS_RE.findall(text):
+            add(column.lower(), label)
+
+        title = _KB_TITLE_RE.search(text)
+        if path.parent.name != "metric_definitions" or title is None:
+            continue
+        title = re.sub(r"^(average|avg)\s+", "", title.group(1).strip().lower())
+        title_words = set(re.findall(r"[a-z]+", title))
+        referenced = [c for c in dict.fromkeys(re.findall(r"`(\w+)", text)) if c in known]
+        overlap = {c: len(title_words & set(c.split("_"))) for c in referenced}
+        if overlap and max(overlap.values()) >= 2:
+            add(max(overlap, key=overlap.get), title)
+    return synonyms
+
+
+def _get_alias_pattern() -> re.Pattern:
+    """One regex over every alias phrase (longest first) plus a phrase lookup."""
+    global _alias_pattern
+    if _alias_pattern is None:
+        with _lock:
+            if _alias_pattern is None:
+                try:
+                    extra = kb_synonyms()
+                except OSError:
+                    extra = {}
+                for kind, aliases in (("m", METRIC_ALIASES), ("s", SEGMENT_ALIASES)):
+                    for column, phrases in aliases:
+                        for phrase in phrases + extra.get(column, []):
+                            _alias_columns.setdefault(phrase, (kind, column))
+                alternatives = "|".join(
+                    re.escape(p) for p in sorted(_alias_columns, key=len, reverse=True)
+                )
+                # Plural forms ("regions", "delays") match their singular alias
+                _alias_pattern = re.compile(rf"(?<![\w-])({alternatives})(?:e?s)?(?![\w-])")
+    return _alias_pattern
+
+
+# ----------------------------------------------------------
+# PARSING
+# ----------------------------------------------------------
+
+def _mask(text: str) -> Tuple[str, List[Tuple[str, str]], str, List[Tuple[int, int]]]:
+    """
+    Replace metric / segment phrases of a lowercased sentence with <m> / <s>.
+    Returns (masked text, [(kind, column)] in order, leftover text, spans).
+    """
+    masked, leftover, found, spans, pos = [], [], [], [], 0
+    for match in _get_alias_pattern().finditer(text):
+        kind, column = _alias_columns[match.group(1)]
+        masked.append(text[pos:match.start()])
+        leftover.append(text[pos:match.start()])
+        masked.append(f"<{kind}>")
+        found.append((kind, column))
+        spans.append(match.span())
+        pos = match.end()
+    masked.append(text[pos:])
+    leftover.append(text[pos:])
+    return "".join(masked), found, " ".join(leftover), spans
+
+
+def _has_filter_values(sentence: str, spans: List[Tuple[int, int]]) -> bool:
+    """
+    Quoted text or capitalised words (e.g. "in Europe") outside the alias
+    phrases look like filter values.
+    """
+    chars = list(sentence)
+    for start, end in spans:
+        chars[start:end] = " " * (end - start)
+    rest = "".join(chars)
+    if re.search(r"[\"`]|(?<!\w)'|'(?!\w)", rest):
+        return True
+    # The first word of the sentence is capitalised anyway
+    first = len(sentence) - len(sentence.lstrip())
+    return any(
+        w.group()[0].isupper() and w.group() != "I" and w.start() != first
+        for w in re.finditer(r"[A-Za-z][\w-]*", rest)
+    )
+
+
+def _parse_sentence(sentence: str) -> Optional[Intent]:
+    text = sentence.lower()
+    if len(text) != len(sentence):
+        return None
+    masked, found, leftover, spans = _mask(text)
+    metrics = [col for kind, col in found if kind == "m"]
+    segments = [col for kind, col in found if kind == "s"]
+    if len(set(metrics)) != 1 or not 1 <= len(segments) <= 2 or len(set(segments)) != len(segments):
+        return None
+    if _UNSUPPORTED_RE.search(leftover):
+        return None
+    # Digits are only allowed as the N of "top N"
+    if re.search(r"\d", re.sub(r"\b(top|bottom)\s+\d+\b", "", leftover)):
+        return None
+    if _has_filter_values(sentence, spans):
+        return None
+
+    core = re.sub(r"\s+", " ", masked).strip().rstrip("?.!").strip()
+    for shape, pattern in SHAPES:
+        match = pattern.fullmatch(core)
+        if match:
+            break
+    else:
+        return None
+
+    metric = metrics[0]
+    agg = next((name for name, pat in _AGG_PATTERNS if pat.search(leftover)), None)
+    if agg is None:
+        agg = "sum" if metric == "sales" else "mean"
+
+    judgement = _JUDGEMENT_RE.search(leftover)
+    if judgement:
+        ascending = judgement.group(1) in ("worst", "bottom")
+        if metric in _LOWER_IS_BETTER:
+            ascending = not ascending
+    else:
+        ascending = bool(_ASCENDING_RE.search(leftover))
+
+    # Breakdowns return every group; only "top N" and "which ... highest"
+    # questions ask for the leading rows (a time series is kept whole)
+    by_month = MONTH_COLUMN in segments or bool(_MONTH_RE.search(leftover))
+    limit = None
+    if shape == "top":
+        limit = int(match.group(1))
+    elif shape == "ranking" and not by_month:
+        limit = RANKING_LIMIT
+
+    return Intent(
+        metric=metric,
+        agg=agg,
+        by=[s for s in segments if s != MONTH_COLUMN],
+        by_month=by_month,
+        ascending=ascending,
+        limit=limit,
+        shape=shape,
+    )
+
+
+def _is_context_sentence(sentence: str) -> bool:
+    """A goal statement such as "I want to optimize shipping strategy."."""
+    text = sentence.lower()
+    return (
+        _CONTEXT_SENTENCE_RE.match(text) is not None
+        and not _FILTER_WORDS_RE.search(text)
+        and not re.search(r"\d", text)
+        and not _has_filter_values(sentence, [])
+    )
+
+
+def parse_question(question: str) -> Optional[Intent]:
+    """
+    Intent of the one sentence of `question` that matches a known shape, or
+    None (the caller then falls back to the LLM). Every other sentence must
+    be a goal statement such as "I want to optimize shipping strategy.";
+    anything else ("Only include the Consumer segment.") may change the
+    answer, so the question is not parsed.
+    """
+    intent = None
+    for sentence in re.split(r"(?<=[.?!])\s+", question.strip()):
+        sentence = sentence.strip()
+        parsed = _parse_sentence(sentence) if intent is None else None
+        if parsed is not None:
+            intent = parsed
+        elif not _is_context_sentence(sentence):
+            return None
+    return intent
@@ -0,0 +1,72 @@
+"""
+Persisted set of known order_item_id keys.
+
+- Keeps every order_item_id written to the processed data as one sorted,
+  de-duplicated NumPy array (8 bytes per key in memory)
+- Saved as .npy next to the parquet, downcast to uint32 when the ids fit
+- Used by the streaming ingest to drop duplicates across chunks without
+  holding the rows themselves in memory
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+
+class OrderItemKeySet:
+    """Sorted array of order_item_id values with vectorized membership tests."""
+
+    def __init__(self, keys: np.ndarray = None):
+        if keys is None:
+            keys = np.empty(0, dtype=np.int64)
+        self._keys = np.asarray(keys, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def load(cls, path: Path) -> "OrderItemKeySet":
+        """Load a key set saved with `save()`; missing file -> empty set."""
+        if not Path(path).exists():
+            return cls()
+        return cls(np.load(path))
+
+    def save(self, path: Path):
+        """Write the keys atomically, using the narrowest dtype that fits."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        keys = self._keys
+        if len(keys) and keys[0] >= 0 and keys[-1] <= np.iinfo(np.uint32).max:
+            keys = keys.astype(np.uint32)
+
+        tmp_path = path.with_suffix(".tmp.npy")
+        np.save(tmp_path, keys)
+        tmp_path.replace(path)
+
+    def contains(self, ids: np.ndarray) -> np.ndarray:
+        """Boolean mask: True where the id is already in the set."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self._keys):
+            return np.zeros(len(ids), dtype=bool)
+        pos = np.searchsorted(self._keys, ids)
+        pos[pos == len(self._keys)] = 0
+        return self._keys[pos] == ids
+
+    def new_mask(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Boolean mask of rows to keep: the first occurrence of each id
+        within `ids` that is not already in the set.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        _, first_idx = np.unique(ids, return_index=True)
+        first = np.zeros(len(ids), dtype=bool)
+        first[first_idx] = True
+        return first & ~self.contains(ids)
+
+    def add(self, ids: np.ndarray):
+        """Insert ids that are not yet in the set (linear-time sorted merge)."""
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        ids = ids[~self.contains(ids)]
+        if len(ids):
+            self._keys = np.insert(self._keys, np.searchsorted(self._keys, ids), ids)
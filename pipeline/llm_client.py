@@ -0,0 +1,247 @@
+"""
+LLM provider layer: chat completion, streaming and batching behind one
+interface, created on first use.
+
+- Importing the pipeline does not import an SDK or require an API key;
+  get_provider() builds the provider named by LLM_PROVIDER on first call
+- "openai": any OpenAI-compatible endpoint through the openai SDK, i.e.
+  api.openai.com or, via LLM_BASE_URL, the offline llm_stub_server, vLLM,
+  Ollama, ...
+- One pooled HTTP client per process (per event loop for async calls),
+  shared by code and narrative generation, with keep-alive connections
+  (LLM_POOL_SIZE, LLM_KEEPALIVE_S)
+- At most LLM_MAX_CONCURRENCY requests in flight per process
+- Every request is bounded by LLM_TIMEOUT_S; connection errors, timeouts,
+  429 and 5xx are retried up to LLM_MAX_RETRIES times with full-jitter
+  exponential backoff (LLM_RETRY_BASE_S, capped at LLM_RETRY_MAX_S).
+  Streams are retried only until their first token
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from config import (
+    LLM_BASE_URL,
+    LLM_KEEPALIVE_S,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_MODEL_NAME,
+    LLM_POOL_SIZE,
+    LLM_PROVIDER,
+    LLM_RETRY_BASE_S,
+    LLM_RETRY_MAX_S,
+    LLM_TIMEOUT_S,
+    OPENAI_API_KEY,
+)
+
+Messages = List[Dict[str, str]]
+
+
+def _retryable(exc: Exception) -> bool:
+    import openai
+
+    # APITimeoutError is an APIConnectionError; InternalServerError is any 5xx
+    return isinstance(
+        exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+    )
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(LLM_RETRY_MAX_S, LLM_RETRY_BASE_S * 2 ** attempt))
+
+
+class OpenAIProvider:
+    """Chat completions from an OpenAI-compatible endpoint."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = LLM_BASE_URL,
+        api_key: Optional[str] = OPENAI_API_KEY,
+        model: str = LLM_MODEL_NAME,
+        timeout: float = LLM_TIMEOUT_S,
+        max_retries: int = LLM_MAX_RETRIES,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        pool_size: int = LLM_POOL_SIZE,
+        keepalive_s: float = LLM_KEEPALIVE_S,
+    ):
+        self.base_url = base_url or None
+        # Local OpenAI-compatible servers ignore the key, but the SDK wants one
+        self.api_key = api_key or ("unused" if self.base_url else None)
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.keepalive_s = keepalive_s
+        self._client = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # event loop -> (AsyncOpenAI, asyncio.Semaphore); both are loop-bound
+        self._async_state = weakref.WeakKeyDictionary()
+
+    # ---- clients ----
+
+    def _limits(self):
+        import openai
+
+        # Limits class of whichever HTTP library this SDK version ships with
+        return type(openai.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_s,
+        )
+
+    def _client_kwargs(self, http_client) -> dict:
+        return dict(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=0,  # retried here, with jitter and the concurrency bound
+            http_client=http_client,
+        )
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import openai
+
+                    http_client = openai.DefaultHttpxClient(limits=self._limits())
+                    self._client = openai.OpenAI(**self._client_kwargs(http_client))
+        return self._client
+
+    def _get_async_state(self):
+        loop = asyncio.get_running_loop()
+        state = self._async_state.get(loop)
+        if state is None:
+            import openai
+
+            http_client = openai.DefaultAsyncHttpxClient(limits=self._limits())
+            client = openai.AsyncOpenAI(**self._client_kwargs(http_client))
+            state = (client, asyncio.Semaphore(self.max_concurrency))
+            self._async_state[loop] = state
+        return state
+
+    def _request(self, messages: Messages, params: dict, stream: bool = False) -> dict:
+        request = {"model": self.model, "messages": messages, **params}
+        if stream:
+            request["stream"] = True
+        return request
+
+    # ---- sync ----
+
+    def complete(self, messages: Messages, **params) -> str:
+        """Text of one chat completion."""
+        request = self._request(messages, params)
+        attempt = 0
+        while True:
+            try:
+                with self._slots:
+                    resp = self._get_client().chat.completions.create(**request)
+                return resp.choices[0].message.content or ""
+            except Exception as e:
+                if attempt >= self.max_retries or not _retryable(e):
+                    raise
+                time.sleep(_backoff(attempt))
+                attempt += 1
+
+    def stream(self, messages: Messages, **params) -> Iterator[str]:
+        """Text chunks of one chat completion as they arrive."""
+        request = self._request(messages, params, stream=True)
+        attempt = 0
+        while True:
+            delivered = False
+            try:
+                with self._slots:
+                    for chunk in self._get_client().chat.completions.create(**request):
+                        text = chunk.choices[0].delta.content if chunk.choices else None
+                        if text:
+                            delivered = True
+                            yield text
+                return
+            except Exception as e:
+                if delivered or attempt >= self.max_retries or not _retryable(e):
+                    raise
+                time.sleep(_backoff(attempt))
+                attempt += 1
+
+    def complete_many(self, batch: List[Messages], **params) -> List[str]:
+        """complete() for several conversations, in order, max_concurrency at a time."""
+        if not batch:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batch))) as pool:
+            return list(pool.map(lambda messages: self.complete(messages, **params), batch))
+
+    # ---- async ----
+
+    async def acomplete(self, messages: Messages, **params) -> str:
+        """complete() on the running event loop; cancelling it aborts the request."""
+        request = self._request(messages, params)
+        client, slots = self._get_async_state()
+        attempt = 0
+        while True:
+            try:
+                async with slots:
+                    resp = await client.chat.completions.create(**request)
+                return resp.choices[0].message.content or ""
+            except Exception as e:
+                if attempt >= self.max_retries or not _retryable(e):
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                attempt += 1
+
+    async def astream(self, messages: Messages, **params) -> AsyncIterator[str]:
+        request = self._request(messages, params, stream=True)
+        client, slots = self._get_async_state()
+        attempt = 0
+        while True:
+            delivered = False
+            try:
+                async with slots:
+                    async for chunk in await client.chat.completions.create(**request):
+                        text = chunk.choices[0].delta.content if chunk.choices else None
+                        if text:
+                            delivered = True
+                            yield text
+                return
+            except Exception as e:
+                if delivered or attempt >= self.max_retries or not _retryable(e):
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                attempt += 1
+
+    async def acomplete_many(self, batch: List[Messages], **params) -> List[str]:
+        return list(await asyncio.gather(*(self.acomplete(m, **params) for m in batch)))
+
+
+PROVIDERS = {"openai": OpenAIProvider}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Process-wide provider named by LLM_PROVIDER."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                if LLM_PROVIDER not in PROVIDERS:
+                    raise ValueError(
+                        f"Unknown LLM_PROVIDER {LLM_PROVIDER!r}; expected one of {sorted(PROVIDERS)}"
+                    )
+                _provider = PROVIDERS[LLM_PROVIDER]()
+    return _provider
+
+
+def set_provider(provider):
+    """Replace the process-wide provider, e.g. with one pointed at a stub server."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,237 @@
+"""
+Local OpenAI-compatible stub server for offline runs and benchmarks.
+
+- POST /v1/chat/completions (plain JSON, or server-sent events with
+  "stream": true) and GET /v1/models; HTTP/1.1 keep-alive, so the
+  provider's connection pool is exercised as against a real endpoint
+- Replies are deterministic: the first --responses rule whose regex
+  matches the user prompt wins; otherwise code prompts get pandas code or
+  DuckDB SQL for the question (the intent parser's template when it parses,
+  else sales by order_region) and any other prompt a short narrative
+- --latency-ms is the time to first token and --token-ms the time per
+  further token, so benchmarks can separate pipeline overhead from model
+  latency; --fail-rate answers that share of requests with 503 / 429 to
+  exercise retries
+- start_stub_server() runs it on a daemon thread inside another process
+
+Usage:
+    python pipeline/llm_stub_server.py --port 8001 --latency-ms 400 --token-ms 5
+    LLM_BASE_URL=http://127.0.0.1:8001/v1 streamlit run app.py
+
+A --responses file is a JSON list of {"match": "<regex>", "content": "<reply>"}.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from pipeline.intent_parser import parse_question
+
+DEFAULT_PANDAS_CODE = (
+    "result_df = df.groupby('order_region')['sales'].sum()"
+    ".sort_values(ascending=False).reset_index()"
+)
+DEFAULT_SQL = (
+    "SELECT order_region, SUM(sales) AS sales FROM orders "
+    "WHERE order_region IS NOT NULL GROUP BY order_region ORDER BY sales DESC"
+)
+
+_QUESTION_RE = re.compile(r"(?:User question|Question):\s*\n?(.+)")
+_TOKEN_RE = re.compile(r"\s*\S+")
+
+
+def _question(prompt: str) -> str:
+    match = _QUESTION_RE.search(prompt)
+    return match.group(1).strip() if match else prompt.strip()
+
+
+def deterministic_reply(messages: List[dict], rules: List[Tuple[re.Pattern, str]] = ()) -> str:
+    """Reply of the stub to a chat; the same messages always get the same text."""
+    system = " ".join(m["content"] for m in messages if m.get("role") == "system")
+    prompt = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    for pattern, content in rules:
+        if pattern.search(prompt):
+            return content
+
+    question = _question(prompt)
+    if "DuckDB SQL" in system:
+        intent = parse_question(question)
+        return intent.to_sql() if intent is not None else DEFAULT_SQL
+    if "pandas code" in system:
+        intent = parse_question(question)
+        return intent.to_pandas_code() if intent is not None else DEFAULT_PANDAS_CODE
+    return (
+        f"Key finding: the results for \"{question}\" show a clear spread between "
+        "the top and bottom groups.\n\nBusiness implications: the weakest groups "
+        "drive most of the gap, so targeted fixes pay off fastest.\n\n"
+        "Recommendations:\n1. Review the bottom groups first.\n"
+        "2. Track the metric weekly.\n3. Share the best practices of the top groups."
+    )
+
+
+def load_rules(path: Optional[str]) -> List[Tuple[re.Pattern, str]]:
+    if not path:
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [(re.compile(r["match"], re.IGNORECASE), r["content"]) for r in json.load(f)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            model = {"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}
+            self._send_json(200, {"object": "list", "data": [model]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        opts = self.server.options
+        request = json.loads(body or b"{}")
+
+        if opts["fail_rate"] and opts["rng"].random() < opts["fail_rate"]:
+            status = opts["rng"].choice([429, 503])
+            self._send_json(
+                status,
+                {"error": {"message": "stub failure", "type": "stub_error", "code": status}},
+                headers={"Retry-After": "0"},
+            )
+            return
+
+        text = deterministic_reply(request.get("messages", []), opts["rules"])
+        tokens = _TOKEN_RE.findall(text) or [text]
+        model = request.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        time.sleep(opts["latency_s"])
+
+        if not request.get("stream"):
+            time.sleep(opts["token_s"] * (len(tokens) - 1))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(delta: dict, finish_reason=None) -> bytes:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+        self._write_chunk(event({"role": "assistant", "content": ""}))
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(opts["token_s"])
+            self._write_chunk(event({"content": token}))
+        self._write_chunk(event({}, finish_reason="stop"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0.0, token_ms=0.0, fail_rate=0.0, rules=(), seed=0):
+        super().__init__(address, StubHandler)
+        self.options = {
+            "latency_s": latency_ms / 1000,
+            "token_s": token_ms / 1000,
+            "fail_rate": fail_rate,
+            "rules": list(rules),
+            "rng": random.Random(seed),
+        }
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, **options) -> StubServer:
+    """Serve on a daemon thread (port 0: any free port); see server.base_url."""
+    server = StubServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="llm-stub-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Time to first token")
+    parser.add_argument("--token-ms", type=float, default=0, help="Time per further token")
+    parser.add_argument("--fail-rate", type=float, default=0, help="Share of requests answered 429/503")
+    parser.add_argument("--responses", default=None, help="JSON list of {match, content} rules")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubServer(
+        (args.host, args.port),
+        latency_ms=args.latency_ms,
+        token_ms=args.token_ms,
+        fail_rate=args.fail_rate,
+        rules=load_rules(args.responses),
+        seed=args.seed,
+    )
+    print(f"Stub LLM serving at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Manifest of the parquet fragments that make up the processed orders table.
+
+- Written by data_loader.py after every full, streaming or append ingest
+- data/processed/manifest.json lists fragments in write order (base first);
+  each fragment is one ingest batch and owns one file per partition
+- load_processed_df() reads exactly the files listed here, so a fragment
+  that is still being written is never picked up
+- With STORE_PII_COLUMNS, the PII/blob files split off by each ingest are
+  listed under "pii_fragments" (the base orders_pii.parquet first, then one
+  file per append), so a full rebuild can drop them with their fragments
+"""
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from config import DATA_MANIFEST_PATH, DATA_PII_PATH, DATA_PROCESSED_DIR, DATA_PROCESSED_PATH
+
+# PII file paths in the manifest are relative to this directory
+PII_ROOT = DATA_PII_PATH.parent
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def load_manifest() -> Optional[dict]:
+    """Return the current manifest, or None if no ingest has written one."""
+    if not DATA_MANIFEST_PATH.exists():
+        return None
+    with DATA_MANIFEST_PATH.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict):
+    """Bump the manifest version and write it atomically."""
+    manifest["version"] = manifest.get("version", 0) + 1
+    manifest["updated_at"] = _now()
+
+    DATA_MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = DATA_MANIFEST_PATH.with_name(DATA_MANIFEST_PATH.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    tmp_path.replace(DATA_MANIFEST_PATH)
+
+
+def add_fragment(
+    manifest: dict,
+    files: List[Path],
+    rows: int,
+    kind: str,
+    source: Optional[str] = None,
+):
+    """Record a written fragment; file paths are stored relative to the dataset root."""
+    manifest.setdefault("fragments", []).append(
+        {
+            "files": [str(Path(p).relative_to(DATA_PROCESSED_DIR)) for p in files],
+            "rows": rows,
+            "kind": kind,
+            "source": source,
+            "created_at": _now(),
+        }
+    )
+
+
+def add_pii_fragment(manifest: dict, path: Path, rows: int, kind: str, source: Optional[str] = None):
+    """Record a written PII/blob file; its path is stored relative to PII_ROOT."""
+    manifest.setdefault("pii_fragments", []).append(
+        {
+            "file": str(Path(path).relative_to(PII_ROOT)),
+            "rows": rows,
+            "kind": kind,
+            "source": source,
+            "created_at": _now(),
+        }
+    )
+
+
+def pii_fragment_paths(manifest: Optional[dict] = None) -> List[Path]:
+    """Absolute paths of all PII/blob files, base first; empty without PII."""
+    if manifest is None:
+        manifest = load_manifest()
+    if not manifest:
+        return []
+    return [PII_ROOT / fragment["file"] for fragment in manifest.get("pii_fragments", [])]
+
+
+def fragment_paths(manifest: Optional[dict] = None) -> List[Path]:
+    """
+    Absolute paths of all data files, base fragment first.
+
+    Falls back to the single, unpartitioned DATA_PROCESSED_PATH file for data
+    written before the partitioned layout existed.
+    """
+    if manifest is None:
+        manifest = load_manifest()
+    if not manifest:
+        return [DATA_PROCESSED_PATH]
+    return [
+        DATA_PROCESSED_DIR / rel
+        for fragment in manifest["fragments"]
+        for rel in fragment["files"]
+    ]
+
+
+def is_partitioned(paths: List[Path]) -> bool:
+    """True if the files live under the hive-partitioned dataset root."""
+    return bool(paths) and all(DATA_PROCESSED_DIR in p.parents for p in paths)
@@ -1,25 +1,382 @@
-from typing import Dict, Any
+import asyncio
+import queue
+import threading
+import time
+from typing import Callable, Dict, Any, Iterator, Optional, Tuple
 
-from pipeline.data_runner import load_processed_df, run_pandas_code
-from pipeline.code_generator import generate_pandas_code
+from config import (
+    ASYNC_STAGE_TIMEOUTS,
+    CODE_CACHE_ENABLED,
+    LLM_MODEL_NAME,
+    QUERY_ENGINE,
+    USE_INTENT_PARSER,
+    USE_ROLLUP_CUBE,
+)
+from pipeline.code_cache import CachedCode, get_code_cache
+from pipeline.column_analyzer import literal_comparisons, referenced_columns
+from pipeline.column_stats import check_literal_values
+from pipeline.data_runner import clean_code, run_pandas_code, summarize_result
+from pipeline.dataset_cache import dataset_columns, get_orders_df, schema_fingerprint
+from pipeline.code_generator import (
+    KB_CODE_TOP_K,
+    agenerate_code,
+    generate_pandas_code,
+    generate_sql,
+    prompt_version,
+)
 from pipeline.insight_generator import generate_insights
+from pipeline.intent_parser import Intent, parse_question
+from pipeline.request_context import RequestContext
+from pipeline.rollup_cube import answer_from_cube
+from rag.encoders import encoder_id
 
+ENGINES = ("pandas", "sql")
 
-def answer_question(question: str) -> Dict[str, Any]:
-    df = load_processed_df()
 
-    # 1) Generate pandas code
-    code = generate_pandas_code(question)
+def _execute_pandas(ctx: RequestContext, code: str):
+    with ctx.timed("execute"):
+        # Run the code on just the columns it references (full frame if unsure)
+        columns = referenced_columns(clean_code(code), dataset_columns())
+        if columns:
+            ctx.df = get_orders_df(sorted(columns))
+            try:
+                return run_pandas_code(ctx.df, code)
+            except RuntimeError:
+                # The analysis missed a column; the full frame is always correct
+                pass
+        ctx.df = get_orders_df()
+        return run_pandas_code(ctx.df, code)
 
-    # 2) Run the code
-    result_df, summary_stats = run_pandas_code(df, code)
 
-    # 3) Generate narrative insights
-    narrative = generate_insights(question, result_df, summary_stats)
+def _execute_sql(ctx: RequestContext, sql: str):
+    # Imported lazily so the pandas engine works without duckdb installed
+    from pipeline.sql_engine import run_sql
+
+    with ctx.timed("execute"):
+        return run_sql(sql)
+
+
+def _code_cache_scope(language: str) -> str:
+    """Cached code is only reused for the same model, prompt and schema."""
+    return "|".join([LLM_MODEL_NAME, prompt_version(language), schema_fingerprint(), language])
+
+
+def _lookup_cached_code(ctx: RequestContext, language: str) -> Optional[CachedCode]:
+    if not CODE_CACHE_ENABLED:
+        return None
+    with ctx.timed("code_cache"):
+        return get_code_cache().lookup(
+            _code_cache_scope(language), ctx.question, embed=ctx.embedding, encoder=encoder_id()
+        )
+
+
+def _store_cached_code(ctx: RequestContext, language: str, code: str):
+    if CODE_CACHE_ENABLED:
+        get_code_cache().store(
+            _code_cache_scope(language),
+            ctx.question,
+            code,
+            embedding=ctx.query_embedding,
+            encoder=encoder_id(),
+        )
+
+
+def _run_generated(ctx: RequestContext, intent: Optional[Intent]) -> Tuple[str, Any, dict, str, Optional[str]]:
+    """
+    Code for the question and its result, plus the path that produced the
+    code ("template", "code_cache" or "llm") and the cache match ("exact" /
+    "semantic") when it came from the code cache.
+    """
+    language = "sql" if ctx.engine == "sql" else "python"
+    execute = _execute_sql if language == "sql" else _execute_pandas
+
+    # A parsed question needs no KB retrieval and no LLM call
+    if intent is not None:
+        code = intent.to_sql() if language == "sql" else intent.to_pandas_code()
+        ctx.emit("code", code=code, language=language, path="template")
+        try:
+            return (code,) + execute(ctx, code) + ("template", None)
+        except RuntimeError:
+            # e.g. a column the template assumes is missing from the dataset
+            pass
+
+    # So does a cache hit
+    cached = _lookup_cached_code(ctx, language)
+    if cached is not None:
+        ctx.emit("code", code=cached.code, language=language, path="code_cache")
+        try:
+            return (cached.code,) + execute(ctx, cached.code) + ("code_cache", cached.match)
+        except RuntimeError:
+            # No longer runs (e.g. data changed within the same schema)
+            get_code_cache().invalidate(cached.entry_id)
+
+    with ctx.timed("generate"):
+        if language == "sql":
+            code = generate_sql(ctx.question, ctx=ctx)
+        else:
+            code = generate_pandas_code(ctx.question, ctx=ctx)
+    ctx.emit("code", code=code, language=language, path="llm")
+    return (code,) + execute(ctx, code) + ("llm", None)
 
-    return {
+
+def _start(
+    question: str,
+    engine: Optional[str],
+    ctx: Optional[RequestContext],
+    on_event: Optional[Callable[[Dict], None]],
+) -> RequestContext:
+    engine = (engine or (ctx.engine if ctx else None) or QUERY_ENGINE).lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+    ctx = ctx or RequestContext(question)
+    ctx.engine = engine
+    if on_event is not None:
+        ctx.on_event = on_event
+    return ctx
+
+
+def _parse_and_cube(ctx: RequestContext) -> Tuple[Optional[Intent], Optional[Any]]:
+    """The question's intent (if it parses) and the cube's answer (if it has one)."""
+    with ctx.timed("parse"):
+        intent = parse_question(ctx.question) if USE_INTENT_PARSER else None
+    with ctx.timed("cube"):
+        cube_df = answer_from_cube(intent) if USE_ROLLUP_CUBE and intent else None
+    if cube_df is not None:
+        ctx.emit("code", code=intent.to_pandas_code(), language="python", path="cube")
+    return intent, cube_df
+
+
+def _check_and_cache(ctx: RequestContext, code: str, result_df, path: str) -> list:
+    """Warnings about the code; caches LLM code that ran cleanly."""
+    warnings = []
+    if ctx.engine == "pandas":
+        # e.g. filtering market == 'EU' silently returns an empty table
+        warnings = check_literal_values(literal_comparisons(clean_code(code)))
+    # Only LLM code that ran cleanly and found something is worth reusing
+    if path == "llm" and not warnings and len(result_df):
+        _store_cached_code(ctx, "sql" if ctx.engine == "sql" else "python", code)
+    return warnings
+
+
+def _result(ctx, code, result_df, summary_stats, narrative, source, warnings, code_cache, path, code_seconds):
+    result = {
         "code": code,
+        "code_language": "sql" if source == "sql" else "python",
         "result_df": result_df,
         "summary_stats": summary_stats,
         "narrative": narrative,
+        "source": source,
+        "warnings": warnings,
+        "code_cache": code_cache,
+        "path": path,
+        "code_seconds": code_seconds,
+        "request_id": ctx.request_id,
+        "timings": dict(ctx.timings),
     }
+    ctx.emit("done", result=result)
+    return result
+
+
+def answer_question(
+    question: str,
+    engine: Optional[str] = None,
+    ctx: Optional[RequestContext] = None,
+    on_event: Optional[Callable[[Dict], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Answer `question` with a result table and narrative.
+
+    `engine` picks how generated analysis runs: "pandas" (exec'd pandas code)
+    or "sql" (DuckDB over the parquet dataset); defaults to QUERY_ENGINE.
+    All stages share one RequestContext (created here unless given), so the
+    question is embedded and the KB searched at most once. Code that ran
+    cleanly is cached (pipeline/code_cache.py); "code_cache" in the result
+    says whether this answer reused it ("exact" / "semantic") or not (None).
+
+    "path" records what produced the table: "cube", "template" (parsed by
+    intent_parser), "code_cache" or "llm"; "code_seconds" is the time from
+    the question to the result table, before the narrative.
+
+    `on_event` receives stage events as they happen (see stream_answer()).
+    """
+    ctx = _start(question, engine, ctx, on_event)
+    t0 = time.perf_counter()
+
+    # 0) Standard metric x segment questions are parsed locally and, when the
+    # rollup cube has them materialized, answered straight from it
+    intent, result_df = _parse_and_cube(ctx)
+    if result_df is not None:
+        code = intent.to_pandas_code()
+        summary_stats = summarize_result(result_df)
+        source = path = "cube"
+        warnings, code_cache = [], None
+    else:
+        # 1) Template, cached or generated code and 2) run it on the chosen engine
+        code, result_df, summary_stats, path, code_cache = _run_generated(ctx, intent)
+        warnings = _check_and_cache(ctx, code, result_df, path)
+        source = ctx.engine
+    code_seconds = time.perf_counter() - t0
+    ctx.emit("result", result_df=result_df, summary_stats=summary_stats, warnings=warnings)
+
+    # 3) Generate narrative insights
+    with ctx.timed("narrative"):
+        narrative = generate_insights(question, result_df, summary_stats, ctx=ctx)
+    ctx.emit("narrative", narrative=narrative)
+
+    return _result(
+        ctx, code, result_df, summary_stats, narrative, source, warnings, code_cache, path, code_seconds
+    )
+
+
+# ----------------------------------------------------------
+# ASYNC
+# ----------------------------------------------------------
+
+async def _bounded(stage: str, awaitable, timeouts: Dict[str, float]):
+    """Await `awaitable`, failing with TimeoutError after timeouts[stage] seconds."""
+    timeout = timeouts.get(stage)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Stage {stage!r} timed out after {timeout}s") from None
+
+
+def _prefetch_frame(ctx: RequestContext):
+    with ctx.timed("load"):
+        get_orders_df()
+
+
+async def _run_generated_async(
+    ctx: RequestContext, intent: Optional[Intent], timeouts: Dict[str, float]
+) -> Tuple[str, Any, dict, str, Optional[str]]:
+    """_run_generated() with the dataset load overlapping retrieval and the LLM call."""
+    language = "sql" if ctx.engine == "sql" else "python"
+    execute = _execute_sql if language == "sql" else _execute_pandas
+
+    async def run(code: str):
+        # exec'd pandas / DuckDB run on a worker thread; a timed-out run is
+        # abandoned, not interrupted
+        return await _bounded("execute", asyncio.to_thread(execute, ctx, code), timeouts)
+
+    if intent is not None:
+        code = intent.to_sql() if language == "sql" else intent.to_pandas_code()
+        ctx.emit("code", code=code, language=language, path="template")
+        try:
+            return (code,) + await run(code) + ("template", None)
+        except RuntimeError:
+            pass
+
+    # From here on the LLM is likely needed: load the frame meanwhile (the
+    # sql engine reads parquet itself)
+    prefetch = asyncio.create_task(asyncio.to_thread(_prefetch_frame, ctx)) if language == "python" else None
+    try:
+        cached = await asyncio.to_thread(_lookup_cached_code, ctx, language)
+        if cached is not None:
+            ctx.emit("code", code=cached.code, language=language, path="code_cache")
+            try:
+                return (cached.code,) + await run(cached.code) + ("code_cache", cached.match)
+            except RuntimeError:
+                get_code_cache().invalidate(cached.entry_id)
+
+        kb_docs = await _bounded("retrieve", asyncio.to_thread(ctx.kb_context, KB_CODE_TOP_K), timeouts)
+        with ctx.timed("generate"):
+            code = await _bounded(
+                "generate", agenerate_code(ctx.question, kb_docs, language, ctx=ctx), timeouts
+            )
+        ctx.emit("code", code=code, language=language, path="llm")
+        if prefetch is not None:
+            await prefetch
+        return (code,) + await run(code) + ("llm", None)
+    finally:
+        if prefetch is not None and not prefetch.done():
+            prefetch.cancel()
+
+
+async def answer_question_async(
+    question: str,
+    engine: Optional[str] = None,
+    ctx: Optional[RequestContext] = None,
+    on_event: Optional[Callable[[Dict], None]] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    answer_question() on asyncio, returning the same dict.
+
+    - Code generation uses the provider's async API; KB retrieval (embedding
+      plus index lookup) and loading the orders frame run on worker threads
+      concurrently with it, so the event loop is never blocked
+    - Generated code, the narrative and other CPU-bound stages run on
+      worker threads via asyncio.to_thread()
+    - Each of the retrieve / generate / execute / narrative stages is
+      bounded by `timeouts` (defaults: ASYNC_STAGE_TIMEOUTS) and raises
+      TimeoutError when exceeded
+    - Cancelling the task cancels the in-flight LLM request; work already
+      running on a thread finishes in the background and is discarded
+    """
+    ctx = _start(question, engine, ctx, on_event)
+    timeouts = {**ASYNC_STAGE_TIMEOUTS, **(timeouts or {})}
+    t0 = time.perf_counter()
+
+    # A cube miss can read parquet, so it stays off the event loop too
+    intent, result_df = await asyncio.to_thread(_parse_and_cube, ctx)
+    if result_df is not None:
+        code = intent.to_pandas_code()
+        summary_stats = summarize_result(result_df)
+        source = path = "cube"
+        warnings, code_cache = [], None
+    else:
+        code, result_df, summary_stats, path, code_cache = await _run_generated_async(ctx, intent, timeouts)
+        warnings = await asyncio.to_thread(_check_and_cache, ctx, code, result_df, path)
+        source = ctx.engine
+    code_seconds = time.perf_counter() - t0
+    ctx.emit("result", result_df=result_df, summary_stats=summary_stats, warnings=warnings)
+
+    with ctx.timed("narrative"):
+        narrative = await _bounded(
+            "narrative",
+            asyncio.to_thread(generate_insights, question, result_df, summary_stats, ctx=ctx),
+            timeouts,
+        )
+    ctx.emit("narrative", narrative=narrative)
+
+    return _result(
+        ctx, code, result_df, summary_stats, narrative, source, warnings, code_cache, path, code_seconds
+    )
+
+
+def stream_answer(
+    question: str,
+    engine: Optional[str] = None,
+    ctx: Optional[RequestContext] = None,
+) -> Iterator[Dict]:
+    """
+    answer_question() as a stream of stage events, so a UI can render each
+    stage as soon as it is ready instead of waiting for the whole answer.
+
+    The pipeline runs on a worker thread; events are dicts with a "type":
+
+    - "context": KB chunks retrieved for the question ("docs")
+    - "code_token": a chunk of LLM code output as it streams ("text")
+    - "code": the final code and which path produced it ("code",
+      "language", "path"); may repeat if the first candidate fails to run
+    - "result": the result table ("result_df", "summary_stats", "warnings")
+    - "narrative_token": a chunk of the LLM narrative ("text")
+    - "narrative": the final narrative ("narrative")
+    - "done": the complete answer_question() dict ("result"), always last
+      unless the pipeline fails, in which case the last event is "error"
+      ("error": the exception)
+    """
+    events: "queue.Queue[Dict]" = queue.Queue()
+
+    def run():
+        try:
+            answer_question(question, engine=engine, ctx=ctx, on_event=events.put)
+        except Exception as e:
+            events.put({"type": "error", "error": e})
+
+    threading.Thread(target=run, name="answer-stream", daemon=True).start()
+    while True:
+        event = events.get()
+        yield event
+        if event["type"] in ("done", "error"):
+            return
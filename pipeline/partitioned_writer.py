@@ -0,0 +1,145 @@
+"""
+Hive-partitioned parquet writer for the processed orders dataset.
+
+- Lays files out as <base_dir>/market=<m>/order_year=<y>/<basename>.parquet
+- Keeps one open ParquetWriter per partition, so a streaming ingest adds one
+  row group per chunk to each partition file instead of one file per chunk
+- Rows are sorted by order_date inside each row group, which keeps the
+  row-group min/max statistics tight enough to prune by month
+- Files are written under a .tmp name and only renamed on close()
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline.schema import fits_float32, stable_arrow_schema
+
+# pyarrow's HivePartitioning reads this back as null
+HIVE_NULL_SEGMENT = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _cast_losslessly(col: pa.ChunkedArray, field: pa.Field) -> pa.ChunkedArray:
+    """Cast `col` to the field's type, raising ValueError if any value would change."""
+    if pa.types.is_float32(field.type) and pa.types.is_floating(col.type):
+        # Arrow's safe cast rounds floats silently; apply compact_frame's check
+        if not fits_float32(col.to_numpy()):
+            raise ValueError(
+                f"Column '{field.name}' has values float32 cannot hold, but the "
+                f"dataset stores it as float32; rebuild it with a full ingest."
+            )
+    try:
+        # Safe casts reject integer overflow and truncated fractions
+        return col.cast(field.type)
+    except pa.ArrowInvalid as e:
+        raise ValueError(
+            f"Column '{field.name}' does not fit the stored type {field.type} "
+            f"({col.type}: {e}); rebuild the dataset with a full ingest."
+        ) from e
+    except pa.ArrowNotImplementedError as e:
+        raise ValueError(
+            f"Column '{field.name}' changed type across chunks "
+            f"({field.type} -> {col.type}); try a larger --chunksize."
+        ) from e
+
+
+def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """
+    Cast an Arrow table to a fixed schema.
+
+    CSV type inference runs per chunk, so a column that is entirely empty in
+    one chunk comes back as float64 even if it holds strings elsewhere.
+    Casts that would change a value (float64 values float32 cannot hold,
+    integer overflow) raise ValueError instead of writing altered data.
+    """
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.chunked_array([pa.nulls(table.num_rows, field.type)]))
+            continue
+
+        col = table.column(field.name)
+        if col.type != field.type:
+            if col.null_count == len(col):
+                col = pa.chunked_array([pa.nulls(len(col), field.type)])
+            else:
+                col = _cast_losslessly(col, field)
+        columns.append(col)
+
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def partition_dir(base_dir: Path, partition_cols: List[str], keys: Tuple) -> Path:
+    """Directory for one combination of partition values."""
+    path = Path(base_dir)
+    for col, value in zip(partition_cols, keys):
+        segment = HIVE_NULL_SEGMENT if pd.isna(value) else quote(str(value), safe="")
+        path = path / f"{col}={segment}"
+    return path
+
+
+class PartitionedParquetWriter:
+    """Write DataFrame chunks into a hive-partitioned parquet directory."""
+
+    def __init__(
+        self,
+        base_dir: Path,
+        partition_cols: List[str],
+        basename: str,
+        schema: Optional[pa.Schema] = None,
+    ):
+        self.base_dir = Path(base_dir)
+        self.partition_cols = partition_cols
+        self.basename = basename
+        # File schema excludes the partition columns (they live in the path)
+        self.schema = stable_arrow_schema(schema) if schema is not None else None
+        self._writers: Dict[Path, pq.ParquetWriter] = {}
+        self.rows_written = 0
+
+    def _writer_for(self, keys: Tuple) -> pq.ParquetWriter:
+        path = partition_dir(self.base_dir, self.partition_cols, keys) / f"{self.basename}.parquet"
+        if path not in self._writers:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._writers[path] = pq.ParquetWriter(
+                path.with_name(path.name + ".tmp"), self.schema
+            )
+        return self._writers[path]
+
+    def write(self, df: pd.DataFrame):
+        """Split a chunk by partition values and append one row group to each file."""
+        groups = df.groupby(self.partition_cols, observed=True, sort=True, dropna=False)
+        for keys, part in groups:
+            if not isinstance(keys, tuple):
+                keys = (keys,)
+            part = part.drop(columns=self.partition_cols)
+            if "order_date" in part.columns:
+                part = part.sort_values("order_date", kind="stable")
+
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            if self.schema is None:
+                self.schema = stable_arrow_schema(table.schema)
+            table = conform_table(table, self.schema)
+
+            self._writer_for(keys).write_table(table, row_group_size=table.num_rows)
+            self.rows_written += table.num_rows
+
+    def close(self) -> List[Path]:
+        """Finish all files, move them into place and return their paths."""
+        paths = []
+        for path, writer in self._writers.items():
+            writer.close()
+            path.with_name(path.name + ".tmp").replace(path)
+            paths.append(path)
+        self._writers = {}
+        return sorted(paths)
+
+    def abort(self):
+        """Close and delete any partially written files."""
+        for path, writer in self._writers.items():
+            writer.close()
+            path.with_name(path.name + ".tmp").unlink(missing_ok=True)
+        self._writers = {}
@@ -0,0 +1,90 @@
+"""
+Per-question state shared by every pipeline stage.
+
+- One RequestContext is created by orchestrator.answer_question() and passed
+  to code generation, execution and narrative generation
+- KB context is retrieved once, at the largest top_k any stage needs
+  (KB_CONTEXT_TOP_K); each stage takes the first top_k chunks of that
+  ranking, which is exactly what a separate retrieval would have returned
+- The query embedding, the frame the analysis ran on and per-stage timings
+  live on the context, so nothing is computed twice within one question
+- request_id tags the request in the returned result and in log lines
+- on_event, when set, receives stage events ({"type": ..., ...}) as they
+  happen: retrieved context, LLM tokens, code, result, narrative. Stages
+  stream LLM output only when someone is listening
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import KB_CONTEXT_TOP_K, KB_MERGE_ADJACENT_CHUNKS, RETRIEVAL_MODE
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@dataclass
+class RequestContext:
+    question: str
+    engine: Optional[str] = None
+    request_id: str = field(default_factory=new_request_id)
+    query_embedding: Optional[np.ndarray] = None
+    kb_docs: Optional[List[Dict]] = None  # unmerged ranking of the top kb_top_k chunks
+    kb_top_k: int = 0
+    df: Optional[pd.DataFrame] = None  # frame the generated analysis ran on
+    timings: Dict[str, float] = field(default_factory=dict)
+    on_event: Optional[Callable[[Dict], None]] = None
+
+    def emit(self, event_type: str, **data):
+        """Send a stage event to the listener, if any."""
+        if self.on_event is not None:
+            self.on_event({"type": event_type, "request_id": self.request_id, **data})
+
+    def token_callback(self, event_type: str) -> Optional[Callable[[str], None]]:
+        """Callback emitting each streamed token as an event, or None if nobody listens."""
+        if self.on_event is None:
+            return None
+        return lambda text: self.emit(event_type, text=text)
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Add the wall time of the block to timings[stage] (seconds)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - t0
+
+    def embedding(self) -> np.ndarray:
+        """Embedding of the question, computed once."""
+        if self.query_embedding is None:
+            # Imported lazily: the context itself must not load the encoder
+            from rag.retriever import embed_query
+
+            with self.timed("embed"):
+                self.query_embedding = embed_query(self.question)
+        return self.query_embedding
+
+    def kb_context(self, top_k: int) -> List[Dict]:
+        """The top_k KB chunks for the question (adjacent chunks merged)."""
+        from rag.retriever import merge_adjacent_chunks, retrieve_context_many
+
+        if self.kb_docs is None or top_k > self.kb_top_k:
+            k = max(top_k, KB_CONTEXT_TOP_K)
+            # BM25-only retrieval has no use for the embedding
+            embs = None if RETRIEVAL_MODE == "lexical" else self.embedding()[None, :]
+            with self.timed("retrieve"):
+                self.kb_docs = retrieve_context_many(
+                    [self.question], top_k=k, merge=False, query_embs=embs
+                )[0]
+            self.kb_top_k = k
+            self.emit("context", docs=self.kb_docs[:KB_CONTEXT_TOP_K])
+        docs = self.kb_docs[:top_k]
+        return merge_adjacent_chunks(docs) if KB_MERGE_ADJACENT_CHUNKS else docs
@@ -0,0 +1,318 @@
+"""
+Materialized rollup cube for the standard metric x segment questions.
+
+- Built by data_loader.py after every ingest from just the metric, segment
+  and order_date columns, one record batch at a time, and saved to
+  data/processed/rollup_cube.parquet; an append folds only its new rows
+  into the stored cube (merge_cubes)
+- One grouping set per segment and per pair of segments, each with and
+  without an order_month key
+- Per metric and group: count (non-null), sum, sum of squares, min and max,
+  which is enough for count / sum / mean / min / max / var / std
+- Stamped with the manifest version; a stale cube is never queried
+- answer_from_cube() answers a parsed question (intent_parser.Intent) so
+  the orchestrator needs neither an LLM call nor a pandas pass over the
+  orders
+"""
+
+import itertools
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import DATA_ROLLUP_PATH
+from pipeline.intent_parser import MONTH_COLUMN, Intent
+from pipeline.manifest import load_manifest
+
+# Metrics and segments of synthetic/generate_qa.py
+METRIC_COLUMNS = [
+    "on_time_delivery",
+    "late_delivery_risk",
+    "shipping_delay_days",
+    "benefit_per_order",
+    "sales",
+    "order_item_quantity",
+]
+
+SEGMENT_COLUMNS = [
+    "customer_segment",
+    "order_region",
+    "market",
+    "category_name",
+    "payment_type",
+    "shipping_mode",
+]
+
+STATS = ["count", "sum", "sumsq", "min", "max"]
+AGGREGATIONS = {"count", "sum", "mean", "min", "max", "var", "std"}
+
+# Most segment columns a grouping set can have (pairs: 15 sets, not 63)
+MAX_SEGMENTS = 2
+
+VERSION_KEY = b"insightweaver.manifest_version"
+
+
+def _stat_col(metric: str, stat: str) -> str:
+    return f"{metric}__{stat}"
+
+
+def _grouping_key(keys) -> str:
+    return "|".join(sorted(keys))
+
+
+def grouping_sets() -> List[Tuple[str, ...]]:
+    """Every key combination materialized in the cube."""
+    sets = []
+    for size in range(1, MAX_SEGMENTS + 1):
+        for combo in itertools.combinations(SEGMENT_COLUMNS, size):
+            sets.append(combo)
+            sets.append(combo + (MONTH_COLUMN,))
+    return sets
+
+
+# ----------------------------------------------------------
+# 1. BUILD
+# ----------------------------------------------------------
+
+def cube_source_columns() -> List[str]:
+    """Columns of the orders table the cube is built from."""
+    return SEGMENT_COLUMNS + METRIC_COLUMNS + ["order_date"]
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate an orders frame into the long-format cube.
+
+    Each output row is one group of one grouping set; key columns that are
+    not part of the set are null and the `grouping` column names the set.
+    """
+    metrics = [m for m in METRIC_COLUMNS if m in df.columns]
+    work = df[[c for c in SEGMENT_COLUMNS if c in df.columns]].copy()
+    work[MONTH_COLUMN] = df["order_date"].dt.to_period("M").dt.to_timestamp()
+    for m in metrics:
+        values = df[m].astype("float64")
+        work[_stat_col(m, "sum")] = values
+        work[_stat_col(m, "sumsq")] = values * values
+
+    agg_spec = {}
+    for m in metrics:
+        agg_spec[_stat_col(m, "count")] = (_stat_col(m, "sum"), "count")
+        agg_spec[_stat_col(m, "sum")] = (_stat_col(m, "sum"), "sum")
+        agg_spec[_stat_col(m, "sumsq")] = (_stat_col(m, "sumsq"), "sum")
+        agg_spec[_stat_col(m, "min")] = (_stat_col(m, "sum"), "min")
+        agg_spec[_stat_col(m, "max")] = (_stat_col(m, "sum"), "max")
+
+    parts = []
+    for keys in grouping_sets():
+        if not all(k in work.columns for k in keys):
+            continue
+        part = (
+            work.groupby(list(keys), observed=True, dropna=True)
+            .agg(rows=(keys[0], "size"), **agg_spec)
+            .reset_index()
+        )
+        part.insert(0, "grouping", _grouping_key(keys))
+        parts.append(part)
+
+    cube = pd.concat(parts, ignore_index=True)
+    for col in SEGMENT_COLUMNS:
+        if col in cube.columns:
+            cube[col] = cube[col].astype("string")
+    return cube
+
+
+def merge_cubes(cubes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Cube of the union of disjoint row sets, from the cubes of each set.
+
+    Rows, counts, sums and sums of squares add up; min and max combine.
+    """
+    cube = pd.concat(cubes, ignore_index=True)
+    for col in SEGMENT_COLUMNS:
+        if col in cube.columns:
+            cube[col] = cube[col].astype("string")
+    keys = ["grouping"] + [c for c in SEGMENT_COLUMNS + [MONTH_COLUMN] if c in cube.columns]
+    agg_spec = {"rows": "sum"}
+    for col in cube.columns:
+        if "__" in col:
+            stat = col.rsplit("__", 1)[1]
+            agg_spec[col] = stat if stat in ("min", "max") else "sum"
+    merged = cube.groupby(keys, sort=False, dropna=False).agg(agg_spec).reset_index()
+    return merged[cube.columns]
+
+
+def build_cube_from_batches(
+    batches: Iterable[pa.RecordBatch], base: Optional[pd.DataFrame] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Fold record batches of cube_source_columns() into `base` (or a new cube),
+    one batch at a time; None if there were no rows at all.
+    """
+    cube = base
+    for batch in batches:
+        if batch.num_rows:
+            part = build_cube(batch.to_pandas())
+            cube = part if cube is None else merge_cubes([cube, part])
+    return cube
+
+
+def save_cube(cube: pd.DataFrame, manifest_version: int):
+    """Write the cube parquet atomically, stamped with the manifest version."""
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[VERSION_KEY] = str(manifest_version).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    DATA_ROLLUP_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = DATA_ROLLUP_PATH.with_name(DATA_ROLLUP_PATH.name + ".tmp")
+    pq.write_table(table, tmp_path)
+    tmp_path.replace(DATA_ROLLUP_PATH)
+
+
+def read_cube() -> Optional[Tuple[pd.DataFrame, Optional[int]]]:
+    """The stored cube frame and its manifest version, or None if there is none."""
+    if not DATA_ROLLUP_PATH.exists():
+        return None
+    table = pq.read_table(DATA_ROLLUP_PATH)
+    raw = (table.schema.metadata or {}).get(VERSION_KEY)
+    return table.to_pandas(), int(raw) if raw is not None else None
+
+
+# ----------------------------------------------------------
+# 2. QUERY
+# ----------------------------------------------------------
+
+class RollupCube:
+    """In-memory cube, split by grouping set for constant-time lookups."""
+
+    def __init__(self, cube: pd.DataFrame, version: Optional[int] = None):
+        self.version = version
+        key_columns = SEGMENT_COLUMNS + [MONTH_COLUMN]
+        # grouping -> {column: numpy array}; plain arrays keep a lookup in
+        # the tens of microseconds, well below any pandas groupby/sort
+        self._groups: Dict[str, Dict[str, np.ndarray]] = {}
+        for grouping, part in cube.groupby("grouping", sort=False):
+            keys = grouping.split("|")
+            self._groups[grouping] = {
+                col: part[col].to_numpy(dtype=object if col in key_columns else "float64")
+                for col in part.columns
+                if col != "grouping" and (col not in key_columns or col in keys)
+            }
+
+    @classmethod
+    def load(cls) -> Optional["RollupCube"]:
+        stored = read_cube()
+        return cls(*stored) if stored is not None else None
+
+    def can_answer(self, query: Intent) -> bool:
+        return (
+            query.metric in METRIC_COLUMNS
+            and query.agg in AGGREGATIONS
+            and self._lookup_key(query) in self._groups
+        )
+
+    def _lookup_key(self, query: Intent) -> str:
+        keys = set(query.by) | set(query.filters)
+        if query.by_month:
+            keys.add(MONTH_COLUMN)
+        return _grouping_key(keys)
+
+    def query(self, query: Intent) -> pd.DataFrame:
+        """Answer `query` from the cube; raises KeyError if it cannot."""
+        if not self.can_answer(query):
+            raise KeyError(f"Rollup cube cannot answer {query}")
+
+        part = self._groups[self._lookup_key(query)]
+        keys = list(query.by) + ([MONTH_COLUMN] if query.by_month else [])
+        stats = {s: part[_stat_col(query.metric, s)] for s in STATS}
+
+        if query.filters:
+            mask = np.ones(len(stats["count"]), dtype=bool)
+            for col, value in query.filters.items():
+                mask &= part[col] == value
+            # Filter columns were part of the grouping; fold them back in
+            folded = (
+                pd.DataFrame({**{k: part[k][mask] for k in keys},
+                              **{s: v[mask] for s, v in stats.items()}})
+                .groupby(keys, sort=False)
+                .agg(count=("count", "sum"), sum=("sum", "sum"), sumsq=("sumsq", "sum"),
+                     min=("min", "min"), max=("max", "max"))
+                .reset_index()
+            )
+            part = {k: folded[k].to_numpy(dtype=object) for k in keys}
+            stats = {s: folded[s].to_numpy(dtype="float64") for s in STATS}
+
+        n, total = stats["count"], stats["sum"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if query.agg == "count":
+                values = n
+            elif query.agg == "sum":
+                values = total
+            elif query.agg == "mean":
+                values = total / n
+            elif query.agg in ("min", "max"):
+                values = stats[query.agg]
+            else:
+                var = np.maximum(stats["sumsq"] - total * total / n, 0.0) / (n - 1)
+                values = np.sqrt(var) if query.agg == "std" else var
+
+        if query.by_month:
+            order = np.lexsort([part[k] for k in reversed(keys)])
+        else:
+            # NaN sorts last either way, as in sort_values()
+            order = np.argsort(values if query.ascending else -values, kind="stable")
+        if query.limit:
+            order = order[: query.limit]
+
+        result = {k: part[k][order] for k in keys}
+        result[query.value_column()] = values[order]
+        return pd.DataFrame(result)
+
+
+_cube: Optional[RollupCube] = None
+_cube_lock = threading.Lock()
+# (manifest version, cube file stamp) last found stale or missing
+_stale_key: Optional[Tuple] = None
+
+
+def _cube_stamp() -> Optional[Tuple[int, int]]:
+    # save_cube() replaces the file, so a rewrite gets a new inode
+    try:
+        stat = DATA_ROLLUP_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def get_cube() -> Optional[RollupCube]:
+    """Process-wide cube, reloaded when the manifest moves on; None if stale."""
+    global _cube, _stale_key
+    manifest = load_manifest()
+    if not manifest:
+        return None
+    version = manifest.get("version")
+    with _cube_lock:
+        if _cube is not None and _cube.version == version:
+            return _cube
+        # The manifest is saved before the cube is rewritten, so a stale
+        # cube is only re-read once its file changes
+        key = (version, _cube_stamp())
+        if key == _stale_key:
+            return None
+        _cube = RollupCube.load()
+        if _cube is None or _cube.version != version:
+            _stale_key = key
+            return None
+        return _cube
+
+
+def answer_from_cube(intent: Intent) -> Optional[pd.DataFrame]:
+    """Result of `intent` if the cube can answer it, else None."""
+    cube = get_cube()
+    if cube is None or not cube.can_answer(intent):
+        return None
+    return cube.query(intent)
@@ -0,0 +1,222 @@
+"""
+Compact dtype layout for the processed orders table.
+
+- Low-cardinality strings -> pandas categorical (parquet/Arrow dictionary)
+- Small integer counters and flags -> int8 / bool on disk; the int8
+  columns are widened again when the analysis frame is loaded
+  (widen_for_analysis), because generated code does arithmetic on them
+- ID columns -> int32
+- Money and amount columns stay float64: float32 cents add noise to every
+  aggregate (438165.150118 instead of 438165.15)
+- Ratios, coordinates and zip codes -> float32 when every value reads back
+  exactly at the column's decimal scale (fits_float32)
+- PII and blob columns are split off so they never reach the analysis frame
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Strings with a handful to a few thousand distinct values
+CATEGORICAL_COLUMNS = [
+    "payment_type",
+    "delivery_status",
+    "category_name",
+    "customer_city",
+    "customer_country",
+    "customer_segment",
+    "customer_state",
+    "department_name",
+    "market",
+    "order_city",
+    "order_country",
+    "order_region",
+    "order_state",
+    "order_status",
+    "product_name",
+    "shipping_mode",
+]
+
+INT8_COLUMNS = [
+    "late_delivery_risk",
+    "days_for_shipping_real",
+    "days_for_shipment_scheduled",
+    "shipping_delay_days",
+    "order_item_quantity",
+    "product_status",
+]
+
+INT32_COLUMNS = [
+    "category_id",
+    "customer_id",
+    "department_id",
+    "order_customer_id",
+    "order_id",
+    "order_item_cardprod_id",
+    "order_item_id",
+    "product_card_id",
+    "product_category_id",
+]
+
+# Summed and averaged by most questions; never downcast
+FLOAT64_COLUMNS = [
+    "benefit_per_order",
+    "sales_per_customer",
+    "order_item_discount",
+    "order_item_product_price",
+    "sales",
+    "order_item_total",
+    "order_profit_per_order",
+    "product_price",
+]
+
+FLOAT32_COLUMNS = [
+    "order_item_discount_rate",
+    "order_item_profit_ratio",
+    "latitude",
+    "longitude",
+    "customer_zipcode",
+    "order_zipcode",
+]
+
+BOOL_COLUMNS = ["on_time_delivery"]
+
+# Not used by any analysis; dropped or written to a separate parquet
+PII_COLUMNS = ["customer_email", "customer_password"]
+BLOB_COLUMNS = ["product_image", "product_description"]
+
+# Arrow types of the hive partition keys, whose values live in the file paths
+PARTITION_TYPES = {
+    "market": pa.dictionary(pa.int32(), pa.string()),
+    "order_year": pa.int16(),
+}
+
+# int8 is a storage-only detail: numpy int8 arithmetic wraps silently, so
+# e.g. shipping_delay_days * 24 in generated code would go negative at 6 days
+ANALYSIS_INT_TYPE = pa.int64()
+
+# Most decimal places a column may have and still be stored as float32
+FLOAT32_MAX_SCALE = 4
+
+
+def _downcast_int(s: pd.Series, dtype: str) -> pd.Series:
+    """Cast to `dtype` if the column has no nulls and fits, else float32."""
+    if s.isna().any():
+        return s.astype("float32")
+    info = np.iinfo(dtype)
+    if len(s) and (s.min() < info.min or s.max() > info.max):
+        return s
+    return s.astype(dtype)
+
+
+def _decimal_scale(values: np.ndarray) -> Optional[int]:
+    """Fewest decimal places that hold every value exactly (None: more than FLOAT32_MAX_SCALE)."""
+    for scale in range(FLOAT32_MAX_SCALE + 1):
+        if np.array_equal(np.round(values, scale), values, equal_nan=True):
+            return scale
+    return None
+
+
+def fits_float32(values) -> bool:
+    """
+    True if float32 keeps every value: rounded back to the column's decimal
+    scale, each float32 equals the float64 it came from. Values with more
+    than FLOAT32_MAX_SCALE decimals, or too many significant digits, fail.
+    """
+    values = np.asarray(values, dtype="float64")
+    scale = _decimal_scale(values)
+    if scale is None:
+        return False
+    narrowed = values.astype("float32").astype("float64")
+    return np.array_equal(np.round(narrowed, scale), values, equal_nan=True)
+
+
+def _downcast_float(s: pd.Series) -> pd.Series:
+    """Cast to float32 only if every value survives the round trip."""
+    if fits_float32(s.to_numpy(dtype="float64", na_value=np.nan)):
+        return s.astype("float32")
+    return s
+
+
+def compact_frame(
+    df: pd.DataFrame, keep_pii: bool = False
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Apply the compact dtype layout to a cleaned orders frame.
+
+    Returns (compact_df, pii_df). `pii_df` holds order_item_id plus the
+    PII/blob columns when `keep_pii` is True, otherwise None.
+    """
+    split_cols = [c for c in PII_COLUMNS + BLOB_COLUMNS if c in df.columns]
+    pii_df = None
+    if keep_pii and split_cols:
+        key = ["order_item_id"] if "order_item_id" in df.columns else []
+        pii_df = df[key + split_cols].reset_index(drop=True)
+    df = df.drop(columns=split_cols)
+
+    converted = {}
+    for col in df.columns:
+        s = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            converted[col] = s.astype("category")
+        elif col in INT8_COLUMNS and pd.api.types.is_numeric_dtype(s):
+            converted[col] = _downcast_int(s, "int8")
+        elif col in INT32_COLUMNS and pd.api.types.is_numeric_dtype(s):
+            converted[col] = _downcast_int(s, "int32")
+        elif col in FLOAT32_COLUMNS and pd.api.types.is_float_dtype(s):
+            converted[col] = _downcast_float(s)
+        elif col in BOOL_COLUMNS and not s.isna().any():
+            converted[col] = s.astype(bool)
+
+    if converted:
+        df = df.assign(**converted)
+    return df, pii_df
+
+
+def widen_for_analysis(table: pa.Table) -> pa.Table:
+    """Cast the int8 storage columns of an orders table to ANALYSIS_INT_TYPE."""
+    for i, field in enumerate(table.schema):
+        if field.name in INT8_COLUMNS and pa.types.is_int8(field.type):
+            table = table.set_column(
+                i, field.with_type(ANALYSIS_INT_TYPE), table.column(i).cast(ANALYSIS_INT_TYPE)
+            )
+    return table
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """In-memory size of a frame, including string payloads."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def stable_arrow_schema(schema: pa.Schema) -> pa.Schema:
+    """
+    Widen dictionary indices to int32.
+
+    pandas picks int8/int16 category codes per chunk depending on how many
+    values it saw; a fixed index width keeps every row group castable to
+    the schema of the first one.
+    """
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def partition_schema(partition_cols: List[str]) -> pa.Schema:
+    """Arrow schema for the given partition columns (unknown keys -> dictionary)."""
+    default = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([(c, PARTITION_TYPES.get(c, default)) for c in partition_cols])
+
+
+def print_memory_report(before: int, after: int):
+    """Print in-memory bytes before and after compaction."""
+    saved = before - after
+    pct = (saved / before * 100) if before else 0.0
+    print(
+        f"In-memory size: {before / 1e6:,.1f} MB -> {after / 1e6:,.1f} MB "
+        f"({pct:.1f}% smaller)"
+    )
@@ -0,0 +1,130 @@
+"""
+DuckDB execution engine for LLM-generated SQL.
+
+- One embedded DuckDB database per process with an `orders` view over the
+  parquet files listed in the manifest (hive partitions become columns)
+- Queries run multi-threaded and vectorized straight over parquet, with
+  projection/filter pushdown, and spill to SQL_TEMP_DIR when a join or
+  aggregate outgrows SQL_MEMORY_LIMIT
+- The view is re-created when the dataset fingerprint changes (e.g. after
+  an --append ingest)
+- Sandboxed: only a single SELECT/WITH statement is accepted, file access
+  is restricted to the dataset and temp directories and the configuration
+  is locked, so generated SQL cannot read or write anything else
+- run_sql() returns (result_df, summary_stats) exactly like run_pandas_code()
+"""
+
+import re
+import threading
+
+import pandas as pd
+
+from config import (
+    DATA_PROCESSED_PATH,
+    PARTITION_COLUMNS,
+    SQL_MEMORY_LIMIT,
+    SQL_TEMP_DIR,
+    SQL_THREADS,
+)
+from pipeline.data_runner import summarize_result
+from pipeline.dataset_cache import dataset_fingerprint
+from pipeline.manifest import fragment_paths, is_partitioned
+
+# DuckDB types of the hive partition keys (see schema.PARTITION_TYPES)
+HIVE_TYPES = {"market": "VARCHAR", "order_year": "SMALLINT"}
+
+_SQL_START_RE = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+# String literals, quoted identifiers and comments, left to right: a ';'
+# inside any of them does not separate statements
+_SQL_QUOTED_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+_lock = threading.Lock()
+_connection = None
+_view_fingerprint = None
+
+
+def _new_connection():
+    import duckdb
+
+    SQL_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect(database=":memory:")
+    if SQL_THREADS > 0:
+        con.execute(f"SET threads = {SQL_THREADS}")
+    con.execute("SET memory_limit = ?", [SQL_MEMORY_LIMIT])
+    con.execute("SET temp_directory = ?", [str(SQL_TEMP_DIR)])
+    # data/processed holds both the partitioned dataset and the legacy file
+    allowed = [str(DATA_PROCESSED_PATH.parent) + "/", str(SQL_TEMP_DIR) + "/"]
+    con.execute("SET allowed_directories = ?", [allowed])
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    return con
+
+
+def _create_orders_view(con):
+    files = fragment_paths()
+    paths = [str(p) for p in files]
+    if is_partitioned(files):
+        hive_types = {c: HIVE_TYPES.get(c, "VARCHAR") for c in PARTITION_COLUMNS}
+        source = (
+            f"read_parquet({paths!r}, hive_partitioning = true, "
+            f"hive_types = {hive_types!r})"
+        )
+    else:
+        source = f"read_parquet({paths!r})"
+    con.execute(f"CREATE OR REPLACE VIEW orders AS SELECT * FROM {source}")
+
+
+def _get_cursor():
+    """Thread-local cursor on the shared database, with an up-to-date view."""
+    global _connection, _view_fingerprint
+    with _lock:
+        if _connection is None:
+            _connection = _new_connection()
+        fingerprint = dataset_fingerprint()
+        if fingerprint != _view_fingerprint:
+            _create_orders_view(_connection)
+            _view_fingerprint = fingerprint
+        return _connection.cursor()
+
+
+def clean_sql(raw_sql: str) -> str:
+    """Strip markdown fences and trailing semicolons; allow one SELECT only."""
+    sql = raw_sql.strip()
+    sql = re.sub(r"```sql", "", sql, flags=re.IGNORECASE)
+    sql = sql.replace("```", "").replace("`", "").strip()
+    sql = sql.rstrip(";").strip()
+
+    if not _SQL_START_RE.match(sql):
+        raise RuntimeError(f"Generated SQL must be a single SELECT query.\n\nSQL:\n{sql}")
+    if ";" in _SQL_QUOTED_RE.sub("", sql):
+        raise RuntimeError(f"Generated SQL must not contain multiple statements.\n\nSQL:\n{sql}")
+    return sql
+
+
+def run_sql(raw_sql: str):
+    """
+    Execute generated SQL against the `orders` view.
+
+    Returns (result_df, summary_stats), like run_pandas_code().
+    """
+    sql = clean_sql(raw_sql)
+    cursor = _get_cursor()
+    try:
+        result_df = cursor.execute(sql).df()
+    except Exception as e:
+        raise RuntimeError(f"Error executing generated SQL: {e}\n\nSQL:\n{sql}") from e
+    finally:
+        cursor.close()
+
+    if not isinstance(result_df, pd.DataFrame):
+        result_df = pd.DataFrame(result_df)
+    return result_df, summarize_result(result_df)
+
+
+def orders_columns() -> list:
+    """(name, type) pairs of the `orders` view, for prompts and debugging."""
+    cursor = _get_cursor()
+    try:
+        return [(row[0], row[1]) for row in cursor.execute("DESCRIBE orders").fetchall()]
+    finally:
+        cursor.close()
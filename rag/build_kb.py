@@ -1,12 +1,38 @@
 """
-Build the Chroma vector store from markdown knowledge base files.
+Build the vector index from markdown knowledge base files.
 
-- Reads all .md files under kb/
-- Embeds them with sentence-transformers
-- Stores them in a Chroma DB collection called 'insightweaver_kb'
+- Reads all .md files under kb/ and splits them into heading-scoped chunks
+  (rag/chunking.py); each chunk keeps category, relative_path, heading_path
+  and chunk_index as metadata
+- Embeds the chunks with the EMBEDDING_BACKEND encoder (rag/encoders.py:
+  sentence-transformers or the int8 ONNX export)
+- Stores them in the configured index backend (rag/vector_index.py): a
+  memory-mapped .npy matrix under rag/numpy_index/ (default) and/or the
+  Chroma DB collection called 'insightweaver_kb'
+- Writes a BM25 inverted index over the same chunks (rag/lexical_index.py)
+  for hybrid retrieval; it needs no embeddings and is rebuilt whenever the
+  chunk set changes
+- Incremental: every chunk is keyed by relative path, heading path and
+  content hash (not its position), and rag/kb_manifest.json remembers the
+  hash (and size/mtime) and chunk ids of each file and the chunk set each
+  backend holds. A rebuild only re-embeds new or changed chunks and deletes
+  entries that no longer exist; chunks that merely moved (a section was
+  inserted above them) keep their stored vector and only get their
+  chunk_index metadata rewritten. When nothing changed it returns without
+  loading the embedding model at all
+
+Usage:
+    python rag/build_kb.py                       # VECTOR_INDEX_BACKEND
+    python rag/build_kb.py --backend all --float16
+    python rag/build_kb.py --full                # ignore the manifest
 """
 
+import argparse
+import hashlib
+import json
 import sys
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 
 # ----------------------------------------------------------
@@ -19,66 +45,320 @@ PROJECT_ROOT = CURRENT_DIR.parent                  # .../Final Project
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-import chromadb
-from sentence_transformers import SentenceTransformer
+from config import (
+    CHROMA_DB_DIR,
+    KB_BASE_PATH,
+    KB_CHUNK_MAX_CHARS,
+    KB_MANIFEST_PATH,
+    LEXICAL_INDEX_DIR,
+    NUMPY_INDEX_DIR,
+    VECTOR_INDEX_BACKEND,
+    VECTOR_INDEX_FLOAT16,
+)
+from rag.chunking import CHUNKER_VERSION, HEADING_PATH_SEP, chunk_embedding_text, chunk_markdown
+from rag.encoders import encoder_id, get_encoder
+from rag.lexical_index import BM25Index
+from rag.vector_index import BACKENDS
 
-from config import KB_BASE_PATH, CHROMA_DB_DIR, EMBEDDING_MODEL_NAME
+INDEX_PATHS = {"numpy": NUMPY_INDEX_DIR, "chroma": CHROMA_DB_DIR}
 
 
-def load_kb_texts():
-    """Load all markdown files from kb/ into memory."""
-    texts = []
-    metadatas = []
-    ids = []
-
-    kb_files = list(KB_BASE_PATH.rglob("*.md"))
-    for i, fpath in enumerate(kb_files):
-        text = fpath.read_text(encoding="utf-8")
-        texts.append(text)
+# ----------------------------------------------------------
+# 1. KB FILES AND DOCUMENT IDS
+# ----------------------------------------------------------
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Bumped when doc_id() changes, so ids recorded in the manifest are rebuilt
+DOC_ID_VERSION = 2
+
+
+def doc_id(relative_path: str, heading_path: str, digest: str, occurrence: int = 0) -> str:
+    """
+    Stable id from the file, the chunk's heading path and its text: editing
+    a section changes only its own chunks' ids, and inserting one shifts no
+    other id. `occurrence` tells identical chunks under the same heading apart.
+    """
+    key = content_hash(f"{heading_path}\0{digest}")[:16]
+    return f"{relative_path}#{key}" + (f"~{occurrence}" if occurrence else "")
+
+
+def _file_chunks(rel: str, text: str):
+    """Texts, metadatas and ids of one file's chunks."""
+    texts, metadatas, ids = [], [], []
+    category = (KB_BASE_PATH / rel).parts[-2]
+    seen = {}
+    for chunk in chunk_markdown(text, max_chars=KB_CHUNK_MAX_CHARS):
+        digest = content_hash(chunk["text"])
+        heading_path = HEADING_PATH_SEP.join(chunk["heading_path"])
+        texts.append(chunk["text"])
         metadatas.append(
             {
-                "relative_path": str(fpath.relative_to(KB_BASE_PATH)),
-                "category": fpath.parts[-2],  # schema_docs, metric_definitions, business_playbook
+                "relative_path": rel,
+                "category": category,  # schema_docs, metric_definitions, business_playbook
+                "heading_path": heading_path,
+                "chunk_index": chunk["chunk_index"],
+                "content_hash": digest,
             }
         )
-        ids.append(str(i))
+        occurrence = seen.get((heading_path, digest), 0)
+        seen[(heading_path, digest)] = occurrence + 1
+        ids.append(doc_id(rel, heading_path, digest, occurrence))
+    return texts, metadatas, ids
+
+
+def scan_kb(previous: dict = None) -> dict:
+    """
+    relative path -> {"size", "mtime_ns", "hash", "chunks"} for every .md
+    file. Files whose size and mtime match `previous` keep their recorded
+    hash and chunk ids without being read.
+    """
+    previous = previous or {}
+    files = {}
+    for fpath in sorted(KB_BASE_PATH.rglob("*.md")):
+        rel = fpath.relative_to(KB_BASE_PATH).as_posix()
+        stat = fpath.stat()
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        old = previous.get(rel)
+        if old and old.get("size") == entry["size"] and old.get("mtime_ns") == entry["mtime_ns"]:
+            entry["hash"], entry["chunks"] = old["hash"], old["chunks"]
+        else:
+            text = fpath.read_text(encoding="utf-8")
+            entry["hash"] = content_hash(text)
+            entry["chunks"] = _file_chunks(rel, text)[2]
+        files[rel] = entry
+    return files
 
+
+def load_kb_documents(relative_paths):
+    """Chunk texts, metadatas and ids of the given KB files."""
+    texts, metadatas, ids = [], [], []
+    for rel in relative_paths:
+        t, m, i = _file_chunks(rel, (KB_BASE_PATH / rel).read_text(encoding="utf-8"))
+        texts += t
+        metadatas += m
+        ids += i
     return texts, metadatas, ids
 
 
-def build_chroma_store():
-    """Create/update the Chroma DB collection from KB markdown files."""
-    CHROMA_DB_DIR.mkdir(parents=True, exist_ok=True)
+def load_kb_texts():
+    """Load all markdown files from kb/ into memory, as chunks."""
+    return load_kb_documents(scan_kb().keys())
+
+
+# ----------------------------------------------------------
+# 2. MANIFEST
+# ----------------------------------------------------------
+
+def load_kb_manifest() -> dict:
+    if not KB_MANIFEST_PATH.exists():
+        return {}
+    with KB_MANIFEST_PATH.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_kb_manifest(manifest: dict):
+    KB_MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = KB_MANIFEST_PATH.with_name(KB_MANIFEST_PATH.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    tmp_path.replace(KB_MANIFEST_PATH)
+
+
+def _chunking_state() -> dict:
+    return {"version": CHUNKER_VERSION, "max_chars": KB_CHUNK_MAX_CHARS, "ids": DOC_ID_VERSION}
 
-    # ✅ New API: PersistentClient instead of Client(Settings(...))
-    client = chromadb.PersistentClient(path=str(CHROMA_DB_DIR))
 
-    # You can pass metadata if you want; not required
-    collection = client.get_or_create_collection(
-        name="insightweaver_kb",
-        metadata={"description": "KB for InsightWeaver supply chain project"},
+def _backend_state(backend: str, ids, float16: bool) -> str:
+    """
+    Fingerprint of what a backend should hold (model, storage, chunk set in
+    file order, so a moved chunk marks the backend stale too).
+    """
+    dtype = ("float16" if float16 else "float32") if backend == "numpy" else ""
+    h = hashlib.sha256(f"{encoder_id()}|{dtype}".encode("utf-8"))
+    for i in ids:
+        h.update(b"\0" + i.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _moved_docs(index, ids, positions: dict) -> list:
+    """Stored docs among `ids` whose chunk_index is no longer `positions[id]`."""
+    moved = []
+    for doc in index.get(ids):
+        if doc["metadata"].get("chunk_index") != positions[doc["id"]]:
+            doc["metadata"] = dict(doc["metadata"], chunk_index=positions[doc["id"]])
+            moved.append(doc)
+    return moved
+
+
+# ----------------------------------------------------------
+# 3. INCREMENTAL BUILD
+# ----------------------------------------------------------
+
+def _open_index(backend: str, float16: bool):
+    """The existing index if it is reusable for this model/dtype, else None."""
+    try:
+        index = BACKENDS[backend].load()
+    except Exception:
+        return None
+    if backend == "numpy" and str(index.embeddings.dtype) != ("float16" if float16 else "float32"):
+        return None
+    return index
+
+
+def _embed(texts):
+    return get_encoder().encode(texts)
+
+
+def _embed_chunks(texts, metadatas):
+    return _embed(
+        [chunk_embedding_text(t, m["heading_path"]) for t, m in zip(texts, metadatas)]
     )
 
-    texts, metadatas, ids = load_kb_texts()
-    print(f"Loaded {len(texts)} KB documents from {KB_BASE_PATH}")
 
-    if not texts:
+def build_kb_index(backends=None, float16: bool = VECTOR_INDEX_FLOAT16, full: bool = False) -> dict:
+    """
+    Bring each requested index backend in line with kb/. Returns a summary
+    dict (chunks, embedded, removed, moved, rebuilt_backends, seconds).
+    """
+    t0 = time.perf_counter()
+    backends = backends or [VECTOR_INDEX_BACKEND]
+    manifest = {} if full else load_kb_manifest()
+    if manifest and manifest.get("model") != encoder_id():
+        # Vectors from another model are useless: re-embed everything
+        manifest, full = {}, True
+
+    # Chunk ids recorded under other chunking rules are meaningless
+    previous = manifest.get("files") if manifest.get("chunking") == _chunking_state() else None
+    files = scan_kb(previous)
+    wanted = {i: rel for rel, entry in files.items() for i in entry["chunks"]}
+    positions = {i: k for entry in files.values() for k, i in enumerate(entry["chunks"])}
+    print(f"Found {len(files)} KB documents ({len(wanted)} chunks) in {KB_BASE_PATH}")
+    if not files:
         print("WARNING: No .md files found in kb/. Did you create the KB markdown files?")
-        return
 
-    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-    embeddings = model.encode(texts).tolist()
+    states = manifest.get("backends", {})
+    stale = [
+        b for b in backends
+        if states.get(b) != _backend_state(b, wanted, float16) or not INDEX_PATHS[b].exists()
+    ]
+
+    # Per stale backend: what it holds vs what it should hold, plus kept
+    # chunks whose position changed (re-stored with their old vector)
+    plans = {}
+    for backend in stale:
+        index = _open_index(backend, float16)
+        current = set(index.doc_ids()) if index is not None else set()
+        if full:
+            # Rebuilt from scratch: the vectors (and their dimension) may change
+            plans[backend] = (None, sorted(current), sorted(wanted), [])
+        else:
+            moved = _moved_docs(index, sorted(current & set(wanted)), positions) if index else []
+            plans[backend] = (
+                index, sorted(current - set(wanted)), sorted(set(wanted) - current), moved
+            )
 
-    collection.upsert(
-        documents=texts,
-        metadatas=metadatas,
-        ids=ids,
-        embeddings=embeddings,
+    # Embed every missing document once, whichever backends need it
+    to_add = sorted({i for _, _, add, _ in plans.values() for i in add})
+    vectors = {}
+    if to_add:
+        texts, metadatas, ids = load_kb_documents(sorted({wanted[i] for i in to_add}))
+        needed = set(to_add)
+        keep = [k for k, i in enumerate(ids) if i in needed]
+        texts = [texts[k] for k in keep]
+        metadatas = [metadatas[k] for k in keep]
+        ids = [ids[k] for k in keep]
+        embeddings = _embed_chunks(texts, metadatas)
+        vectors = {i: (e, t, m) for i, e, t, m in zip(ids, embeddings, texts, metadatas)}
+
+    for backend, (index, delete_ids, add_ids, moved) in plans.items():
+        # A file edited between scan and read gets a different id; leave the
+        # backend marked stale so the next run picks the edit up
+        complete = all(i in vectors for i in add_ids)
+        add_ids = [i for i in add_ids if i in vectors]
+        docs = [vectors[i] for i in add_ids]
+        add_ids += [d["id"] for d in moved]
+        docs += [(d["embedding"], d["text"], d["metadata"]) for d in moved]
+        embeddings = [e for e, _, _ in docs]
+        texts = [t for _, t, _ in docs]
+        metadatas = [m for _, _, m in docs]
+        if index is None:
+            kwargs = {"dtype": "float16" if float16 else "float32"} if backend == "numpy" else {}
+            BACKENDS[backend].build(embeddings, texts, metadatas, add_ids, **kwargs)
+        else:
+            index.update(embeddings, texts, metadatas, add_ids, delete_ids=delete_ids)
+        print(
+            f"{backend}: +{len(add_ids) - len(moved)} -{len(delete_ids)} chunks, "
+            f"{len(moved)} moved ({INDEX_PATHS[backend]})"
+        )
+        if complete:
+            states[backend] = _backend_state(backend, wanted, float16)
+        else:
+            states.pop(backend, None)
+
+    lexical_state = _backend_state("lexical", wanted, False)
+    if states.get("lexical") != lexical_state or not LEXICAL_INDEX_DIR.exists():
+        texts, metadatas, ids = load_kb_documents(files)
+        BM25Index.build(
+            [chunk_embedding_text(t, m["heading_path"]) for t, m in zip(texts, metadatas)],
+            texts, metadatas, ids,
+        )
+        print(f"lexical: {len(ids)} chunks ({LEXICAL_INDEX_DIR})")
+        states["lexical"] = lexical_state
+        stale.append("lexical")
+
+    save_kb_manifest(
+        {
+            "model": encoder_id(),
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "chunking": _chunking_state(),
+            "files": files,
+            "backends": states,
+        }
     )
 
-    print(f"Chroma store built and persisted at {CHROMA_DB_DIR}")
+    summary = {
+        "chunks": len(wanted),
+        "embedded": len(vectors),
+        "removed": sum(len(d) for _, d, _, _ in plans.values()),
+        "moved": sum(len(m) for _, _, _, m in plans.values()),
+        "rebuilt_backends": stale,
+        "seconds": time.perf_counter() - t0,
+    }
+    if not stale:
+        print("KB index up to date")
+    print(f"Done in {summary['seconds'] * 1000:.1f} ms ({summary['embedded']} chunks embedded)")
+    return summary
+
+
+def build_chroma_store():
+    """Create/update the Chroma DB collection from KB markdown files."""
+    build_kb_index(["chroma"])
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the KB vector index.")
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS) + ["all"],
+        default=VECTOR_INDEX_BACKEND,
+        help="Index backend to build (default: VECTOR_INDEX_BACKEND)",
+    )
+    parser.add_argument(
+        "--float16",
+        action="store_true",
+        default=VECTOR_INDEX_FLOAT16,
+        help="Store the NumPy index matrix as float16",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the manifest and re-embed every document",
+    )
+    args = parser.parse_args()
+
     print("Project root detected as:", PROJECT_ROOT)
-    build_chroma_store()
+    backends = sorted(BACKENDS) if args.backend == "all" else [args.backend]
+    build_kb_index(backends, float16=args.float16, full=args.full)
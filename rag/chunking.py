@@ -0,0 +1,141 @@
+"""
+Heading-aware chunking of the markdown knowledge base.
+
+- Splits a document at markdown headings (outside code fences); each chunk
+  carries its heading path, e.g. ["Fulfillment & Delivery Risk Factors",
+  "1. Core Drivers of Delivery Risk", "C. Shipping Mode"]
+- A heading with no body of its own (a parent of subsections) is folded
+  into the next chunk instead of becoming a chunk by itself
+- Sections longer than max_chars are packed paragraph by paragraph into
+  several chunks with the same heading path, so concatenating adjacent
+  chunks gives back the section text
+- chunk_embedding_text() prefixes the heading path, so a chunk such as
+  "Customer fields: ..." is embedded together with the title it lives under
+
+Usage:
+    python rag/chunking.py       # chunk statistics for kb/
+"""
+
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+CURRENT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = CURRENT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import KB_CHUNK_MAX_CHARS
+
+# Bump when the chunking rules change so build_kb re-chunks every file
+CHUNKER_VERSION = 1
+
+HEADING_PATH_SEP = " > "
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+
+def _sections(text: str) -> List[dict]:
+    """[{"path": [...titles], "lines": [...]}] in document order."""
+    sections = [{"path": [], "lines": []}]
+    stack = []  # (level, title)
+    in_fence = False
+    for line in text.splitlines():
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_RE.match(line)
+        if match:
+            level = len(match.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, match.group(2)))
+            sections.append({"path": [title for _, title in stack], "lines": [line]})
+        else:
+            sections[-1]["lines"].append(line)
+    return sections
+
+
+def _paragraphs(lines: List[str]) -> List[str]:
+    """Blank-line separated blocks; fenced code stays in one block."""
+    blocks, current, in_fence = [], [], False
+    for line in lines:
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        if not line.strip() and not in_fence:
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+        else:
+            current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _pack(blocks: List[str], max_chars: int) -> List[str]:
+    """Greedily join paragraphs into pieces of at most max_chars (a single
+    oversized paragraph becomes its own piece)."""
+    pieces, current = [], ""
+    for block in blocks:
+        if current and len(current) + 2 + len(block) > max_chars:
+            pieces.append(current)
+            current = block
+        else:
+            current = f"{current}\n\n{block}" if current else block
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_markdown(text: str, max_chars: int = KB_CHUNK_MAX_CHARS) -> List[Dict]:
+    """
+    Heading-scoped chunks of a markdown document:
+    [{"text", "heading_path": [...], "chunk_index"}] in document order.
+    """
+    chunks = []
+    carry = []  # heading lines of sections with no body yet
+    for section in _sections(text):
+        heading, body = section["lines"][:1], section["lines"][1:]
+        if not section["path"]:  # preamble before the first heading
+            heading, body = [], section["lines"]
+        blocks = _paragraphs(body)
+        if not blocks:
+            carry.extend(heading)
+            continue
+        lead = "\n".join(carry + heading)
+        carry = []
+        for i, piece in enumerate(_pack(blocks, max_chars)):
+            if i == 0 and lead:
+                piece = f"{lead}\n\n{piece}"
+            chunks.append({"text": piece, "heading_path": section["path"]})
+
+    if carry:  # trailing headings with nothing under them
+        chunks.append({"text": "\n".join(carry), "heading_path": []})
+
+    for i, chunk in enumerate(chunks):
+        chunk["chunk_index"] = i
+    return chunks
+
+
+def chunk_embedding_text(text: str, heading_path: str) -> str:
+    """What gets embedded for a chunk: its heading path, then the text."""
+    return f"{heading_path}\n{text}" if heading_path else text
+
+
+if __name__ == "__main__":
+    from config import KB_BASE_PATH
+
+    total_docs = total_chunks = 0
+    for fpath in sorted(KB_BASE_PATH.rglob("*.md")):
+        text = fpath.read_text(encoding="utf-8")
+        chunks = chunk_markdown(text)
+        sizes = [len(c["text"]) for c in chunks]
+        total_docs += 1
+        total_chunks += len(chunks)
+        print(
+            f"{fpath.relative_to(KB_BASE_PATH).as_posix():45s} {len(text):6d} chars "
+            f"-> {len(chunks):2d} chunks (max {max(sizes, default=0)})"
+        )
+    print(f"{total_docs} documents -> {total_chunks} chunks")
@@ -0,0 +1,162 @@
+"""
+Bounded cache of query embeddings.
+
+- Keyed by normalized query text (case, whitespace and trailing punctuation
+  folded), so "Average sales by region?" and "average sales by region"
+  share one entry, and by embedding model name
+- In-memory LRU with a fixed number of entries
+- Optional SQLite persistence: entries survive restarts and are shared by
+  every app process on the host; a memory miss that hits disk is promoted
+  back into the LRU, and the table is trimmed to the most recently used
+  max_disk_entries rows
+- Hit/miss counters via stats()
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+_WS_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?.!]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query used as the cache key."""
+    text = _WS_RE.sub(" ", query.strip().lower())
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+class EmbeddingCache:
+    """Thread-safe LRU of float32 vectors, optionally backed by SQLite."""
+
+    # Trim the SQLite table once every this many writes
+    PRUNE_EVERY = 100
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        db_path: Optional[Path] = None,
+        max_disk_entries: int = 100_000,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.db_path = Path(db_path) if db_path else None
+        self._writes = 0
+        self._entries: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ---- persistence ----
+
+    def _get_db(self):
+        if self.db_path is None:
+            return None
+        if self._db is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                " model TEXT NOT NULL,"
+                " query TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (model, query))"
+            )
+        return self._db
+
+    def _load_from_disk(self, key: tuple) -> Optional[np.ndarray]:
+        db = self._get_db()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT dim, vector FROM query_embeddings WHERE model = ? AND query = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute(
+            "UPDATE query_embeddings SET last_used = ? WHERE model = ? AND query = ?",
+            (time.time(),) + key,
+        )
+        db.commit()
+        return np.frombuffer(row[1], dtype=np.float32, count=row[0])
+
+    def _save_to_disk(self, key: tuple, vector: np.ndarray):
+        db = self._get_db()
+        if db is None:
+            return
+        db.execute(
+            "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?, ?)",
+            key + (len(vector), vector.tobytes(), time.time()),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            db.execute(
+                "DELETE FROM query_embeddings WHERE rowid IN ("
+                " SELECT rowid FROM query_embeddings"
+                " ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+        db.commit()
+
+    # ---- public API ----
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        """Cached embedding of `query` (read-only float32 vector) or None."""
+        key = (model, normalize_query(query))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            vector = self._load_from_disk(key)
+            if vector is not None:
+                self._insert(key, vector)
+                self.disk_hits += 1
+                return vector
+            self.misses += 1
+            return None
+
+    def put(self, model: str, query: str, vector) -> np.ndarray:
+        """Store an embedding; returns the cached (read-only float32) copy."""
+        key = (model, normalize_query(query))
+        vector = np.array(vector, dtype=np.float32).ravel()
+        vector.setflags(write=False)
+        with self._lock:
+            self._insert(key, vector)
+            self._save_to_disk(key, vector)
+        return vector
+
+    def _insert(self, key: tuple, vector: np.ndarray):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop the in-memory entries (the SQLite file is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "persistent": self.db_path is not None,
+        }
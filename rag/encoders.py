@@ -0,0 +1,113 @@
+"""
+Text encoders for the KB and for queries.
+
+- TorchEncoder: sentence-transformers on PyTorch (the reference)
+- OnnxEncoder: the same model exported once to ONNX with int8 dynamic
+  quantization (rag/export_onnx.py), run with onnxruntime and the fast
+  `tokenizers` tokenizer; mean pooling + L2 normalization reproduce the
+  SentenceTransformer pipeline without importing torch, which cuts cold
+  start and memory on CPU-only hosts
+- get_encoder() returns the EMBEDDING_BACKEND encoder, created once;
+  encoder_id() names the model *and* backend, so caches and the KB
+  manifest never mix vectors from different encoders
+
+The ONNX backend needs `pip install onnxruntime` (tokenizers ships with
+sentence-transformers) and a prior `python rag/export_onnx.py`.
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from config import EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR
+
+ENCODER_BACKENDS = ("torch", "onnx")
+
+ONNX_MODEL_FILE = "model_int8.onnx"
+ONNX_META_FILE = "encoder.json"
+
+
+class TorchEncoder:
+    backend = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        embeddings = self.model.encode(list(texts), batch_size=batch_size)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class OnnxEncoder:
+    backend = "onnx"
+
+    def __init__(self, model_dir: Path = ONNX_MODEL_DIR):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        if not (model_dir / ONNX_MODEL_FILE).exists():
+            raise FileNotFoundError(
+                f"No ONNX encoder in {model_dir}; run python rag/export_onnx.py"
+            )
+        with (model_dir / ONNX_META_FILE).open("r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.model_name = self.meta["model_name"]
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.meta["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.meta["pad_token_id"], pad_token=self.meta["pad_token"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_dir / ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = feeds["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(
+            [self._encode_batch(texts[i : i + batch_size]) for i in range(0, len(texts), batch_size)]
+        )
+
+
+def encoder_id(backend: Optional[str] = None) -> str:
+    """Identity of the embeddings an encoder produces (cache / manifest key)."""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    return EMBEDDING_MODEL_NAME if backend == "torch" else f"{EMBEDDING_MODEL_NAME}+onnx-int8"
+
+
+_encoders = {}
+
+
+def get_encoder(backend: Optional[str] = None):
+    """The encoder for `backend` (default EMBEDDING_BACKEND), created once."""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}")
+    if backend not in _encoders:
+        _encoders[backend] = TorchEncoder() if backend == "torch" else OnnxEncoder()
+    return _encoders[backend]
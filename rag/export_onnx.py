@@ -0,0 +1,99 @@
+"""
+Export the embedding model to an int8 ONNX encoder (rag/encoders.py).
+
+- Loads EMBEDDING_MODEL_NAME with transformers (the transformer part of the
+  SentenceTransformer; pooling and normalization are redone in numpy)
+- torch.onnx.export with dynamic batch / sequence axes
+- onnxruntime dynamic quantization: int8 weights, activations quantized on
+  the fly, no calibration data needed
+- Saves model_int8.onnx, the fast tokenizer (tokenizer.json) and
+  encoder.json (model name, max sequence length, pad token) to
+  ONNX_MODEL_DIR
+
+Run once per model, on a machine with torch; app hosts then only need
+onnxruntime:
+    python rag/export_onnx.py
+    EMBEDDING_BACKEND=onnx python rag/build_kb.py
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# ----------------------------------------------------------
+# 0. PATCH PYTHON PATH TO PROJECT ROOT
+# ----------------------------------------------------------
+
+CURRENT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = CURRENT_DIR.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR
+from rag.encoders import ONNX_META_FILE, ONNX_MODEL_FILE
+
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def export_onnx(
+    model_name: str = EMBEDDING_MODEL_NAME,
+    out_dir: Path = ONNX_MODEL_DIR,
+    max_seq_length: int = 256,
+    opset: int = 14,
+):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = out_dir / "model_fp32.onnx"
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    dummy = tokenizer(["export the encoder"], return_tensors="pt")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in INPUT_NAMES),
+            str(fp32_path),
+            input_names=INPUT_NAMES,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"Exported fp32 model to {fp32_path} ({fp32_path.stat().st_size / 1e6:.1f} MB)")
+
+    int8_path = out_dir / ONNX_MODEL_FILE
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+    print(f"Quantized int8 model: {int8_path} ({int8_path.stat().st_size / 1e6:.1f} MB)")
+
+    tokenizer.save_pretrained(str(out_dir))  # writes tokenizer.json (fast tokenizer)
+    meta = {
+        "model_name": model_name,
+        "max_seq_length": max_seq_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "quantization": "dynamic-int8",
+        "pooling": "mean",
+        "normalize": True,
+    }
+    with (out_dir / ONNX_META_FILE).open("w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    print(f"ONNX encoder ready in {out_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to int8 ONNX.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--out-dir", type=Path, default=ONNX_MODEL_DIR)
+    parser.add_argument("--max-seq-length", type=int, default=256)
+    args = parser.parse_args()
+    export_onnx(args.model, args.out_dir, args.max_seq_length)
@@ -0,0 +1,179 @@
+"""
+Persisted BM25 inverted index over the KB chunks.
+
+- Built by rag/build_kb.py next to the dense index, from the same chunk
+  texts (heading path included) and ids
+- Tokens are lowercase words; snake_case identifiers such as
+  benefit_per_order are indexed whole *and* by their parts, so a literal
+  column name in a question matches its definition exactly
+- Stored as CSR arrays (terms, offsets, doc indices, term frequencies) in
+  one .npz plus a JSON document store, loaded once per process; a query
+  touches only the postings of its own terms
+- BM25 (Okapi, k1/b) with IDF computed at build time
+"""
+
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from config import LEXICAL_INDEX_DIR
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:_[a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the "
+    "this to was what when which who why with each does do per vs".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; identifiers also yield their underscore parts."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if "_" in token:
+            tokens.append(token)
+            tokens.extend(p for p in token.split("_") if p not in STOPWORDS)
+        elif token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a CSR inverted index."""
+
+    ARRAYS_FILE = "postings.npz"
+    DOCS_FILE = "docs.json"
+
+    def __init__(self, terms, offsets, postings, tfs, idf, doc_lens, texts, metadatas, ids):
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.tfs = tfs
+        self.idf = idf
+        self.doc_lens = doc_lens
+        self.avg_len = float(doc_lens.mean()) if len(doc_lens) else 0.0
+        self.texts = texts
+        self.metadatas = metadatas
+        self.ids = ids
+
+    @classmethod
+    def build(cls, index_texts, texts, metadatas, ids, index_dir: Path = LEXICAL_INDEX_DIR) -> "BM25Index":
+        """
+        Index `index_texts` (what gets tokenized) for documents (texts,
+        metadatas, ids), save to index_dir and return the index.
+        """
+        counts = [Counter(tokenize(t)) for t in index_texts]
+        terms = sorted(set().union(*counts)) if counts else []
+        vocab = {term: i for i, term in enumerate(terms)}
+
+        per_term = [[] for _ in terms]
+        for doc, counter in enumerate(counts):
+            for term, tf in counter.items():
+                per_term[vocab[term]].append((doc, tf))
+
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in per_term])
+        postings = np.array([d for p in per_term for d, _ in p], dtype=np.int32)
+        tfs = np.array([tf for p in per_term for _, tf in p], dtype=np.float32)
+        doc_lens = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        n_docs = len(counts)
+        df = np.diff(offsets).astype(np.float64)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_arrays = index_dir / (cls.ARRAYS_FILE + ".tmp")
+        with tmp_arrays.open("wb") as f:
+            np.savez(
+                f,
+                terms=np.array(terms, dtype=str),
+                offsets=offsets,
+                postings=postings,
+                tfs=tfs,
+                idf=idf,
+                doc_lens=doc_lens,
+            )
+        tmp_docs = index_dir / (cls.DOCS_FILE + ".tmp")
+        with tmp_docs.open("w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "texts": texts, "metadatas": metadatas}, f)
+        tmp_arrays.replace(index_dir / cls.ARRAYS_FILE)
+        tmp_docs.replace(index_dir / cls.DOCS_FILE)
+        return cls(terms, offsets, postings, tfs, idf, doc_lens, list(texts), list(metadatas), list(ids))
+
+    @classmethod
+    def load(cls, index_dir: Path = LEXICAL_INDEX_DIR) -> "BM25Index":
+        index_dir = Path(index_dir)
+        with np.load(index_dir / cls.ARRAYS_FILE, allow_pickle=False) as arrays:
+            data = {name: arrays[name] for name in arrays.files}
+        with (index_dir / cls.DOCS_FILE).open("r", encoding="utf-8") as f:
+            docs = json.load(f)
+        return cls(
+            data["terms"].tolist(),
+            data["offsets"],
+            data["postings"],
+            data["tfs"],
+            data["idf"],
+            data["doc_lens"],
+            docs["texts"],
+            docs["metadatas"],
+            docs["ids"],
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for `query`."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        if not len(self.ids):
+            return scores
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens / self.avg_len)
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end]
+            scores[docs] += self.idf[t] * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        return scores
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """(document position, score) of the best matches, best first."""
+        scores = self.scores(query)
+        k = min(top_k, int((scores > 0).sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def query(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """Same result shape as the dense indexes (rag/vector_index.py)."""
+        return [
+            [
+                {"id": self.ids[i], "text": self.texts[i], "metadata": self.metadatas[i]}
+                for i, _ in self.search(q, top_k)
+            ]
+            for q in queries
+        ]
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict]], k: int = 60) -> List[Dict]:
+    """
+    Fuse ranked lists of documents (matched by "id") with RRF:
+    score(d) = sum over lists of 1 / (k + rank of d). Best first.
+    """
+    scores, docs = {}, {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            scores[doc["id"]] = scores.get(doc["id"], 0.0) + 1.0 / (k + rank)
+            docs.setdefault(doc["id"], doc)
+    return [docs[i] for i in sorted(scores, key=lambda i: -scores[i])]
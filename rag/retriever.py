@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import sys
 from pathlib import Path
 
@@ -12,51 +12,185 @@ PROJECT_ROOT = CURRENT_DIR.parent                  # .../Final Project
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-import chromadb
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
-from config import CHROMA_DB_DIR, EMBEDDING_MODEL_NAME
+from config import (
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_PERSIST,
+    EMBEDDING_CACHE_SIZE,
+    HYBRID_CANDIDATES,
+    KB_MERGE_ADJACENT_CHUNKS,
+    RETRIEVAL_MODE,
+    RRF_K,
+)
+from rag.embedding_cache import EmbeddingCache, normalize_query
+from rag.encoders import encoder_id, get_encoder
+from rag.lexical_index import BM25Index, reciprocal_rank_fusion
+from rag.vector_index import load_index
 
-_embedding_model = None
-_collection = None
+RETRIEVAL_MODES = ("hybrid", "dense", "lexical")
+
+_index = None
+_lexical_index = None
+
+# One question is typically embedded several times (code generation, then
+# insights) and sample questions repeat all day; see rag/embedding_cache.py
+_embedding_cache = EmbeddingCache(
+    max_entries=EMBEDDING_CACHE_SIZE,
+    db_path=EMBEDDING_CACHE_PATH if EMBEDDING_CACHE_PERSIST else None,
+)
 
 
 def _get_embedding_model():
-    global _embedding_model
-    if _embedding_model is None:
-        _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-    return _embedding_model
-
-
-def _get_collection():
-    global _collection
-    if _collection is None:
-        # ✅ New API: PersistentClient
-        client = chromadb.PersistentClient(path=str(CHROMA_DB_DIR))
-        _collection = client.get_collection(name="insightweaver_kb")
-    return _collection
-
-
-def retrieve_context(query: str, top_k: int = 5) -> List[Dict]:
-    model = _get_embedding_model()
-    collection = _get_collection()
-
-    query_emb = model.encode([query]).tolist()
-
-    results = collection.query(
-        query_embeddings=query_emb,
-        n_results=top_k,
-    )
-
-    docs = []
-    for doc, meta in zip(results["documents"][0], results["metadatas"][0]):
-        docs.append(
-            {
-                "text": doc,
-                "metadata": meta,
-            }
-        )
-    return docs
+    """The EMBEDDING_BACKEND encoder (torch or int8 ONNX), loaded once."""
+    return get_encoder()
+
+
+def _get_index():
+    """The configured vector index (VECTOR_INDEX_BACKEND), opened once."""
+    global _index
+    if _index is None:
+        _index = load_index()
+    return _index
+
+
+def _get_lexical_index():
+    """The BM25 index written by build_kb.py, or None if it was never built."""
+    global _lexical_index
+    if _lexical_index is None:
+        try:
+            _lexical_index = BM25Index.load()
+        except FileNotFoundError:
+            return None
+    return _lexical_index
+
+
+def embed_queries(queries: List[str], use_cache: bool = True) -> np.ndarray:
+    """
+    Embeddings of `queries` as an (n, dim) float32 matrix.
+
+    Cached queries are looked up; the rest (deduplicated by normalized text)
+    go through the encoder in a single batched call.
+    """
+    model_key = encoder_id()
+    vectors = [None] * len(queries)
+    pending = {}  # normalized query -> (query text, [positions])
+    for i, query in enumerate(queries):
+        vector = _embedding_cache.get(model_key, query) if use_cache else None
+        if vector is not None:
+            vectors[i] = vector
+        else:
+            pending.setdefault(normalize_query(query), (query, []))[1].append(i)
+
+    if pending:
+        texts = [text for text, _ in pending.values()]
+        encoded = _get_embedding_model().encode(texts, batch_size=max(32, len(texts)))
+        for (text, positions), vector in zip(pending.values(), encoded):
+            if use_cache:
+                vector = _embedding_cache.put(model_key, text, vector)
+            for i in positions:
+                vectors[i] = vector
+
+    return np.vstack(vectors).astype(np.float32, copy=False)
+
+
+def embed_query(query: str, use_cache: bool = True) -> np.ndarray:
+    """Embedding of `query`, from the cache when possible."""
+    return embed_queries([query], use_cache=use_cache)[0]
+
+
+def embedding_cache_stats() -> dict:
+    return _embedding_cache.stats()
+
+
+def merge_adjacent_chunks(docs: List[Dict]) -> List[Dict]:
+    """
+    Stitch retrieved chunks that are consecutive in the same KB file into one
+    document (text in file order, metadata of the first chunk plus
+    chunk_end). Merged runs keep the rank of their best chunk; documents
+    without chunk metadata pass through unchanged.
+    """
+    runs = {}  # relative_path -> [(chunk_index, rank, doc)]
+    merged = []  # (rank, doc)
+    for rank, doc in enumerate(docs):
+        meta = doc["metadata"]
+        if "chunk_index" not in meta:
+            merged.append((rank, doc))
+        else:
+            runs.setdefault(meta["relative_path"], []).append((meta["chunk_index"], rank, doc))
+
+    for hits in runs.values():
+        hits.sort(key=lambda h: h[0])
+        group = [hits[0]]
+        for hit in hits[1:] + [None]:
+            if hit is not None and hit[0] == group[-1][0] + 1:
+                group.append(hit)
+                continue
+            first = group[0][2]
+            meta = dict(first["metadata"], chunk_end=group[-1][0])
+            text = "\n\n".join(d["text"] for _, _, d in group)
+            doc = {"id": first.get("id"), "text": text, "metadata": meta}
+            merged.append((min(r for _, r, _ in group), doc))
+            group = [hit]
+
+    return [doc for _, doc in sorted(merged, key=lambda m: m[0])]
+
+
+def retrieve_context(
+    query: str,
+    top_k: int = 5,
+    merge: bool = KB_MERGE_ADJACENT_CHUNKS,
+    mode: str = RETRIEVAL_MODE,
+) -> List[Dict]:
+    return retrieve_context_many([query], top_k=top_k, merge=merge, mode=mode)[0]
+
+
+def retrieve_context_many(
+    queries: List[str],
+    top_k: int = 5,
+    use_cache: bool = True,
+    merge: bool = KB_MERGE_ADJACENT_CHUNKS,
+    mode: str = RETRIEVAL_MODE,
+    query_embs: Optional[np.ndarray] = None,
+) -> List[List[Dict]]:
+    """
+    Retrieve the top_k KB chunks for several queries at once: one batched
+    encode and one multi-query lookup. Returns one result list per query, in
+    input order; with merge, adjacent chunks of a file come back as one
+    document.
+
+    mode "hybrid" fuses the dense and BM25 candidate lists with reciprocal
+    rank fusion (falling back to dense if no lexical index was built);
+    "dense" and "lexical" use one side only.
+
+    query_embs: precomputed (n, dim) embeddings of `queries`, e.g. the one a
+    RequestContext already holds; computed here when omitted.
+    """
+    if not queries:
+        return []
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {RETRIEVAL_MODES}")
+
+    lexical = _get_lexical_index() if mode != "dense" else None
+    if mode == "lexical":
+        if lexical is None:
+            raise FileNotFoundError("No lexical index; run python rag/build_kb.py")
+        results = lexical.query(queries, top_k=top_k)
+    else:
+        candidates = top_k if lexical is None else max(top_k, HYBRID_CANDIDATES)
+        if query_embs is None:
+            query_embs = embed_queries(queries, use_cache=use_cache)
+        results = _get_index().query(query_embs, top_k=candidates)
+        if lexical is not None:
+            lexical_results = lexical.query(queries, top_k=candidates)
+            results = [
+                reciprocal_rank_fusion([dense, lex], k=RRF_K)[:top_k]
+                for dense, lex in zip(results, lexical_results)
+            ]
+
+    if merge:
+        results = [merge_adjacent_chunks(docs) for docs in results]
+    return results
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+"""
+Vector index backends for the knowledge base.
+
+- NumpyIndex (default): L2-normalized embedding matrix saved as .npy
+  (float32, or float16 to halve the file), memory-mapped at load; exact
+  cosine top-k is one matrix product plus argpartition. No server, no
+  SQLite, no extra dependency; ideal for the few-dozen-chunk KB
+- ChromaIndex: the original Chroma PersistentClient collection, for corpora
+  large enough to need an ANN index
+- Both expose query(embeddings, top_k) -> one list of {"id", "text",
+  "metadata"} dicts per query row, so the retriever does not care which one it has,
+  plus doc_ids() / get() / update() for incremental rebuilds (rag/build_kb.py)
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import CHROMA_DB_DIR, NUMPY_INDEX_DIR, VECTOR_INDEX_BACKEND
+
+CHROMA_COLLECTION_NAME = "insightweaver_kb"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.size == 0:
+        return matrix.reshape(0, matrix.shape[-1] if matrix.ndim == 2 else 0)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyIndex:
+    """Exact cosine search over a memory-mapped embedding matrix."""
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    DOCS_FILE = "docs.json"
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        texts: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        index_dir: Optional[Path] = None,
+    ):
+        self.embeddings = embeddings
+        self.texts = texts
+        self.metadatas = metadatas
+        self.ids = ids
+        self.index_dir = index_dir
+
+    @classmethod
+    def build(
+        cls,
+        embeddings,
+        texts: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        index_dir: Path = NUMPY_INDEX_DIR,
+        dtype: str = "float32",
+    ) -> "NumpyIndex":
+        """Normalize and save the embeddings plus document store; returns the index."""
+        matrix = _normalize_rows(embeddings).astype(dtype)
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_emb = index_dir / (cls.EMBEDDINGS_FILE + ".tmp")
+        with tmp_emb.open("wb") as f:
+            np.save(f, matrix)
+        tmp_docs = index_dir / (cls.DOCS_FILE + ".tmp")
+        with tmp_docs.open("w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "texts": texts, "metadatas": metadatas}, f)
+        tmp_emb.replace(index_dir / cls.EMBEDDINGS_FILE)
+        tmp_docs.replace(index_dir / cls.DOCS_FILE)
+        return cls(matrix, texts, metadatas, ids, index_dir)
+
+    @classmethod
+    def load(cls, index_dir: Path = NUMPY_INDEX_DIR, mmap: bool = True) -> "NumpyIndex":
+        index_dir = Path(index_dir)
+        embeddings = np.load(index_dir / cls.EMBEDDINGS_FILE, mmap_mode="r" if mmap else None)
+        with (index_dir / cls.DOCS_FILE).open("r", encoding="utf-8") as f:
+            docs = json.load(f)
+        return cls(embeddings, docs["texts"], docs["metadatas"], docs["ids"], index_dir)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def doc_ids(self) -> List[str]:
+        return list(self.ids)
+
+    def get(self, ids) -> List[Dict]:
+        """Stored {"id", "text", "metadata", "embedding"} of the given ids."""
+        rows = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        return [
+            {
+                "id": doc_id,
+                "text": self.texts[rows[doc_id]],
+                "metadata": self.metadatas[rows[doc_id]],
+                "embedding": np.asarray(self.embeddings[rows[doc_id]], dtype=np.float32),
+            }
+            for doc_id in ids
+            if doc_id in rows
+        ]
+
+    def update(self, embeddings, texts, metadatas, ids, delete_ids=()) -> "NumpyIndex":
+        """
+        Drop `delete_ids`, add/replace the given documents and rewrite the
+        files; kept rows reuse their stored vectors. Returns the new index.
+        """
+        drop = set(delete_ids) | set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in drop]
+        matrix = np.asarray(self.embeddings, dtype=np.float32)[keep]
+        if len(ids):
+            added = _normalize_rows(embeddings)
+            # Nothing kept (full rebuild): the new model may have another dimension
+            matrix = np.vstack([matrix, added]) if keep else added
+        return self.build(
+            matrix,
+            [self.texts[i] for i in keep] + list(texts),
+            [self.metadatas[i] for i in keep] + list(metadatas),
+            [self.ids[i] for i in keep] + list(ids),
+            index_dir=self.index_dir or NUMPY_INDEX_DIR,
+            dtype=str(self.embeddings.dtype),
+        )
+
+    def scores(self, query_embeddings) -> np.ndarray:
+        """Cosine similarity, shape (n_queries, n_docs)."""
+        queries = _normalize_rows(query_embeddings)
+        if self.embeddings.dtype == np.float32:
+            return queries @ self.embeddings.T
+        # float16 storage: upcast per call; the KB matrix is tiny
+        return queries @ np.asarray(self.embeddings, dtype=np.float32).T
+
+    def query(self, query_embeddings, top_k: int = 5) -> List[List[Dict]]:
+        scores = self.scores(query_embeddings)
+        k = min(top_k, scores.shape[1])
+        if k == 0:
+            return [[] for _ in range(scores.shape[0])]
+
+        # argpartition finds the top k in O(n); only those k get sorted
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-row[candidates], kind="stable")]
+            results.append(
+                [
+                    {"id": self.ids[i], "text": self.texts[i], "metadata": self.metadatas[i]}
+                    for i in ranked
+                ]
+            )
+        return results
+
+
+def _collection_names(client) -> List[str]:
+    # list_collections() returns names from chromadb 0.6, Collection objects before
+    return [getattr(c, "name", c) for c in client.list_collections()]
+
+
+class ChromaIndex:
+    """The Chroma PersistentClient collection behind the same interface."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @classmethod
+    def build(cls, embeddings, texts, metadatas, ids, db_dir: Path = CHROMA_DB_DIR) -> "ChromaIndex":
+        """Replace the collection; a collection keeps the dimension it was created with."""
+        import chromadb
+
+        Path(db_dir).mkdir(parents=True, exist_ok=True)
+        client = chromadb.PersistentClient(path=str(db_dir))
+        if CHROMA_COLLECTION_NAME in _collection_names(client):
+            client.delete_collection(CHROMA_COLLECTION_NAME)
+        collection = client.create_collection(
+            name=CHROMA_COLLECTION_NAME,
+            metadata={"description": "KB for InsightWeaver supply chain project"},
+        )
+        return cls(collection).update(embeddings, texts, metadatas, ids)
+
+    @classmethod
+    def load(cls, db_dir: Path = CHROMA_DB_DIR) -> "ChromaIndex":
+        import chromadb
+
+        client = chromadb.PersistentClient(path=str(db_dir))
+        return cls(client.get_collection(name=CHROMA_COLLECTION_NAME))
+
+    def __len__(self) -> int:
+        return self.collection.count()
+
+    def doc_ids(self) -> List[str]:
+        return self.collection.get(include=[])["ids"]
+
+    def get(self, ids) -> List[Dict]:
+        ids = list(ids)
+        if not ids:
+            return []
+        got = self.collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        return [
+            {"id": i, "text": t, "metadata": m, "embedding": np.asarray(e, dtype=np.float32)}
+            for i, t, m, e in zip(got["ids"], got["documents"], got["metadatas"], got["embeddings"])
+        ]
+
+    def update(self, embeddings, texts, metadatas, ids, delete_ids=()) -> "ChromaIndex":
+        """Delete `delete_ids` and upsert the given documents in place."""
+        if delete_ids:
+            self.collection.delete(ids=list(delete_ids))
+        if len(ids):
+            self.collection.upsert(
+                documents=list(texts),
+                metadatas=list(metadatas),
+                ids=list(ids),
+                embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            )
+        return self
+
+    def query(self, query_embeddings, top_k: int = 5) -> List[List[Dict]]:
+        results = self.collection.query(
+            query_embeddings=np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)).tolist(),
+            n_results=top_k,
+        )
+        return [
+            [
+                {"id": i, "text": doc, "metadata": meta}
+                for i, doc, meta in zip(ids, documents, metadatas)
+            ]
+            for ids, documents, metadatas in zip(
+                results["ids"], results["documents"], results["metadatas"]
+            )
+        ]
+
+
+BACKENDS = {"numpy": NumpyIndex, "chroma": ChromaIndex}
+
+
+def load_index(backend: Optional[str] = None):
+    """Open the configured (or given) index backend."""
+    backend = (backend or VECTOR_INDEX_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector index backend {backend!r}; expected one of {list(BACKENDS)}")
+    return BACKENDS[backend].load()
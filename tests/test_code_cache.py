@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from pipeline.code_cache import CodeCache
+
+SCOPE = "test-model|v1|schema|python"
+# Every question embeds to the same vector, so only the literal check can
+# tell them apart
+VECTOR = np.ones(8, dtype=np.float32)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CodeCache(db_path=tmp_path / "code_cache.sqlite", similarity=0.97)
+    cache.store(SCOPE, "Top 5 products by sales", "result_df = top5", embedding=VECTOR, encoder="e")
+    cache.store(SCOPE, "Sales by region in 2017", "result_df = y2017", embedding=VECTOR, encoder="e")
+    cache.store(
+        SCOPE, "Which region has the highest sales?", "result_df = high", embedding=VECTOR, encoder="e"
+    )
+    cache.store(SCOPE, "Total profit by market", "result_df = total", embedding=VECTOR, encoder="e")
+    return cache
+
+
+def _lookup(cache, question):
+    return cache.lookup(SCOPE, question, embed=lambda: VECTOR, encoder="e")
+
+
+@pytest.mark.parametrize("question", [
+    "Top 10 products by sales",
+    "Top ten products by sales",
+    "Sales by region in 2018",
+    "Sales by region in Europe",
+    "Which region has the lowest sales?",
+    "Which region has the worst sales?",
+    "Average profit by market",
+    "Number of orders by market",
+])
+def test_semantic_hit_requires_same_literals(cache, question):
+    assert _lookup(cache, question) is None
+
+
+@pytest.mark.parametrize("question,code", [
+    ("Show the top 5 products by sales", "result_df = top5"),
+    ("Show the top five products by sales", "result_df = top5"),
+    ("What were sales by region in 2017?", "result_df = y2017"),
+    ("Which region has the largest sales?", "result_df = high"),
+    ("Sum of profit by market", "result_df = total"),
+])
+def test_semantic_hit_with_same_literals(cache, question, code):
+    hit = _lookup(cache, question)
+    assert hit is not None and hit.match == "semantic" and hit.code == code
+
+
+def test_exact_hit_needs_no_embedding(cache):
+    hit = cache.lookup(SCOPE, "top 5 products by sales?")
+    assert hit is not None and hit.match == "exact"
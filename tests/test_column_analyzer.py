@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from pipeline.column_analyzer import referenced_columns
+from pipeline.data_runner import run_pandas_code
+
+
+@pytest.fixture
+def orders():
+    # Rows 0/1 differ only in an unreferenced column; row 2 has a null there
+    return pd.DataFrame({
+        "order_region": ["A", "A", "A", "B"],
+        "sales": [1.0, 1.0, 1.0, 5.0],
+        "market": ["x", "y", "x", "x"],
+        "customer_segment": ["c", "c", None, "c"],
+    })
+
+
+PROJECTABLE = [
+    "result_df = df.groupby('order_region')['sales'].sum().reset_index()",
+    "result_df = df.sort_values('sales').head(2)[['order_region', 'sales']]",
+    "result_df = df.dropna(subset=['sales']).groupby('order_region')['sales'].sum().reset_index()",
+    "result_df = df.drop_duplicates(['order_region', 'sales'])[['order_region', 'sales']]",
+]
+
+FULL_FRAME = [
+    "result_df = df.drop_duplicates().groupby('order_region')['sales'].sum().reset_index()",
+    "result_df = df.dropna().groupby('order_region')['sales'].sum().reset_index()",
+    "result_df = df.fillna(0).groupby('order_region')['sales'].sum().reset_index()",
+    "result_df = df.sample(2, random_state=0)[['sales']]",
+    "result_df = df.dropna(axis=1, subset=[0])[['sales']]",
+    "result_df = df.describe()",
+]
+
+
+@pytest.mark.parametrize("code", PROJECTABLE + FULL_FRAME)
+def test_projected_result_matches_full_frame(orders, code):
+    columns = referenced_columns(code, orders.columns)
+    if columns is None:
+        return
+    projected, _ = run_pandas_code(orders[sorted(columns)], code)
+    full, _ = run_pandas_code(orders, code)
+    pd.testing.assert_frame_equal(projected.reset_index(drop=True), full.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("code", PROJECTABLE)
+def test_projectable_code_is_narrowed(orders, code):
+    assert referenced_columns(code, orders.columns) == {"order_region", "sales"}
+
+
+@pytest.mark.parametrize("code", FULL_FRAME)
+def test_row_dependent_calls_use_full_frame(orders, code):
+    assert referenced_columns(code, orders.columns) is None
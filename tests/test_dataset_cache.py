@@ -0,0 +1,25 @@
+import pyarrow as pa
+
+import pipeline.dataset_cache as dataset_cache
+
+
+class _Dataset:
+    def __init__(self, schema):
+        self.schema = schema
+
+
+def test_clear_cache_drops_the_schema_fingerprint(monkeypatch):
+    schema = pa.schema([("sales", pa.float64())])
+    monkeypatch.setattr(dataset_cache, "dataset_fingerprint", lambda: "v1")
+    monkeypatch.setattr(dataset_cache, "open_processed_dataset", lambda: _Dataset(schema))
+    dataset_cache.clear_cache()
+
+    before = dataset_cache.schema_fingerprint()
+    assert dataset_cache.dataset_columns() == ["sales"]
+    # Same dataset fingerprint, different schema: only clear_cache() notices
+    schema = pa.schema([("sales", pa.float32()), ("market", pa.string())])
+    assert dataset_cache.schema_fingerprint() == before
+    dataset_cache.clear_cache()
+    assert dataset_cache.schema_fingerprint() != before
+    assert dataset_cache.dataset_columns() == ["sales", "market"]
+    dataset_cache.clear_cache()
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pytest
+
+import pipeline.arrow_snapshot as arrow_snapshot
+import pipeline.rollup_cube as rollup_cube
+from pipeline.column_stats import ColumnStatsBuilder
+from pipeline.rollup_cube import SEGMENT_COLUMNS, build_cube, build_cube_from_batches
+
+ROWS = 200
+
+
+@pytest.fixture
+def orders() -> pa.Table:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "market": pd.Categorical(rng.choice(["Africa", "Europe", "LATAM"], ROWS)),
+        "order_region": pd.Categorical(rng.choice(["East", "West", "North", "South"], ROWS)),
+        "sales": rng.uniform(10, 500, ROWS).round(2),
+        "order_item_quantity": rng.integers(1, 6, ROWS),
+        "order_date": pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 365, ROWS), "D"),
+    })
+    df.loc[::17, "sales"] = np.nan
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _sorted(cube: pd.DataFrame) -> pd.DataFrame:
+    keys = ["grouping"] + [c for c in SEGMENT_COLUMNS + ["order_month"] if c in cube]
+    cube = cube.astype({k: str for k in keys})
+    return cube.sort_values(keys).reset_index(drop=True)
+
+
+def test_cube_from_batches_matches_full_build(orders):
+    full = build_cube(orders.to_pandas())
+    folded = build_cube_from_batches(orders.to_batches(max_chunksize=37))
+    pd.testing.assert_frame_equal(_sorted(folded), _sorted(full), check_dtype=False)
+
+
+def test_column_stats_from_batches_match_one_pass(orders):
+    one = ColumnStatsBuilder(orders.schema)
+    one.add_batch(orders.combine_chunks().to_batches()[0])
+    parts = ColumnStatsBuilder(orders.schema)
+    for batch in orders.to_batches(max_chunksize=37):
+        parts.add_batch(batch)
+
+    expected, stats = one.stats(), parts.stats()
+    for column, s in expected.items():
+        for key in ("rows", "null_rate", "distinct", "min", "max", "top_values"):
+            assert stats[column].get(key) == s.get(key), (column, key)
+    sales = orders.column("sales").drop_null().to_numpy()
+    assert stats["sales"]["mean"] == pytest.approx(sales.mean())
+    assert stats["sales"]["std"] == pytest.approx(sales.std(ddof=1))
+    assert stats["sales"]["quantiles"]["0.5"] == pytest.approx(np.median(sales))
+
+
+def test_snapshot_unifies_batch_dictionaries(orders, tmp_path):
+    # Per-file batches each carry their own dictionary, in first-seen order
+    batches = [
+        pa.RecordBatch.from_arrays(
+            [
+                c.cast(c.type.value_type).dictionary_encode()
+                if pa.types.is_dictionary(c.type) else c
+                for c in b.columns
+            ],
+            schema=orders.schema,
+        )
+        for b in orders.to_batches(max_chunksize=37)
+    ]
+    assert len({tuple(b.column(0).dictionary.to_pylist()) for b in batches}) > 1
+
+    def source(columns):
+        return (b.select(columns) if columns is not None else b for b in batches)
+
+    arrow_snapshot.write_snapshot(tmp_path / "orders.arrow", orders.schema, source)
+    written = ipc.open_file(pa.memory_map(str(tmp_path / "orders.arrow"))).read_all()
+    assert written.to_pandas().equals(orders.to_pandas())
+
+
+def test_snapshot_is_one_file_per_fragment(orders, tmp_path, monkeypatch):
+    monkeypatch.setattr(arrow_snapshot, "DATA_SNAPSHOT_DIR", tmp_path)
+    base = {"files": ["base.parquet"], "rows": 150, "kind": "base", "created_at": "t0"}
+    delta = {"files": ["delta.parquet"], "rows": 50, "kind": "append", "created_at": "t1"}
+    manifest = {"fragments": [base, delta]}
+    monkeypatch.setattr(arrow_snapshot, "load_manifest", lambda: manifest)
+
+    def write(fragment, rows):
+        path = arrow_snapshot.snapshot_path(fragment)
+        arrow_snapshot.write_snapshot(path, orders.schema, lambda columns: rows.to_batches())
+
+    write(base, orders.slice(0, 150))
+    assert not arrow_snapshot.snapshot_is_fresh()
+    # An append only adds the file of its own fragment
+    write(delta, orders.slice(150))
+    assert arrow_snapshot.snapshot_is_fresh()
+    assert arrow_snapshot.open_snapshot().to_pandas().equals(orders.to_pandas())
+
+    # A full rebuild replaces the base; older files are pruned
+    manifest["fragments"] = [{**base, "created_at": "t2"}]
+    assert not arrow_snapshot.snapshot_is_fresh()
+    assert arrow_snapshot.open_snapshot() is None
+    assert arrow_snapshot.prune_snapshots(manifest) == 2
+    assert not list(tmp_path.glob("*.arrow"))
+
+
+def test_stale_cube_is_read_once_per_version(orders, tmp_path, monkeypatch):
+    monkeypatch.setattr(rollup_cube, "DATA_ROLLUP_PATH", tmp_path / "cube.parquet")
+    monkeypatch.setattr(rollup_cube, "_cube", None)
+    monkeypatch.setattr(rollup_cube, "_stale_key", None)
+    manifest = {"version": 2}
+    monkeypatch.setattr(rollup_cube, "load_manifest", lambda: manifest)
+    reads = []
+    read_cube = rollup_cube.read_cube
+    monkeypatch.setattr(rollup_cube, "read_cube", lambda: reads.append(1) or read_cube())
+
+    cube = build_cube(orders.to_pandas())
+    rollup_cube.save_cube(cube, 1)
+    assert rollup_cube.get_cube() is None
+    assert rollup_cube.get_cube() is None
+    assert len(reads) == 1
+
+    # Rewriting the cube for the current version makes it visible again
+    rollup_cube.save_cube(cube, 2)
+    assert rollup_cube.get_cube().version == 2
+    assert rollup_cube.get_cube().version == 2
+    assert len(reads) == 2
+
+    manifest["version"] = 3
+    assert rollup_cube.get_cube() is None
+    assert len(reads) == 3
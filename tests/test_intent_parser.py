@@ -0,0 +1,80 @@
+import pytest
+
+from pipeline.intent_parser import RANKING_LIMIT, parse_question
+
+# question -> (shape, agg, metric, by, limit)
+PARSED = [
+    ("What is the total sales by order_region?", ("breakdown", "sum", "sales", ["order_region"], None)),
+    ("What is the on_time_delivery rate by order_region?",
+     ("breakdown", "mean", "on_time_delivery", ["order_region"], None)),
+    ("Compare average benefit per order across different customer segments. "
+     "I want to find the most profitable customer groups.",
+     ("breakdown", "mean", "benefit_per_order", ["customer_segment"], None)),
+    ("How does average shipping delay vary across shipping mode groups? "
+     "I want to understand where operational bottlenecks exist.",
+     ("vary", "mean", "shipping_delay_days", ["shipping_mode"], None)),
+    ("Which market has the highest average profit?",
+     ("ranking", "mean", "order_profit_per_order", ["market"], RANKING_LIMIT)),
+    ("Which region has the lowest sales?", ("ranking", "sum", "sales", ["order_region"], RANKING_LIMIT)),
+    ("Top 5 countries by total profit", ("top", "sum", "order_profit_per_order", ["order_country"], 5)),
+    ("Show me the total sales by category and market.",
+     ("breakdown", "sum", "sales", ["category_name", "market"], None)),
+]
+
+UNPARSED = [
+    "What is the total discount by region for late orders?",
+    "What is the sales by region for orders shipped via first class?",
+    "Which region has the highest sales in europe?",
+    "Which region has the highest sales per order?",
+    "Show me sales by region. Only include the Consumer segment.",
+    "Show me sales by region. Use orders from 2017.",
+    "What is the total sales by region in Europe?",
+    "What is the total sales and average benefit per order by order_region?",
+    "Why is the late delivery risk high by region?",
+    "Total sales by region excluding returns",
+    "Sales by region, but count each customer once",
+]
+
+
+@pytest.mark.parametrize("question,expected", PARSED)
+def test_parses_supported_shapes(question, expected):
+    intent = parse_question(question)
+    assert intent is not None
+    assert (intent.shape, intent.agg, intent.metric, intent.by, intent.limit) == expected
+
+
+def test_breakdown_keeps_every_group():
+    intent = parse_question("What is the total sales by category?")
+    assert intent.limit is None
+    assert ".head(" not in intent.to_pandas_code()
+    assert "LIMIT" not in intent.to_sql()
+
+
+@pytest.mark.parametrize("question", UNPARSED)
+def test_rejects_questions_with_unparsed_words(question):
+    assert parse_question(question) is None
+
+
+# question -> ascending; best / worst follow the metric's polarity,
+# highest / lowest always sort by value
+DIRECTIONS = [
+    ("Which region has the best sales?", False),
+    ("Which region has the worst sales?", True),
+    ("Which region has the highest late delivery risk?", False),
+    ("Which region has the lowest late delivery risk?", True),
+]
+for metric in ("late delivery risk", "shipping delay", "days for shipping real"):
+    DIRECTIONS += [
+        (f"Which region has the best {metric}?", True),
+        (f"Which region has the worst {metric}?", False),
+        (f"Top 5 regions by {metric}", True),
+        (f"Bottom 5 regions by {metric}", False),
+    ]
+
+
+@pytest.mark.parametrize("question,ascending", DIRECTIONS)
+def test_sort_direction_follows_metric_polarity(question, ascending):
+    intent = parse_question(question)
+    assert intent is not None
+    assert intent.ascending is ascending
+    assert ("ASC" if ascending else "DESC") in intent.to_sql()
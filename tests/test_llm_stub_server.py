@@ -0,0 +1,128 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+openai = pytest.importorskip("openai")
+pytest.importorskip("tabulate")  # DataFrame.to_markdown in the narrative prompt
+
+import pipeline.insight_generator as insight_generator
+import pipeline.llm_client as llm_client
+import pipeline.orchestrator as orchestrator
+import rag.retriever as retriever
+from pipeline.llm_client import OpenAIProvider, set_provider
+from pipeline.llm_stub_server import DEFAULT_PANDAS_CODE, start_stub_server
+
+# Does not parse, so the stub answers with DEFAULT_PANDAS_CODE
+QUESTION = "Where do we sell the most?"
+
+KB_DOC = {
+    "id": "kb#0",
+    "text": "Sales are order totals in USD.",
+    "metadata": {"relative_path": "kb.md"},
+}
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = start_stub_server(port=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub(server, monkeypatch):
+    """The stub as process-wide provider, without failures or backoff waits."""
+    server.options["fail_rate"] = 0.0
+    server.options["rng"] = random.Random(0)
+    monkeypatch.setattr(llm_client, "_backoff", lambda attempt: 0.0)
+    set_provider(OpenAIProvider(base_url=server.base_url))
+    yield server
+    set_provider(None)
+
+
+@pytest.fixture
+def orders(tmp_path, monkeypatch) -> pd.DataFrame:
+    """A small orders parquet as the dataset; everything but the LLM stays local."""
+    rng = np.random.default_rng(0)
+    path = tmp_path / "orders.parquet"
+    pd.DataFrame({
+        "order_region": rng.choice(["East Africa", "Western Europe", "South America"], 60),
+        "shipping_mode": rng.choice(["Standard Class", "First Class"], 60),
+        "sales": rng.uniform(10, 500, 60).round(2),
+    }).to_parquet(path, index=False)
+    df = pd.read_parquet(path)
+
+    monkeypatch.setattr(
+        orchestrator, "get_orders_df", lambda columns=None: df if columns is None else df[columns]
+    )
+    monkeypatch.setattr(orchestrator, "dataset_columns", lambda: list(df.columns))
+    for flag in ("USE_INTENT_PARSER", "USE_ROLLUP_CUBE", "CODE_CACHE_ENABLED"):
+        monkeypatch.setattr(orchestrator, flag, False)
+    monkeypatch.setattr(insight_generator, "NARRATIVE_BACKEND", "openai")
+    monkeypatch.setattr(retriever, "embed_query", lambda question: np.ones(8, dtype=np.float32))
+    monkeypatch.setattr(
+        retriever,
+        "retrieve_context_many",
+        lambda questions, **kwargs: [[dict(KB_DOC)] for _ in questions],
+    )
+    return df
+
+
+def _expected(df: pd.DataFrame) -> pd.DataFrame:
+    scope = {"df": df, "pd": pd}
+    exec(DEFAULT_PANDAS_CODE, scope)
+    return scope["result_df"]
+
+
+def test_answer_question_against_stub(stub, orders):
+    result = orchestrator.answer_question(QUESTION)
+
+    assert result["path"] == "llm"
+    assert result["code"] == DEFAULT_PANDAS_CODE
+    pd.testing.assert_frame_equal(result["result_df"].reset_index(drop=True), _expected(orders))
+    assert result["narrative"].startswith(f'Key finding: the results for "{QUESTION}"')
+
+
+def test_stream_answer_against_stub(stub, orders):
+    events = list(orchestrator.stream_answer(QUESTION))
+    types = [e["type"] for e in events]
+
+    assert types[-1] == "done", events[-1]
+    assert types.index("context") < types.index("code_token") < types.index("result")
+    assert types.index("result") < types.index("narrative_token") < types.index("narrative")
+    result = events[-1]["result"]
+    code = "".join(e["text"] for e in events if e["type"] == "code_token")
+    narrative = "".join(e["text"] for e in events if e["type"] == "narrative_token")
+    assert code.strip() == result["code"] == DEFAULT_PANDAS_CODE
+    assert narrative.strip() == result["narrative"]
+    pd.testing.assert_frame_equal(result["result_df"].reset_index(drop=True), _expected(orders))
+
+
+def test_failed_requests_are_retried(stub, orders, monkeypatch):
+    retries = []
+    monkeypatch.setattr(llm_client, "_backoff", lambda attempt: retries.append(attempt) or 0.0)
+    stub.options["fail_rate"] = 0.5
+    set_provider(OpenAIProvider(base_url=stub.base_url, max_retries=20))
+
+    answers = [orchestrator.answer_question(QUESTION) for _ in range(3)]
+    events = list(orchestrator.stream_answer(QUESTION))
+
+    assert retries, "fail_rate 0.5 should have failed some requests"
+    assert all(a["code"] == DEFAULT_PANDAS_CODE for a in answers)
+    assert all(a["narrative"].startswith("Key finding") for a in answers)
+    assert events[-1]["type"] == "done"
+    assert events[-1]["result"]["narrative"].startswith("Key finding")
+
+
+def test_retries_give_up_after_max_retries(stub):
+    stub.options["fail_rate"] = 1.0
+    provider = OpenAIProvider(base_url=stub.base_url, max_retries=2)
+    messages = [{"role": "user", "content": QUESTION}]
+
+    with pytest.raises((openai.RateLimitError, openai.InternalServerError)):
+        provider.complete(messages)
+    with pytest.raises((openai.RateLimitError, openai.InternalServerError)):
+        list(provider.stream(messages))
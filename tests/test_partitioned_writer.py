@@ -0,0 +1,24 @@
+import pyarrow as pa
+import pytest
+
+from pipeline.partitioned_writer import conform_table
+
+SCHEMA = pa.schema([("order_item_discount_rate", pa.float32()), ("order_item_quantity", pa.int8())])
+
+
+def test_conform_casts_values_that_fit():
+    table = conform_table(
+        pa.table({"order_item_discount_rate": [0.25, None], "order_item_quantity": [1, 5]}), SCHEMA
+    )
+    assert table.schema == SCHEMA
+    assert table.column(0).to_pylist() == [0.25, None]
+
+
+@pytest.mark.parametrize("column,values", [
+    ("order_item_discount_rate", [0.1234567]),  # float32 would round it
+    ("order_item_quantity", [300]),  # int8 overflow
+])
+def test_conform_rejects_lossy_casts(column, values):
+    data = {"order_item_discount_rate": [0.5], "order_item_quantity": [1], column: values}
+    with pytest.raises(ValueError, match=column):
+        conform_table(pa.table(data), SCHEMA)
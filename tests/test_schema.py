@@ -0,0 +1,43 @@
+import pandas as pd
+import pyarrow as pa
+
+from pipeline.schema import INT8_COLUMNS, compact_frame, fits_float32, widen_for_analysis
+
+
+def test_int8_is_storage_only():
+    df = pd.DataFrame({
+        "shipping_delay_days": [1, 6, -2],
+        "order_item_quantity": [5, 1, 2],
+        "sales": [1.0, 2.0, 3.0],
+    })
+    compact, _ = compact_frame(df)
+    table = pa.Table.from_pandas(compact, preserve_index=False)
+    assert pa.types.is_int8(table.schema.field("shipping_delay_days").type)
+
+    analysis = widen_for_analysis(table).to_pandas()
+    assert (analysis["shipping_delay_days"] * 24).tolist() == [24, 144, -48]
+    assert (analysis["order_item_quantity"] * 100).tolist() == [500, 100, 200]
+    assert all(analysis[c].dtype == "int64" for c in INT8_COLUMNS if c in analysis)
+
+
+def test_float32_only_when_values_read_back_exactly():
+    df = pd.DataFrame({
+        "sales": [438165.15, 12.99, 0.5],
+        "order_item_discount_rate": [0.04, 0.25, 0.1],
+        # float32 holds about 7 significant digits
+        "latitude": [18.2514534, -33.9378452, 40.7127753],
+        "order_item_profit_ratio": [0.1234567, 0.5, 0.25],
+    })
+    compact, _ = compact_frame(df)
+
+    assert compact["sales"].dtype == "float64"
+    assert compact["order_item_discount_rate"].dtype == "float32"
+    assert compact["latitude"].dtype == "float64"
+    assert compact["order_item_profit_ratio"].dtype == "float64"
+    assert compact["sales"].sum() == df["sales"].sum()
+
+
+def test_fits_float32_rejects_precision_loss():
+    assert fits_float32([0.1, 0.25, float("nan")])
+    assert not fits_float32([438165.15])
+    assert not fits_float32([16777217.0])
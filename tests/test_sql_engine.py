@@ -0,0 +1,30 @@
+import pytest
+
+from pipeline.sql_engine import clean_sql
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "SELECT * FROM orders WHERE category_name = 'a;b'",
+        "SELECT * FROM orders WHERE category_name = 'it''s; fine'",
+        'SELECT "odd;name" FROM orders',
+        "SELECT sales FROM orders -- top; by sales",
+        "SELECT sales /* ; */ FROM orders",
+    ],
+)
+def test_semicolons_inside_quotes_and_comments_are_kept(raw):
+    assert clean_sql(raw + ";") == raw
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "SELECT 1; DROP VIEW orders",
+        "SELECT 'a;b'; SELECT 2",
+        "SELECT 'it''s'; SELECT 2",
+    ],
+)
+def test_multiple_statements_are_rejected(raw):
+    with pytest.raises(RuntimeError, match="multiple statements"):
+        clean_sql(raw)